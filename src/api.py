@@ -3,32 +3,87 @@
 An audio file is loaded and converted into blocks, with tags added according to the plugin configuration.
 """
 import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, Optional, Type, Union
+from functools import cached_property
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+from urllib.parse import parse_qsl, urlencode, urlsplit
 from uuid import uuid4
 
 import requests
-from steamship import Block, File, Steamship, SteamshipError
+from steamship import Block, File, Steamship, SteamshipError, Tag
 from steamship.base import Task, TaskState
 from steamship.base.mime_types import MimeTypes
 from steamship.data.workspace import SignedUrl, Workspace
-from steamship.invocable import Config, InvocableResponse
+from steamship.invocable import Config, InvocableResponse, post
 from steamship.plugin.blockifier import Blockifier
 from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
 from steamship.plugin.outputs.block_and_tag_plugin_output import BlockAndTagPluginOutput
 from steamship.plugin.request import PluginRequest
-from steamship.utils.signed_urls import upload_to_signed_url
-
-from parsers import (
-    parse_chapters,
-    parse_entities,
-    parse_sentiments,
-    parse_speaker_tags,
-    parse_timestamps,
-    parse_topic_summaries,
-    parse_topics,
+from steamship.utils.url import apply_localstack_url_fix
+
+from audio import (
+    AudioBody,
+    AudioSegment,
+    WavInfo,
+    compact_audio,
+    estimate_duration_s,
+    parse_wav_header,
+    split_audio,
+)
+from batch import BatchResult, blockify_batch
+from cache import (
+    CacheMode,
+    CompressedLRUCache,
+    TranscriptionCache,
+    WorkspaceCache,
+    content_key,
+    get_memory_cache,
+    get_result_cache,
 )
+from coalescing import coalesce_tags
+from features import FeaturePlan, plan_features
+from inputs import AudioReferenceInput
+from intervals import build_interval_index
+from metrics import METRICS_TAG_KIND, NULL_METRICS, Metrics, MetricsHook
+from parsers import parse_columnar_timestamps, parse_timestamps, parse_transcript
+from polling import suggest_poll_delay
+from realtime import transcribe_realtime
+from segmentation import SegmentationMode, segment_starts, split_into_blocks
+from sharding import RATE_LIMIT_WINDOW_S, TokenPool, get_token_pool
+from stitching import stitch_transcripts
+from streaming import stream_transcript
+from throttle import Throttle, TokenBucket, TransientAPIError, get_throttle, retry_after_s
+from transport import RETRY_STATUS_CODES, ChunkedBody, get_session
+
+# Query parameters that sign or expire a stored file's URL (S3, GCS, CloudFront, Azure SAS), and
+# prefixes of such parameters. They change with every signing but not with the file.
+SIGNING_QUERY_PARAMS = frozenset(
+    ["expires", "signature", "key-pair-id", "policy", "sig", "se", "sp", "sr", "st", "sv", "spr"]
+)
+SIGNING_QUERY_PREFIXES = ("x-amz-", "x-goog-")
+
+# AssemblyAI transcript ids, as accepted from webhook notifications.
+TRANSCRIPT_ID_PATTERN = re.compile(r"[A-Za-z0-9-]{1,64}")
+
+
+class JobNotFoundError(SteamshipError):
+    """AssemblyAI has no job with the requested id for the token it was fetched with."""
 
 
 class TranscribeJobStatus(str, Enum):
@@ -40,6 +95,20 @@ class TranscribeJobStatus(str, Enum):
     ERROR = "error"
 
 
+class UploadMode(str, Enum):
+    """How audio bytes are made available to AssemblyAI."""
+
+    DIRECT = "direct"
+    SIGNED_URL = "signed_url"
+
+
+class TimestampEncoding(str, Enum):
+    """How per-word timings are emitted."""
+
+    PER_WORD = "per_word"
+    COLUMNAR = "columnar"
+
+
 class AssemblyAIBlockifier(Blockifier):
     """Blockifier that transcribes audio files into blocks.
 
@@ -53,12 +122,90 @@ class AssemblyAIBlockifier(Blockifier):
         """Config object containing required configuration parameters to initialize a AssemblyAIBlockifier."""
 
         assembly_api_token: Optional[str] = ""
+        assembly_api_tokens: str = ""
         speaker_detection: bool = True
         enable_audio_intelligence: bool = True
+        features: str = ""
+        http_pool_size: int = 10
+        http_timeout_s: float = 30.0
+        http_max_retries: int = 3
+        http_backoff_factor: float = 0.5
+        http_max_backoff_s: float = 30.0
+        submit_rate_limit_per_s: float = 0.0
+        poll_rate_limit_per_s: float = 0.0
+        rate_limit_burst: int = 5
+        circuit_failure_threshold: int = 5
+        circuit_reset_s: float = 30.0
+        cache_mode: CacheMode = CacheMode.MEMORY
+        cache_max_entries: int = 256
+        cache_ttl_s: float = 86400.0
+        result_cache_max_bytes: int = 64 * 1024 * 1024
+        result_cache_ttl_s: float = 3600.0
+        upload_mode: UploadMode = UploadMode.DIRECT
+        upload_chunk_size: int = 5 * 1024 * 1024
+        compact_audio: bool = False
+        audio_url_pass_through: bool = False
+        webhook_url: str = ""
+        webhook_fallback_poll_s: float = 180.0
+        poll_min_delay_s: float = 1.0
+        poll_max_delay_s: float = 60.0
+        poll_jitter: float = 0.2
+        timestamp_encoding: TimestampEncoding = TimestampEncoding.PER_WORD
+        stream_parse_min_bytes: int = 8 * 1024 * 1024
+        segmentation: SegmentationMode = SegmentationMode.NONE
+        segment_max_duration_s: float = 300.0
+        segment_max_chars: int = 0
+        interval_index: bool = False
+        coalesce_spans: bool = False
+        coalesce_max_gap_ms: int = 1000
+        batch_max_in_flight: int = 5
+        long_audio_min_duration_s: float = 0.0
+        long_audio_segment_s: float = 600.0
+        long_audio_overlap_s: float = 5.0
+        metrics_summary_tag: bool = False
+        realtime_max_duration_s: float = 0.0
+        realtime_speed: float = 1.0
 
     config: AssemblyAIBlockifierConfig
 
+    # Config fields that do not change the transcription output, and are left out of cache keys.
+    NON_OUTPUT_CONFIG_FIELDS = frozenset(
+        {
+            "assembly_api_token",
+            "assembly_api_tokens",
+            "http_pool_size",
+            "http_timeout_s",
+            "http_max_retries",
+            "http_backoff_factor",
+            "http_max_backoff_s",
+            "submit_rate_limit_per_s",
+            "poll_rate_limit_per_s",
+            "rate_limit_burst",
+            "circuit_failure_threshold",
+            "circuit_reset_s",
+            "cache_mode",
+            "cache_max_entries",
+            "cache_ttl_s",
+            "result_cache_max_bytes",
+            "result_cache_ttl_s",
+            "upload_mode",
+            "upload_chunk_size",
+            "audio_url_pass_through",
+            "webhook_url",
+            "webhook_fallback_poll_s",
+            "poll_min_delay_s",
+            "poll_max_delay_s",
+            "poll_jitter",
+            "stream_parse_min_bytes",
+            "batch_max_in_flight",
+            "realtime_speed",
+        }
+    )
+
     BASE_URL = "https://api.assemblyai.com/v2"
+    # Called with the phase spans and counters of the job after every invocation, if set.
+    metrics_hook: Optional[MetricsHook] = None
+    STREAM_CHUNK_SIZE = 64 * 1024
     BASE_HEADERS = {
         "content-type": "application/json",
     }
@@ -68,6 +215,139 @@ class AssemblyAIBlockifier(Blockifier):
         """Return the configuration object for the Transcriber Plugin."""
         return cls.AssemblyAIBlockifierConfig
 
+    @property
+    def session(self) -> requests.Session:
+        """Return the pooled keep-alive session shared by all outbound calls."""
+        return get_session(
+            pool_size=self.config.http_pool_size,
+            max_retries=self.config.http_max_retries,
+            backoff_factor=self.config.http_backoff_factor,
+        )
+
+    @property
+    def api_session(self) -> requests.Session:
+        """Return the pooled session for AssemblyAI API calls, whose status retries are throttled."""
+        return get_session(
+            pool_size=self.config.http_pool_size,
+            max_retries=self.config.http_max_retries,
+            backoff_factor=self.config.http_backoff_factor,
+            retry_statuses=False,
+        )
+
+    @cached_property
+    def token_pool(self) -> TokenPool:
+        """Return the pool of assembly_api_token and the comma-separated assembly_api_tokens."""
+        tokens = [self.config.assembly_api_token, *self.config.assembly_api_tokens.split(",")]
+        tokens = list(dict.fromkeys(token.strip() for token in tokens if token and token.strip()))
+        return get_token_pool(self.BASE_URL, tokens or [self.config.assembly_api_token or ""])
+
+    def throttle(self, shard: Optional[str] = None) -> Throttle:
+        """Return the rate limits, retries and circuit breaker shared by calls with a token."""
+        return get_throttle(
+            f"{self.BASE_URL}#{self.token_pool.shard(shard)}",
+            submit_rate_per_s=self.config.submit_rate_limit_per_s,
+            poll_rate_per_s=self.config.poll_rate_limit_per_s,
+            burst=self.config.rate_limit_burst,
+            max_retries=self.config.http_max_retries,
+            backoff_factor=self.config.http_backoff_factor,
+            max_backoff_s=self.config.http_max_backoff_s,
+            failure_threshold=self.config.circuit_failure_threshold,
+            reset_timeout_s=self.config.circuit_reset_s,
+        )
+
+    @cached_property
+    def cache(self) -> Optional[TranscriptionCache]:
+        """Return the transcription cache selected by the config, or None if caching is disabled."""
+        if self.config.cache_mode == CacheMode.MEMORY:
+            return get_memory_cache(self.config.cache_max_entries, self.config.cache_ttl_s)
+        if self.config.cache_mode == CacheMode.WORKSPACE:
+            return WorkspaceCache(
+                self._workspace(),
+                self.session,
+                self.config.cache_ttl_s,
+                timeout_s=self.config.http_timeout_s,
+            )
+        return None
+
+    @cached_property
+    def results(self) -> Optional[CompressedLRUCache]:
+        """Return the cache of finished job results by job id, or None if it is disabled."""
+        if not self.config.result_cache_max_bytes:
+            return None
+        return get_result_cache(self.config.result_cache_max_bytes, self.config.result_cache_ttl_s)
+
+    @cached_property
+    def job_states(self) -> TranscriptionCache:
+        """Return the store of job states reported through the completion webhook.
+
+        Notifications may reach another worker than the status checks of their job, so in webhook
+        mode they are kept in the workspace whenever the plugin runs in one.
+        """
+        shared = self.config.webhook_url and self.client is not None
+        if shared or self.config.cache_mode == CacheMode.WORKSPACE:
+            return WorkspaceCache(
+                self._workspace(),
+                self.session,
+                self.config.cache_ttl_s,
+                prefix="job-states",
+                timeout_s=self.config.http_timeout_s,
+            )
+        return get_memory_cache(
+            self.config.cache_max_entries, self.config.cache_ttl_s, namespace="job-states"
+        )
+
+    @cached_property
+    def feature_plan(self) -> FeaturePlan:
+        """Return the request flags and parsers of the features selected by the config.
+
+        Without an explicit features list, speaker_detection and enable_audio_intelligence select the
+        features on top of per-word timestamps.
+        """
+        default = ["timestamps"]
+        if self.config.speaker_detection:
+            default.append("speakers")
+        if self.config.enable_audio_intelligence:
+            default.append("audio_intelligence")
+        return plan_features(self.config.features.split(","), default=default)
+
+    def _cache_key(self, data: bytes) -> str:
+        """Hash the data with the output config and the accounts of the token pool.
+
+        Jobs can only be fetched by the account that submitted them, so every pool of tokens has
+        its own entries, even in stores shared by the whole process.
+        """
+        config = {**self.config.dict(), "accounts": sorted(self.token_pool.tokens)}
+        return content_key(data, config, exclude=self.NON_OUTPUT_CONFIG_FIELDS)
+
+    def _result_key(self, status_input: Dict[str, Any]) -> str:
+        transcription_ids = ",".join(self._transcription_ids(status_input))
+        return self._cache_key(transcription_ids.encode("utf-8"))
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        shard: Optional[str] = None,
+        rate_limit: Optional[TokenBucket] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """Send a request to the AssemblyAI API with the token of a shard, through the shared session.
+
+        The request goes through the throttle of the token, which waits for the given rate limit,
+        retries rate-limited and failed requests and fails fast while the API is failing.
+        """
+        headers = {
+            "authorization": self.token_pool.token(shard),
+            **self.BASE_HEADERS,
+            **kwargs.pop("headers", {}),
+        }
+        return self.throttle(shard).send(
+            lambda: self.api_session.request(
+                method, url, headers=headers, timeout=self.config.http_timeout_s, **kwargs
+            ),
+            rate_limit,
+        )
+
     def run(
         self, request: PluginRequest[RawDataPluginInput]
     ) -> Union[InvocableResponse, InvocableResponse[BlockAndTagPluginOutput]]:
@@ -76,77 +356,416 @@ class AssemblyAIBlockifier(Blockifier):
         if request.is_status_check:
             logging.info("Status check.")
 
-            if "transcription_id" not in request.status.remote_status_input:
+            if not {"transcription_id", "segments"} & set(request.status.remote_status_input):
                 raise SteamshipError(message="Status check requests need to provide a valid job id")
-            return self._check_transcription_status(
-                request.status.remote_status_input["transcription_id"]
-            )
+            return self._resume_job(request.status.remote_status_input)
         else:
+            metrics = self._metrics()
+            audio_url = getattr(request.data, "url", None) if request.data.data is None else None
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self._cache_key(
+                    request.data.data if audio_url is None else self._url_identity(audio_url)
+                )
+                response = self._cached_response(cache_key)
+                if response is not None:
+                    return response
+            wav = self._realtime_audio(request.data.data) if audio_url is None else None
+            if wav is not None:
+                response = self._transcribe_realtime(request.data.data, wav, cache_key, metrics)
+                if response is not None:
+                    return response
             # mime_type = self._check_mime_type(request)
-            signed_url = self._upload_audio_file("test", request.data.data)
-            transcription_id = self._start_transcription(file_uri=signed_url)
-            return self._check_transcription_status(transcription_id)
+            status_input = self._submit(request.data.data, audio_url, metrics)
+            status_input["submitted_at"] = time.time()
+            if cache_key is not None:
+                self.cache.put(cache_key, dict(status_input))
+                status_input["cache_key"] = cache_key
+            if self.config.webhook_url:
+                return self._running_response(status_input, metrics=metrics)
+            return self._check_job_status(status_input, metrics)
+
+    @post("blockify")
+    def run_endpoint(self, **kwargs) -> InvocableResponse[BlockAndTagPluginOutput]:
+        """Expose `run` to the engine, leaving audio URLs unfetched in pass-through mode."""
+        if self.config.audio_url_pass_through:
+            return self.run(PluginRequest[AudioReferenceInput].parse_obj(kwargs))
+        return super().run_endpoint(**kwargs)
+
+    def _submit(
+        self, data: Optional[bytes], audio_url: Optional[str], metrics: Metrics = NULL_METRICS
+    ) -> Dict[str, Any]:
+        """Start transcribing the audio and return the status input of the new job."""
+        if audio_url is not None:
+            # The audio stays in storage: AssemblyAI reads it through the signed URL directly.
+            with metrics.span("submit"):
+                job = self._schedule(
+                    lambda shard: self._start_transcription(
+                        file_uri=apply_localstack_url_fix(audio_url), shard=shard
+                    )
+                )
+            return {**job, "audio_duration_s": None}
+        audio_duration_s = estimate_duration_s(data)
+        segments = self._split_long_audio(data, audio_duration_s)
+        if segments:
+            status_input = {"segments": self._start_segment_transcriptions(segments, metrics)}
+        else:
+            status_input = self._upload_and_start(data, metrics)
+        status_input["audio_duration_s"] = audio_duration_s
+        return status_input
+
+    def _realtime_audio(self, data: bytes) -> Optional[WavInfo]:
+        """Return the format of audio to transcribe in a real-time session, or None for a job.
+
+        Real-time sessions take 16-bit mono PCM and only return word timings, so they are used for
+        WAV inputs up to realtime_max_duration_s long when no feature beyond timestamps is selected.
+        """
+        if not self.config.realtime_max_duration_s or set(self.feature_plan.tag_kinds) - {
+            "timestamp"
+        }:
+            return None
+        wav = parse_wav_header(data)
+        if wav is None or (wav.audio_format, wav.channels, wav.bits_per_sample) != (1, 1, 16):
+            return None
+        if wav.data_size > self.config.realtime_max_duration_s * wav.byte_rate:
+            return None
+        return wav
+
+    def _transcribe_realtime(
+        self,
+        data: bytes,
+        wav: WavInfo,
+        cache_key: Optional[str],
+        metrics: Metrics = NULL_METRICS,
+    ) -> Optional[InvocableResponse]:
+        """Transcribe short PCM audio synchronously, or return None if the session failed."""
+        pcm = memoryview(data)[wav.data_offset : wav.data_offset + wav.data_size]
+        submitted_at = time.time()
+        try:
+            with metrics.span("stream"):
+                transcript = transcribe_realtime(
+                    self._realtime_url(),
+                    self.token_pool.token(),
+                    pcm,
+                    wav.sample_rate,
+                    speed=self.config.realtime_speed,
+                    timeout_s=self.config.http_timeout_s,
+                )
+        except (SteamshipError, OSError) as error:
+            logging.warning(
+                f"Real-time session failed, falling back to a transcription job: {error}"
+            )
+            return None
+        metrics.count("bytes_uploaded", len(pcm))
+        status_input = {
+            "transcription_id": transcript["id"],
+            "audio_duration_s": transcript["audio_duration"],
+            "submitted_at": submitted_at,
+        }
+        if cache_key is not None:
+            status_input["cache_key"] = cache_key
+        return self._complete_job(status_input, transcript, metrics=metrics)
+
+    def _realtime_url(self) -> str:
+        scheme, _, rest = self.BASE_URL.partition("://")
+        return f"{'wss' if scheme == 'https' else 'ws'}://{rest}/realtime/ws"
+
+    @staticmethod
+    def _url_identity(url: str) -> bytes:
+        """Return a signed URL without its signing parameters, to key the cache by."""
+        parts = urlsplit(url)
+        query = [
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if name.lower() not in SIGNING_QUERY_PARAMS
+            and not name.lower().startswith(SIGNING_QUERY_PREFIXES)
+        ]
+        return parts._replace(query=urlencode(query), fragment="").geturl().encode("utf-8")
+
+    def run_batch(self, inputs: Iterable[Tuple[Hashable, bytes]]) -> Iterator[BatchResult]:
+        """Blockify many (key, audio bytes) inputs concurrently, yielding results as jobs finish.
+
+        At most batch_max_in_flight inputs are in flight at any time. An input split into long-audio
+        segments runs one AssemblyAI job per segment, so the number of jobs can be higher.
+        """
+        return blockify_batch(self.run, inputs, max_in_flight=self.config.batch_max_in_flight)
+
+    @post("webhook", public=True)
+    def webhook(self, transcript_id: str = None, status: str = None, **kwargs) -> InvocableResponse:
+        """Record a job completion notification sent by AssemblyAI to the configured webhook URL.
+
+        The endpoint is public and unauthenticated: a notification only makes the next status check
+        fetch the job from AssemblyAI, which reports its actual status.
+        """
+        if not transcript_id or not TRANSCRIPT_ID_PATTERN.fullmatch(transcript_id):
+            raise SteamshipError(
+                message="Webhook notifications need to provide a valid transcript_id"
+            )
+        logging.info(f"Webhook reported job {transcript_id} with status {status}.")
+        self.job_states.put(transcript_id, {"status": status})
+        return InvocableResponse(json={"transcript_id": transcript_id, "status": status})
+
+    def _cached_response(self, cache_key: str) -> Optional[InvocableResponse]:
+        """Answer a request from its cache entry, or return None on a miss.
+
+        Entries of jobs the token pool cannot fetch, because their token left the pool or
+        AssemblyAI no longer knows the job, count as misses and are removed.
+        """
+        entry = self.cache.get(cache_key)
+        if entry is None:
+            return None
+        if entry.get("output") is not None:
+            return InvocableResponse(data=BlockAndTagPluginOutput.parse_obj(entry["output"]))
+        shards = [job.get("shard") for job in entry.get("segments", [entry])]
+        if all(shard is None or shard in self.token_pool.tokens for shard in shards):
+            try:
+                return self._resume_job({**entry, "cache_key": cache_key})
+            except JobNotFoundError as error:
+                logging.warning(
+                    f"Cached job cannot be fetched, starting a new one: {error.message}"
+                )
+        self.cache.delete(cache_key)
+        return None
+
+    def _resume_job(self, status_input: Dict[str, Any]) -> InvocableResponse:
+        """Answer a status check for a submitted job.
+
+        In webhook mode the job is only fetched from AssemblyAI once a notification was recorded, or
+        once no notification arrived within webhook_fallback_poll_s of submission. Jobs that already
+        finished are answered from the result cache, without any request to AssemblyAI.
+        """
+        if self.results is not None:
+            result = self.results.get(self._result_key(status_input))
+            if result is not None and "error" in result:
+                raise SteamshipError(message=result["error"])
+            if result is not None:
+                return InvocableResponse(data=BlockAndTagPluginOutput.parse_obj(result["output"]))
+        metrics = self._metrics(status_input)
+        transcription_ids = self._transcription_ids(status_input)
+        if self.config.webhook_url and any(
+            self.job_states.get(transcription_id) is None for transcription_id in transcription_ids
+        ):
+            waited_s = time.time() - status_input.get("submitted_at", 0)
+            if waited_s < self.config.webhook_fallback_poll_s:
+                return self._running_response(status_input, metrics=metrics)
+            logging.warning(f"No webhook received for jobs {transcription_ids}, polling instead.")
+        return self._check_job_status(status_input, metrics)
+
+    def _check_job_status(
+        self, status_input: Dict[str, Any], metrics: Metrics = NULL_METRICS
+    ) -> InvocableResponse:
+        """Check a submitted job, reporting it as still running if AssemblyAI is unavailable."""
+        try:
+            if "segments" in status_input:
+                return self._check_segment_statuses(status_input, metrics)
+            return self._check_transcription_status(
+                status_input["transcription_id"], status_input=status_input, metrics=metrics
+            )
+        except TransientAPIError as error:
+            logging.warning(f"Status check failed, will check again: {error.message}")
+            return self._running_response(
+                status_input, metrics=metrics, retry_in_s=error.retry_in_s
+            )
+
+    @staticmethod
+    def _transcription_ids(status_input: Dict[str, Any]) -> List[str]:
+        return [segment["transcription_id"] for segment in status_input.get("segments", [])] or [
+            status_input["transcription_id"]
+        ]
+
+    def _metrics(self, status_input: Optional[Dict[str, Any]] = None) -> Metrics:
+        """Return the metrics of a job, carried over from its status input, if anything reads them."""
+        if self.metrics_hook is None and not self.config.metrics_summary_tag:
+            return NULL_METRICS
+        return Metrics((status_input or {}).get("metrics"))
+
+    def _metrics_summary(self, status_input: Dict[str, Any], metrics: Metrics) -> Dict[str, Any]:
+        """Return the spans and counters of a job, with its time queued and processing."""
+        summary = metrics.snapshot()
+        summary["spans"]["queued"] = status_input.get("queued_s", 0.0)
+        summary["spans"]["processing"] = status_input.get("processing_s", 0.0)
+        if status_input.get("submitted_at"):
+            summary["spans"]["job"] = time.time() - status_input["submitted_at"]
+        return summary
+
+    def _emit_metrics(
+        self, event: str, status_input: Dict[str, Any], summary: Dict[str, Any]
+    ) -> None:
+        if self.metrics_hook is not None:
+            self.metrics_hook(
+                {
+                    "event": event,
+                    "transcription_ids": self._transcription_ids(status_input),
+                    **summary,
+                }
+            )
+
+    def _split_long_audio(
+        self, data: bytes, audio_duration_s: Optional[float]
+    ) -> Optional[List[AudioSegment]]:
+        """Cut audio of at least long_audio_min_duration_s into segments transcribed in parallel."""
+        min_duration_s = self.config.long_audio_min_duration_s
+        if not min_duration_s or audio_duration_s is None or audio_duration_s < min_duration_s:
+            return None
+        segments = split_audio(
+            data, self.config.long_audio_segment_s, self.config.long_audio_overlap_s
+        )
+        return segments if segments and len(segments) > 1 else None
+
+    def _schedule(self, start: Callable[[str], str]) -> Dict[str, str]:
+        """Start a job with the least-loaded token and return its transcription id and shard."""
+        pool = self.token_pool
+        shard = pool.acquire(
+            {
+                shard: self.throttle(shard).recent_rate_limits(RATE_LIMIT_WINDOW_S)
+                for shard in pool.tokens
+            }
+        )
+        transcription_id = None
+        try:
+            transcription_id = start(shard)
+        finally:
+            pool.started(shard, transcription_id)
+        return {"transcription_id": transcription_id, "shard": shard}
+
+    def _upload_and_start(self, data: bytes, metrics: Metrics = NULL_METRICS) -> Dict[str, str]:
+        """Upload the audio, start its transcription and return its transcription id and shard.
+
+        The upload uses the token of the job, as AssemblyAI only lets the uploading account read it.
+        """
+        body = self._compact_audio(data, metrics)
 
-    def _start_transcription(self, file_uri: str) -> str:
+        def start(shard: str) -> str:
+            with metrics.span("upload"):
+                file_uri = self._upload_audio_file("test", body, shard=shard)
+            metrics.count("bytes_uploaded", len(body))
+            with metrics.span("submit"):
+                return self._start_transcription(file_uri=file_uri, shard=shard)
+
+        return self._schedule(start)
+
+    def _compact_audio(self, data: bytes, metrics: Metrics = NULL_METRICS) -> AudioBody:
+        """Return the audio to upload, downmixed and resampled to 16 kHz if compact_audio is set.
+
+        Only uncompressed PCM WAV audio is compacted; anything else is uploaded untouched.
+        """
+        compact = compact_audio(data) if self.config.compact_audio else None
+        if compact is None or len(compact) >= len(data):
+            return data
+        saved = len(data) - len(compact)
+        metrics.count("bytes_saved", saved)
+        logging.info(
+            f"Compacted audio to {compact.sample_rate} Hz mono, saving {saved} of {len(data)} bytes."
+        )
+        return compact
+
+    def _start_segment_transcriptions(
+        self, segments: List[AudioSegment], metrics: Metrics = NULL_METRICS
+    ) -> List[Dict[str, Any]]:
+        """Upload the segments and start their transcriptions in parallel.
+
+        Return the status input of each segment: its job id, and its offset and cut range in ms.
+        """
+        workers = min(len(segments), self.config.http_pool_size)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            jobs = list(
+                executor.map(
+                    lambda segment: self._upload_and_start(segment.data, metrics), segments
+                )
+            )
+        return [
+            {
+                **job,
+                "offset_ms": round(segment.offset_s * 1000),
+                "cut_start_ms": round(segment.cut_start_s * 1000),
+                "cut_end_ms": round(segment.cut_end_s * 1000),
+            }
+            for job, segment in zip(jobs, segments)
+        ]
+
+    def _start_transcription(self, file_uri: str, shard: Optional[str] = None) -> str:
         """Start to transcribe the audio file stored on s3 and return the transcription id."""
-        response = requests.post(
+        webhook_params = {}
+        if self.config.webhook_url:
+            webhook_params["webhook_url"] = self.config.webhook_url
+        response = self._request(
+            "POST",
             f"{self.BASE_URL}/transcript",
+            shard=shard,
+            rate_limit=self.throttle(shard).submissions,
             json={
+                **webhook_params,
                 "audio_url": file_uri,
-                "speaker_labels": self.config.speaker_detection,
                 "language_detection": True,
-                "auto_highlights": self.config.enable_audio_intelligence,
-                "iab_categories": self.config.enable_audio_intelligence,
-                "sentiment_analysis": self.config.enable_audio_intelligence,
-                "auto_chapters": self.config.enable_audio_intelligence,
-                "entity_detection": self.config.enable_audio_intelligence,
+                **self.feature_plan.request_flags,
             },
-            headers={"authorization": self.config.assembly_api_token, **self.BASE_HEADERS},
         )
-        return response.json().get("id")
+        transcription_id = response.json().get("id") if response.ok else None
+        if transcription_id is None:
+            raise SteamshipError(
+                message="Unable to start the transcription. "
+                f"Status code: {response.status_code}. Error: {self._error_message(response)}"
+            )
+        return transcription_id
+
+    def _parsers(self) -> Tuple[Callable, ...]:
+        parsers = self.feature_plan.parsers
+        if self.config.timestamp_encoding == TimestampEncoding.COLUMNAR:
+            return tuple(
+                parse_columnar_timestamps if parser is parse_timestamps else parser
+                for parser in parsers
+            )
+        return parsers
 
     def _process_transcription_response(
-        self, transcription_response: Dict[str, Any]
+        self, transcription_response: Dict[str, Any], tags: Optional[List[Tag]] = None
     ) -> InvocableResponse:
-        timestamp_tags, time_idx_to_char_idx = parse_timestamps(transcription_response)
-
-        tags = [
-            *timestamp_tags,
-            *parse_speaker_tags(transcription_response),
-            *parse_topics(transcription_response),
-            *parse_topic_summaries(transcription_response),
-            *parse_sentiments(transcription_response),
-            *parse_chapters(transcription_response, time_idx_to_char_idx),
-            *parse_entities(transcription_response, time_idx_to_char_idx),
-        ]
+        if tags is None:
+            tags = parse_transcript(transcription_response, self._parsers())
+        text = transcription_response["text"]
 
-        return InvocableResponse(
-            data=BlockAndTagPluginOutput(
-                file=File(
-                    blocks=[
-                        Block(
-                            text=transcription_response["text"],
-                            tags=tags,
-                        )
-                    ]
-                )
+        if self.config.segmentation == SegmentationMode.NONE:
+            file = File(blocks=[Block(text=text, tags=tags)])
+        else:
+            starts = segment_starts(
+                self.config.segmentation,
+                tags,
+                max_duration_s=self.config.segment_max_duration_s or None,
+                max_chars=self.config.segment_max_chars or None,
             )
-        )
+            blocks, file_tags = split_into_blocks(text, tags, starts)
+            file = File(blocks=blocks, tags=file_tags)
+        if self.config.interval_index:
+            for block in file.blocks:
+                index = build_interval_index(block.tags)
+                if index is not None:
+                    block.tags.append(index)
+        return InvocableResponse(data=BlockAndTagPluginOutput(file=file))
 
-    def _check_transcription_status(self, transcription_id: str) -> InvocableResponse:
-        response = requests.get(
-            f"{self.BASE_URL}/transcript/{transcription_id}",
-            headers={"authorization": self.config.assembly_api_token, **self.BASE_HEADERS},
-        )
-        if not response.ok:
-            try:
-                error = response.json()["error"]
-                raise SteamshipError(message="Transcription was unsuccessful. " f"Error: {error}")
-            except Exception:
-                raise SteamshipError(
-                    message="Transcription was unsuccessful. Please contact support of this persists."
-                )
-        transcription_response = response.json()
+    def _check_transcription_status(
+        self,
+        transcription_id: str,
+        status_input: Optional[Dict[str, Any]] = None,
+        metrics: Metrics = NULL_METRICS,
+    ) -> InvocableResponse:
+        status_input = {**(status_input or {}), "transcription_id": transcription_id}
+        with metrics.span("fetch"):
+            response = self._get_transcript(
+                transcription_id, stream=True, shard=status_input.get("shard")
+            )
+        metrics.count("polls")
+        content_length = int(response.headers.get("content-length") or 0)
+        if content_length and content_length < self.config.stream_parse_min_bytes:
+            with metrics.span("download"):
+                transcription_response, tags = response.json(), None
+            metrics.count("response_bytes", content_length)
+        else:
+            # Large or unsized bodies are parsed incrementally, so the JSON tree is never held.
+            chunks = metrics.count_bytes(
+                "response_bytes", response.iter_content(self.STREAM_CHUNK_SIZE)
+            )
+            with metrics.span("parse"):
+                transcription_response, tags = stream_transcript(chunks, self._parsers())
         job_status = transcription_response["status"]
         logging.info(f"Job {transcription_id} has status {job_status}.")
 
@@ -155,29 +774,257 @@ class AssemblyAIBlockifier(Blockifier):
             TranscribeJobStatus.ERROR,
         }:
             if job_status == TranscribeJobStatus.COMPLETED:
-                return self._process_transcription_response(transcription_response)
+                return self._complete_job(status_input, transcription_response, tags, metrics)
             else:
+                self._fail_job(status_input, metrics)
+        else:
+            return self._running_response(status_input, job_status, metrics)
+
+    def _get_transcript(
+        self, transcription_id: str, stream: bool = False, shard: Optional[str] = None
+    ) -> requests.Response:
+        """Fetch a transcript with the token it was submitted with, raising if it is not returned."""
+        response = self._request(
+            "GET",
+            f"{self.BASE_URL}/transcript/{transcription_id}",
+            shard=shard,
+            rate_limit=self.throttle(shard).polls,
+            stream=stream,
+        )
+        if response.status_code in RETRY_STATUS_CODES:
+            raise TransientAPIError(
+                message=f"AssemblyAI did not return job {transcription_id}. "
+                f"Status code: {response.status_code}.",
+                retry_in_s=retry_after_s(response) or 0.0,
+            )
+        if response.status_code == 404:
+            raise JobNotFoundError(
+                message=f"AssemblyAI does not know job {transcription_id} for this token."
+            )
+        if not response.ok:
+            error = self._error_message(response)
+            if error is None:
                 raise SteamshipError(
                     message="Transcription was unsuccessful. Please contact support of this persists."
                 )
-        else:
-            return InvocableResponse(
-                status=Task(
-                    state=TaskState.running,
-                    remote_status_message="Transcription job ongoing.",
-                    remote_status_input={"transcription_id": transcription_id},
+            raise SteamshipError(message="Transcription was unsuccessful. " f"Error: {error}")
+        return response
+
+    @staticmethod
+    def _error_message(response: requests.Response) -> Optional[str]:
+        """Return the error AssemblyAI reported in a failed response, if any."""
+        try:
+            return response.json().get("error")
+        except ValueError:
+            return None
+
+    def _complete_job(
+        self,
+        status_input: Dict[str, Any],
+        transcription_response: Dict[str, Any],
+        tags: Optional[List[Tag]] = None,
+        metrics: Metrics = NULL_METRICS,
+    ) -> InvocableResponse:
+        self.token_pool.finished(self._transcription_ids(status_input))
+        if tags is None:
+            with metrics.span("parse"):
+                tags = parse_transcript(transcription_response, self._parsers())
+        if self.config.coalesce_spans:
+            tags, removed = coalesce_tags(tags, max_gap_ms=self.config.coalesce_max_gap_ms)
+            metrics.count("tags_coalesced", removed)
+            logging.info(f"Coalesced topic and sentiment runs, removing {removed} tags.")
+        metrics.count_tags(tags)
+        with metrics.span("process"):
+            response = self._process_transcription_response(transcription_response, tags)
+        if metrics.enabled:
+            summary = self._metrics_summary(status_input, metrics)
+            if self.config.metrics_summary_tag:
+                response.data.file.tags.append(
+                    Tag(kind=METRICS_TAG_KIND, name="summary", value=summary)
                 )
+            self._emit_metrics("completed", status_input, summary)
+        cache_key = status_input.get("cache_key")
+        cached = cache_key is not None and self.cache is not None
+        # In-process outputs are only kept by the size-bounded result cache, which a repeat request
+        # reaches through the job ids of its entry; workspace entries keep theirs across processes.
+        cached_output = cached and self.config.cache_mode != CacheMode.MEMORY
+        if cached_output or self.results is not None:
+            output = response.data.dict(by_alias=True, exclude_none=True)
+        if self.results is not None:
+            self.results.put(self._result_key(status_input), {"output": output})
+        if cached:
+            entry = {
+                key: status_input[key]
+                for key in ("transcription_id", "shard", "segments")
+                if key in status_input
+            }
+            if cached_output:
+                entry["output"] = output
+            self.cache.put(cache_key, entry)
+        return response
+
+    def _fail_job(self, status_input: Dict[str, Any], metrics: Metrics = NULL_METRICS) -> None:
+        self.token_pool.finished(self._transcription_ids(status_input))
+        if metrics.enabled:
+            self._emit_metrics("failed", status_input, self._metrics_summary(status_input, metrics))
+        message = "Transcription was unsuccessful. Please contact support of this persists."
+        if self.results is not None:
+            # Failed jobs are remembered too, so status checks do not fetch them again.
+            self.results.put(self._result_key(status_input), {"error": message})
+        cache_key = status_input.get("cache_key")
+        if cache_key is not None and self.cache is not None:
+            self.cache.delete(cache_key)
+        raise SteamshipError(message=message)
+
+    def _check_segment_statuses(
+        self, status_input: Dict[str, Any], metrics: Metrics = NULL_METRICS
+    ) -> InvocableResponse:
+        """Check the jobs of a recording transcribed in segments, and stitch them once all completed.
+
+        Segment transcripts are fetched in parallel; a failed segment fails the whole job.
+        """
+        segments = [dict(segment) for segment in status_input["segments"]]
+        workers = min(len(segments), self.config.http_pool_size)
+
+        def fetch(segment: Dict[str, Any]) -> Dict[str, Any]:
+            return self._segment_transcript(segment, metrics)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Completed segments are only fetched again once every segment has completed.
+            pending = [
+                segment
+                for segment in segments
+                if segment.get("status") != TranscribeJobStatus.COMPLETED
+            ]
+            transcripts = dict(
+                zip(
+                    (segment["transcription_id"] for segment in pending),
+                    executor.map(fetch, pending),
+                )
+            )
+            for segment in pending:
+                segment["status"] = transcripts[segment["transcription_id"]]["status"]
+            statuses = {segment["status"] for segment in segments}
+            logging.info(f"Segment jobs have statuses {sorted(statuses)}.")
+            if TranscribeJobStatus.ERROR in statuses:
+                self._fail_job(status_input, metrics)
+            status_input = {**status_input, "segments": segments}
+            if statuses != {TranscribeJobStatus.COMPLETED}:
+                job_status = (
+                    TranscribeJobStatus.QUEUED
+                    if statuses <= {TranscribeJobStatus.QUEUED, TranscribeJobStatus.COMPLETED}
+                    else TranscribeJobStatus.PROCESSING
+                )
+                return self._running_response(status_input, job_status, metrics)
+            missing = [
+                segment for segment in segments if segment["transcription_id"] not in transcripts
+            ]
+            transcripts.update(
+                zip(
+                    (segment["transcription_id"] for segment in missing),
+                    executor.map(fetch, missing),
+                )
+            )
+        with metrics.span("stitch"):
+            stitched = stitch_transcripts(
+                [transcripts[segment["transcription_id"]] for segment in segments], segments
+            )
+        return self._complete_job(status_input, stitched, metrics=metrics)
+
+    def _segment_transcript(
+        self, segment: Dict[str, Any], metrics: Metrics = NULL_METRICS
+    ) -> Dict[str, Any]:
+        with metrics.span("fetch"):
+            response = self._get_transcript(segment["transcription_id"], shard=segment.get("shard"))
+        metrics.count("polls")
+        metrics.count("response_bytes", len(response.content))
+        with metrics.span("download"):
+            return response.json()
+
+    def _running_response(
+        self,
+        status_input: Dict[str, Any],
+        job_status: Optional[str] = None,
+        metrics: Metrics = NULL_METRICS,
+        retry_in_s: float = 0.0,
+    ) -> InvocableResponse:
+        """Report a running job, with a suggested delay before the next status check.
+
+        The time since the previous check is attributed to the job status AssemblyAI reported, so
+        the status input accumulates how long the job spent queued and processing. The delay is at
+        least retry_in_s, the time calls to AssemblyAI are suspended for.
+        """
+        now = time.time()
+        status_input = {**status_input, "polls": status_input.get("polls", 0) + 1}
+        if job_status is not None:
+            last_checked_at = status_input.get("last_checked_at", status_input.get("submitted_at"))
+            elapsed_s = now - (last_checked_at or now)
+            bucket = "queued_s" if job_status == TranscribeJobStatus.QUEUED else "processing_s"
+            status_input[bucket] = status_input.get(bucket, 0.0) + max(elapsed_s, 0.0)
+            status_input["last_checked_at"] = now
+        next_poll_delay_s = suggest_poll_delay(
+            polls=status_input["polls"],
+            queued_s=status_input.get("queued_s", 0.0),
+            processing_s=status_input.get("processing_s", 0.0),
+            duration_s=status_input.get("audio_duration_s"),
+            min_delay_s=self.config.poll_min_delay_s,
+            max_delay_s=self.config.poll_max_delay_s,
+            jitter=self.config.poll_jitter,
+        )
+        next_poll_delay_s = max(next_poll_delay_s, retry_in_s)
+        if metrics.enabled:
+            status_input["metrics"] = metrics.snapshot()
+            self._emit_metrics(
+                "running", status_input, self._metrics_summary(status_input, metrics)
+            )
+        return InvocableResponse(
+            status=Task(
+                state=TaskState.running,
+                remote_status_message="Transcription job ongoing. "
+                f"Check again in {next_poll_delay_s:.1f}s.",
+                remote_status_input=status_input,
+                remote_status_output={
+                    "job_status": job_status,
+                    "next_poll_delay_s": next_poll_delay_s,
+                },
+            )
+        )
+
+    def _upload_audio_file(
+        self, mime_type: str, data: AudioBody, shard: Optional[str] = None
+    ) -> str:
+        """Upload the audio and return a URL from which AssemblyAI can read it.
+
+        Direct uploads fall back to a workspace signed URL if AssemblyAI rejects the upload.
+        """
+        if self.config.upload_mode == UploadMode.DIRECT:
+            try:
+                return self._upload_to_assemblyai(data, shard)
+            except (SteamshipError, requests.RequestException) as error:
+                logging.warning(f"Direct upload failed, falling back to a signed URL: {error}")
+        return self._upload_to_workspace(mime_type, data)
+
+    def _upload_to_assemblyai(self, data: AudioBody, shard: Optional[str] = None) -> str:
+        """Stream the audio in chunks to the AssemblyAI upload endpoint and return its URL."""
+        response = self._request(
+            "POST",
+            f"{self.BASE_URL}/upload",
+            shard=shard,
+            data=ChunkedBody(data, self.config.upload_chunk_size)
+            if isinstance(data, bytes)
+            else data,
+            headers={"content-type": "application/octet-stream"},
+        )
+        if not response.ok or "upload_url" not in response.json():
+            raise SteamshipError(
+                message=f"Unable to upload audio to AssemblyAI. Status code: {response.status_code}."
             )
+        return response.json()["upload_url"]
 
-    def _upload_audio_file(self, mime_type: str, data: bytes) -> str:
+    def _upload_to_workspace(self, mime_type: str, data: AudioBody) -> str:
         # media_format = mime_type.split("/")[1]
         unique_file_id = f"{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}-{uuid4()}"
-        ship_client = (
-            Steamship(profile="staging")
-            if "docker" in str(self.client.config.api_base)
-            else self.client
-        )
-        workspace = Workspace.get(client=ship_client)
+        workspace = self._workspace()
 
         writing_signed_url = workspace.create_signed_url(
             SignedUrl.Request(
@@ -186,7 +1033,7 @@ class AssemblyAIBlockifier(Blockifier):
                 operation=SignedUrl.Operation.WRITE,
             )
         ).signed_url
-        upload_to_signed_url(writing_signed_url, data)
+        self._upload_to_signed_url(writing_signed_url, data)
 
         return workspace.create_signed_url(
             SignedUrl.Request(
@@ -196,6 +1043,29 @@ class AssemblyAIBlockifier(Blockifier):
             )
         ).signed_url
 
+    def _workspace(self) -> Workspace:
+        ship_client = (
+            Steamship(profile="staging")
+            if "docker" in str(self.client.config.api_base)
+            else self.client
+        )
+        return Workspace.get(client=ship_client)
+
+    def _upload_to_signed_url(self, url: str, data: AudioBody) -> None:
+        """Upload bytes to a workspace signed URL through the shared session."""
+        response = self.session.put(
+            apply_localstack_url_fix(url),
+            data=data,
+            headers={"Content-Type": "application/octet-stream"},
+            timeout=self.config.http_timeout_s,
+        )
+        # S3 returns 204 upon success; we include 200 here for safety.
+        if response.status_code not in (200, 204):
+            raise SteamshipError(
+                message="Unable to upload audio to signed URL. "
+                f"Status code: {response.status_code}. Status text: {response.text}"
+            )
+
     # def _check_mime_type(self, request: PluginRequest) -> str:
     #     mime_type = request.data.default_mime_type
     #     if mime_type not in self.SUPPORTED_MIME_TYPES:
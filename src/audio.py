@@ -0,0 +1,415 @@
+"""Lightweight inspection of audio container headers."""
+import struct
+import sys
+import warnings
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, List, NamedTuple, Optional, Tuple, Union
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop
+except ImportError:  # Removed in Python 3.13; compaction is skipped without it.
+    audioop = None
+
+WAVE_FORMAT_PCM = 1
+# Speech recognition needs no more than 16 kHz mono audio.
+COMPACT_SAMPLE_RATE = 16000
+# Input frames converted at a time when compacting audio.
+COMPACT_CHUNK_FRAMES = 64 * 1024
+MPEG_BITRATES_KBPS = {
+    # (MPEG-1, Layer III) and (MPEG-2/2.5, Layer III) bitrate tables, indexed by the header bits.
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MPEG_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+
+class WavInfo(NamedTuple):
+    """Format of a RIFF/WAVE file and the location of its sample data."""
+
+    audio_format: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    data_offset: int
+    data_size: int
+
+    @property
+    def byte_rate(self) -> int:
+        """Bytes of sample data per second of audio."""
+        return self.sample_rate * self.channels * self.bits_per_sample // 8
+
+
+def parse_wav_header(data: bytes) -> Optional[WavInfo]:
+    """Return the format of a RIFF/WAVE buffer, or None if data is not a WAV file."""
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(data):
+        chunk_id = data[offset : offset + 4]
+        chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", data, offset + 8)
+        elif chunk_id == b"data" and fmt is not None:
+            audio_format, channels, sample_rate, _, _, bits_per_sample = fmt
+            data_size = min(chunk_size, len(data) - offset - 8)
+            return WavInfo(
+                audio_format, channels, sample_rate, bits_per_sample, offset + 8, data_size
+            )
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _mp3_frame(data: bytes, offset: int) -> Optional[Tuple[int, float]]:
+    """Return (length, duration_s) of the MPEG Layer III frame at offset, or None if there is none."""
+    if offset + 4 > len(data):
+        return None
+    header = struct.unpack_from(">I", data, offset)[0]
+    version_bits = (header >> 19) & 0b11
+    layer_bits = (header >> 17) & 0b11
+    bitrate_index = (header >> 12) & 0b1111
+    sample_rate_index = (header >> 10) & 0b11
+    if not (
+        header >> 21 == 0x7FF
+        and version_bits != 0b01
+        and layer_bits == 0b01
+        and 0 < bitrate_index < 15
+        and sample_rate_index < 3
+    ):
+        return None
+    version = {0b11: 1, 0b10: 2, 0b00: 2.5}[version_bits]
+    bitrate = MPEG_BITRATES_KBPS[1 if version == 1 else 2][bitrate_index] * 1000
+    sample_rate = MPEG_SAMPLE_RATES[version][sample_rate_index]
+    samples = 1152 if version == 1 else 576
+    return samples // 8 * bitrate // sample_rate + ((header >> 9) & 1), samples / sample_rate
+
+
+def is_mp3(data: bytes) -> bool:
+    """Return whether data starts like an MP3 file.
+
+    That is an ID3 tag, or an MPEG Layer III frame directly followed by another one. Frame syncs
+    alone occur by chance in any binary data, so other containers would otherwise pass for MP3.
+    """
+    if data[:3] == b"ID3" and len(data) >= 10:
+        return True
+    first = _mp3_frame(data, 0)
+    return first is not None and _mp3_frame(data, first[0]) is not None
+
+
+def _mp3_duration_s(data: bytes) -> Optional[float]:
+    offset = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = data[6] << 21 | data[7] << 14 | data[8] << 7 | data[9]
+        offset = 10 + size
+    sync = data.find(b"\xff", offset)
+    while sync != -1 and sync + 4 <= len(data):
+        header = struct.unpack_from(">I", data, sync)[0]
+        if header >> 21 == 0x7FF:
+            version_bits = (header >> 19) & 0b11
+            bitrate_index = (header >> 12) & 0b1111
+            sample_rate_index = (header >> 10) & 0b11
+            if version_bits != 0b01 and 0 < bitrate_index < 15 and sample_rate_index < 3:
+                break
+        sync = data.find(b"\xff", sync + 1)
+    else:
+        return None
+    version = {0b11: 1, 0b10: 2, 0b00: 2.5}[version_bits]
+    sample_rate = MPEG_SAMPLE_RATES[version][sample_rate_index]
+    samples_per_frame = 1152 if version == 1 else 576
+
+    # A Xing/Info header in the first frame carries the exact frame count, also for VBR files.
+    for tag in (b"Xing", b"Info"):
+        tag_offset = data.find(tag, sync, sync + 64)
+        if tag_offset != -1 and struct.unpack_from(">I", data, tag_offset + 4)[0] & 0x1:
+            frames = struct.unpack_from(">I", data, tag_offset + 8)[0]
+            return frames * samples_per_frame / sample_rate
+
+    bitrate = MPEG_BITRATES_KBPS[1 if version == 1 else 2][bitrate_index] * 1000
+    return (len(data) - sync) * 8 / bitrate
+
+
+def _ogg_duration_s(data: bytes) -> Optional[float]:
+    if b"OpusHead" in data[:128]:
+        head = data.find(b"OpusHead")
+        pre_skip = struct.unpack_from("<H", data, head + 10)[0]
+        sample_rate = 48000
+    elif b"\x01vorbis" in data[:128]:
+        head = data.find(b"\x01vorbis")
+        pre_skip = 0
+        sample_rate = struct.unpack_from("<I", data, head + 12)[0]
+    else:
+        return None
+    last_page = data.rfind(b"OggS")
+    if last_page == -1 or last_page + 14 > len(data) or not sample_rate:
+        return None
+    granule = struct.unpack_from("<q", data, last_page + 6)[0]
+    return max(granule - pre_skip, 0) / sample_rate
+
+
+def _flac_duration_s(data: bytes) -> Optional[float]:
+    if len(data) < 26:
+        return None
+    # STREAMINFO follows the marker and a 4 byte block header; sample rate and total samples are
+    # packed into the 64 bits starting at its 10th byte.
+    packed = struct.unpack_from(">Q", data, 8 + 10)[0]
+    sample_rate = packed >> 44
+    total_samples = packed & 0xFFFFFFFFF
+    return total_samples / sample_rate if sample_rate else None
+
+
+def estimate_duration_s(data: bytes) -> Optional[float]:
+    """Estimate the duration of an audio buffer from its container header.
+
+    Supports WAV, MP3, Ogg (Opus and Vorbis) and FLAC. Returns None for other formats or
+    unreadable headers.
+    """
+    try:
+        wav = parse_wav_header(data)
+        if wav is not None:
+            return wav.data_size / wav.byte_rate if wav.byte_rate else None
+        if data[:4] == b"OggS":
+            return _ogg_duration_s(data)
+        if data[:4] == b"fLaC":
+            return _flac_duration_s(data)
+        return _mp3_duration_s(data) if is_mp3(data) else None
+    except (struct.error, KeyError, IndexError, ZeroDivisionError):
+        return None
+
+
+class AudioSegment(NamedTuple):
+    """A self-contained piece of a longer recording.
+
+    The segment audio starts at ``offset_s`` of the recording. Words starting in
+    ``[cut_start_s, cut_end_s)`` belong to this segment; the rest of its audio overlaps neighbours.
+    """
+
+    data: bytes
+    offset_s: float
+    cut_start_s: float
+    cut_end_s: float
+
+
+def _quietest_frame(wav: WavInfo, data: bytes, start_s: float, end_s: float) -> float:
+    """Return the start time of the quietest 20 ms window of 16-bit PCM audio in [start_s, end_s)."""
+    frame_bytes = wav.channels * 2
+    window = max(int(wav.sample_rate * 0.02), 1) * frame_bytes
+    first = wav.data_offset + int(start_s * wav.sample_rate) * frame_bytes
+    last = min(wav.data_offset + int(end_s * wav.sample_rate) * frame_bytes, len(data) - window)
+    best_offset, best_energy = first, None
+    for offset in range(first, last, window):
+        samples = array("h", data[offset : offset + window])
+        if sys.byteorder == "big":
+            samples.byteswap()
+        energy = sum(sample * sample for sample in samples)
+        if best_energy is None or energy < best_energy:
+            best_offset, best_energy = offset, energy
+    return (best_offset - wav.data_offset) / frame_bytes / wav.sample_rate
+
+
+def _wav_bytes(wav: WavInfo, data: bytes, start_s: float, end_s: float) -> bytes:
+    frame_bytes = wav.channels * wav.bits_per_sample // 8
+    start = wav.data_offset + int(start_s * wav.sample_rate) * frame_bytes
+    end = min(wav.data_offset + int(end_s * wav.sample_rate) * frame_bytes, len(data))
+    return wav_header(wav, end - start) + data[start:end]
+
+
+def wav_header(wav: WavInfo, data_size: int) -> bytes:
+    """Build a canonical 44 byte WAV header for data_size bytes of samples in the format of wav."""
+    block_align = wav.channels * wav.bits_per_sample // 8
+    return (
+        b"RIFF"
+        + struct.pack("<I", 36 + data_size)
+        + b"WAVEfmt "
+        + struct.pack(
+            "<IHHIIHH",
+            16,
+            wav.audio_format,
+            wav.channels,
+            wav.sample_rate,
+            wav.sample_rate * block_align,
+            block_align,
+            wav.bits_per_sample,
+        )
+        + b"data"
+        + struct.pack("<I", data_size)
+    )
+
+
+def _mp3_frames(data: bytes) -> List[Tuple[int, int, float]]:
+    """Return (offset, length, duration_s) of each MPEG Layer III audio frame."""
+    frames = []
+    offset = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        offset = 10 + (data[6] << 21 | data[7] << 14 | data[8] << 7 | data[9])
+    while offset + 4 <= len(data):
+        frame = _mp3_frame(data, offset)
+        if frame is None:
+            offset += 1
+            continue
+        length, duration_s = frame
+        is_info_frame = any(tag in data[offset : offset + 64] for tag in (b"Xing", b"Info"))
+        if not (is_info_frame and not frames):
+            frames.append((offset, length, duration_s))
+        offset += length
+    return frames
+
+
+def _split_mp3(data: bytes, segment_s: float, overlap_s: float) -> Optional[List[AudioSegment]]:
+    frames = _mp3_frames(data)
+    if not frames:
+        return None
+    starts = [0.0]
+    for _, _, duration in frames:
+        starts.append(starts[-1] + duration)
+    total_s = starts[-1]
+    cuts = [0.0]
+    while cuts[-1] + segment_s < total_s:
+        # Snap the cut to the nearest frame start.
+        target = cuts[-1] + segment_s
+        cuts.append(starts[min(bisect_left(starts, target), len(frames) - 1)])
+    cuts.append(total_s)
+
+    segments = []
+    for cut_start, cut_end in zip(cuts, cuts[1:]):
+        first = max(bisect_right(starts, cut_start - overlap_s) - 1, 0)
+        last = min(bisect_left(starts, cut_end + overlap_s), len(frames))
+        begin, end = frames[first][0], frames[last - 1][0] + frames[last - 1][1]
+        segments.append(AudioSegment(data[begin:end], starts[first], cut_start, cut_end))
+    return segments
+
+
+def _split_wav(wav: WavInfo, data: bytes, segment_s: float, overlap_s: float) -> List[AudioSegment]:
+    total_s = wav.data_size / wav.byte_rate
+    search_s = min(segment_s / 10, 10.0)
+    cuts = [0.0]
+    while cuts[-1] + segment_s < total_s:
+        target = cuts[-1] + segment_s
+        if wav.audio_format == 1 and wav.bits_per_sample == 16:
+            cuts.append(_quietest_frame(wav, data, target - search_s, target + search_s))
+        else:
+            cuts.append(target)
+    cuts.append(total_s)
+
+    segments = []
+    for cut_start, cut_end in zip(cuts, cuts[1:]):
+        offset_s = max(cut_start - overlap_s, 0.0)
+        audio = _wav_bytes(wav, data, offset_s, cut_end + overlap_s)
+        segments.append(AudioSegment(audio, offset_s, cut_start, cut_end))
+    return segments
+
+
+def split_audio(data: bytes, segment_s: float, overlap_s: float) -> Optional[List[AudioSegment]]:
+    """Cut a recording into segments of about segment_s seconds overlapping by overlap_s.
+
+    16-bit PCM WAV files are cut at the quietest moment near each target cut; other WAV files at the
+    target itself, and MP3 files at the nearest frame boundary. Returns None for other formats.
+    """
+    try:
+        wav = parse_wav_header(data)
+        if wav is not None:
+            return _split_wav(wav, data, segment_s, overlap_s) if wav.byte_rate else None
+        if not is_mp3(data):
+            return None
+        return _split_mp3(data, segment_s, overlap_s)
+    except (struct.error, KeyError, IndexError, ZeroDivisionError):
+        return None
+
+
+class CompactWav:
+    """Re-iterable 16-bit mono WAV body at no more than 16 kHz, converted from a PCM WAV buffer.
+
+    The samples are downmixed and resampled one chunk at a time while the body is iterated, so only
+    a chunk of converted audio is held at once and the body can be replayed when a request is
+    retried. The output has exactly the duration of the input, so word times are unchanged.
+    """
+
+    def __init__(self, wav: WavInfo, data: bytes, chunk_frames: int = COMPACT_CHUNK_FRAMES):
+        self.wav = wav
+        size = wav.data_size - wav.data_size % self._frame_bytes
+        self.data = memoryview(data)[wav.data_offset : wav.data_offset + size]
+        self.chunk_frames = chunk_frames
+        self.sample_rate = min(wav.sample_rate, COMPACT_SAMPLE_RATE)
+        self.frames = size // self._frame_bytes * self.sample_rate // wav.sample_rate
+        self.header = wav_header(WavInfo(1, 1, self.sample_rate, 16, 44, 0), self.frames * 2)
+
+    @property
+    def _frame_bytes(self) -> int:
+        return self.wav.channels * self.wav.bits_per_sample // 8
+
+    def _convert(self, chunk: bytes, state: Any) -> Tuple[bytes, Any]:
+        width = self.wav.bits_per_sample // 8
+        if width == 1:
+            # 8-bit WAV samples are unsigned.
+            chunk = audioop.bias(chunk, 1, -128)
+        elif sys.byteorder == "big":
+            chunk = audioop.byteswap(chunk, width)
+        chunk = audioop.lin2lin(chunk, width, 2)
+        if self.wav.channels == 2:
+            chunk = audioop.tomono(chunk, 2, 0.5, 0.5)
+        elif self.wav.channels > 2:
+            samples = array("h", chunk)
+            chunk = array(
+                "h",
+                (
+                    sum(samples[frame : frame + self.wav.channels]) // self.wav.channels
+                    for frame in range(0, len(samples), self.wav.channels)
+                ),
+            ).tobytes()
+        if self.sample_rate != self.wav.sample_rate:
+            chunk, state = audioop.ratecv(
+                chunk, 2, 1, self.wav.sample_rate, self.sample_rate, state
+            )
+        if sys.byteorder == "big":
+            chunk = audioop.byteswap(chunk, 2)
+        return chunk, state
+
+    def __iter__(self):
+        yield self.header
+        remaining = self.frames * 2
+        state = None
+        step = self.chunk_frames * self._frame_bytes
+        for offset in range(0, len(self.data), step):
+            converted, state = self._convert(self.data[offset : offset + step], state)
+            converted = converted[:remaining]
+            remaining -= len(converted)
+            if converted:
+                yield converted
+        if remaining:
+            # Resampling may come up a few samples short of the exact duration.
+            yield bytes(remaining)
+
+    def __len__(self) -> int:
+        return len(self.header) + self.frames * 2
+
+
+# Audio bytes to upload, either as received or compacted.
+AudioBody = Union[bytes, CompactWav]
+
+
+def compact_audio(data: bytes) -> Optional[CompactWav]:
+    """Return a smaller 16 kHz mono 16-bit version of an integer PCM WAV file.
+
+    Returns None when the audio is not integer PCM WAV, is already compact, or cannot be converted
+    because audioop is unavailable; such audio is uploaded as it is.
+    """
+    if audioop is None:
+        return None
+    wav = parse_wav_header(data)
+    if (
+        wav is None
+        or wav.audio_format != WAVE_FORMAT_PCM
+        or wav.bits_per_sample not in (8, 16, 24, 32)
+        or not wav.channels
+        or not wav.sample_rate
+    ):
+        return None
+    if wav.channels == 1 and wav.bits_per_sample <= 16 and wav.sample_rate <= COMPACT_SAMPLE_RATE:
+        return None
+    return CompactWav(wav, data)
@@ -0,0 +1,94 @@
+"""Concurrent blockification of many audio inputs with a cap on in-flight jobs."""
+import heapq
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from steamship.base import Task, TaskState
+from steamship.invocable import InvocableResponse
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+from steamship.plugin.request import PluginRequest
+
+
+class BatchResult(NamedTuple):
+    """Outcome of one batch input: the finished response, or the error that ended its job."""
+
+    key: Hashable
+    response: Optional[InvocableResponse]
+    error: Optional[Exception]
+
+
+def blockify_batch(
+    run: Callable[[PluginRequest], InvocableResponse],
+    inputs: Iterable[Tuple[Hashable, bytes]],
+    max_in_flight: int,
+    max_workers: Optional[int] = None,
+    clock: Callable[[], float] = time.monotonic,
+) -> Iterator[BatchResult]:
+    """Blockify (key, audio bytes) inputs concurrently, yielding results as each job finishes.
+
+    Each input goes through ``run`` exactly as the engine would drive it: a submission request, then
+    status-check requests spaced by the ``next_poll_delay_s`` hint of each running task. At most
+    ``max_in_flight`` inputs are between submission and completion at any time; uploads, submissions
+    and status checks run on a thread pool of ``max_workers`` threads (default ``max_in_flight``).
+    """
+    inputs = iter(inputs)
+    in_flight = 0
+    futures: Dict[Future, Hashable] = {}
+    # Running jobs ordered by when to check them next: (due, sequence, key, task).
+    due: List[Tuple[float, int, Hashable, Task]] = []
+    sequence = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers or max_in_flight) as executor:
+        while True:
+            while in_flight < max_in_flight:
+                item = next(inputs, None)
+                if item is None:
+                    break
+                key, data = item
+                request = PluginRequest(data=RawDataPluginInput(data=data))
+                futures[executor.submit(run, request)] = key
+                in_flight += 1
+
+            now = clock()
+            while due and due[0][0] <= now:
+                _, _, key, task = heapq.heappop(due)
+                request = PluginRequest(is_status_check=True, status=task)
+                futures[executor.submit(run, request)] = key
+
+            if not futures and not due:
+                return
+            timeout = max(due[0][0] - now, 0) if due else None
+            done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                key = futures.pop(future)
+                try:
+                    response = future.result()
+                except Exception as error:
+                    in_flight -= 1
+                    yield BatchResult(key, None, error)
+                    continue
+                if response.status is not None and response.status.state == TaskState.running:
+                    delay = _next_poll_delay(response.status)
+                    sequence += 1
+                    heapq.heappush(due, (clock() + delay, sequence, key, response.status))
+                else:
+                    in_flight -= 1
+                    yield BatchResult(key, response, None)
+
+
+def _next_poll_delay(task: Task) -> float:
+    output: Dict[str, Any] = task.remote_status_output or {}
+    return float(output.get("next_poll_delay_s") or 1.0)
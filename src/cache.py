@@ -0,0 +1,276 @@
+"""Content-addressed cache of transcription jobs and their finished outputs."""
+import hashlib
+import json
+import logging
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import requests
+from steamship.data.workspace import SignedUrl, Workspace
+from steamship.utils.url import apply_localstack_url_fix
+
+from registry import Registry
+
+
+class CacheMode(str, Enum):
+    """Where transcription cache entries are stored."""
+
+    NONE = "none"
+    MEMORY = "memory"
+    WORKSPACE = "workspace"
+
+
+class CacheStats:
+    """Hit and miss counters of a cache."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups that were served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def record(self, hit: bool) -> None:
+        """Count a single lookup."""
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def __repr__(self) -> str:
+        return f"CacheStats(hits={self.hits}, misses={self.misses}, hit_rate={self.hit_rate:.2f})"
+
+
+class TranscriptionCache(ABC):
+    """Store mapping a content key to a transcription entry.
+
+    Entries are JSON-style dicts holding a ``transcription_id`` and, once the job completed, the
+    serialized ``output`` of the blockifier.
+    """
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the entry stored under key, or None, and update the hit counters."""
+        entry = self._get(key)
+        self.stats.record(entry is not None)
+        logging.info(f"Transcription cache {'hit' if entry else 'miss'} for {key}: {self.stats}")
+        return entry
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Store entry under key, replacing any previous entry."""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove the entry stored under key, if any."""
+        pass
+
+
+class InMemoryCache(TranscriptionCache):
+    """Process-local LRU cache whose entries expire after ttl_s seconds."""
+
+    def __init__(self, max_entries: int, ttl_s: float):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            stored_at, entry = item
+            if time.monotonic() - stored_at > self.ttl_s:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Store entry under key, evicting the least recently used entries beyond max_entries."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """Remove the entry stored under key, if any."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CompressedLRUCache(TranscriptionCache):
+    """Process-local LRU cache of zlib-compressed JSON entries, bounded by their total size.
+
+    Entries expire after ttl_s seconds; entries larger than max_bytes on their own are not stored.
+    """
+
+    def __init__(self, max_bytes: int, ttl_s: float):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            stored_at, data = item
+            if time.monotonic() - stored_at > self.ttl_s:
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+        return json.loads(zlib.decompress(data))
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Store entry under key, evicting the least recently used entries beyond max_bytes."""
+        data = zlib.compress(json.dumps(entry, separators=(",", ":")).encode("utf-8"), 1)
+        with self._lock:
+            self._pop(key)
+            if len(data) > self.max_bytes:
+                return
+            self._entries[key] = (time.monotonic(), data)
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, key: str) -> None:
+        """Remove the entry stored under key, if any."""
+        with self._lock:
+            self._pop(key)
+
+    def _pop(self, key: str) -> None:
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self.size -= len(item[1])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class WorkspaceCache(TranscriptionCache):
+    """Persistent cache storing one JSON document per key in the workspace plugin-data bucket.
+
+    Entries older than ttl_s seconds are treated as misses. Bucket requests time out after
+    timeout_s seconds; reads that fail are misses and writes that fail are logged and dropped.
+    """
+
+    def __init__(
+        self,
+        workspace: Workspace,
+        session: requests.Session,
+        ttl_s: float,
+        prefix: str = "transcription-cache",
+        timeout_s: Optional[float] = None,
+    ):
+        super().__init__()
+        self.workspace = workspace
+        self.session = session
+        self.ttl_s = ttl_s
+        self.prefix = prefix
+        self.timeout_s = timeout_s
+
+    def _signed_url(self, key: str, operation: SignedUrl.Operation) -> str:
+        return apply_localstack_url_fix(
+            self.workspace.create_signed_url(
+                SignedUrl.Request(
+                    bucket=SignedUrl.Bucket.PLUGIN_DATA,
+                    filepath=f"{self.prefix}/{key}.json",
+                    operation=operation,
+                )
+            ).signed_url
+        )
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.session.get(
+                self._signed_url(key, SignedUrl.Operation.READ), timeout=self.timeout_s
+            )
+        except requests.RequestException as error:
+            logging.warning(f"Could not read transcription cache entry {key}: {error}")
+            return None
+        if response.status_code != 200:
+            return None
+        try:
+            document = response.json()
+        except ValueError:
+            return None
+        if time.time() - document.get("stored_at", 0) > self.ttl_s:
+            return None
+        return document.get("entry")
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Write entry under key to the workspace bucket."""
+        self._write(key, {"stored_at": time.time(), "entry": entry})
+
+    def delete(self, key: str) -> None:
+        """Overwrite the entry under key with a tombstone, since signed URLs cannot delete."""
+        self._write(key, {"stored_at": 0, "entry": None})
+
+    def _write(self, key: str, document: Dict[str, Any]) -> None:
+        try:
+            response = self.session.put(
+                self._signed_url(key, SignedUrl.Operation.WRITE),
+                data=json.dumps(document).encode("utf-8"),
+                headers={"Content-Type": "application/octet-stream"},
+                timeout=self.timeout_s,
+            )
+        except requests.RequestException as error:
+            logging.warning(f"Could not write transcription cache entry {key}: {error}")
+            return
+        if response.status_code not in (200, 204):
+            logging.warning(
+                f"Could not write transcription cache entry {key}: HTTP {response.status_code}"
+            )
+
+
+_memory_caches: Registry[InMemoryCache] = Registry()
+_result_caches: Registry[CompressedLRUCache] = Registry()
+
+
+def get_memory_cache(
+    max_entries: int, ttl_s: float, namespace: str = "transcriptions"
+) -> InMemoryCache:
+    """Return the process-wide in-memory cache for the given settings, creating it on first use."""
+    return _memory_caches.get(
+        (namespace, max_entries, ttl_s), lambda: InMemoryCache(max_entries=max_entries, ttl_s=ttl_s)
+    )
+
+
+def get_result_cache(max_bytes: int, ttl_s: float) -> CompressedLRUCache:
+    """Return the process-wide cache of job results for the given settings, creating it on first use."""
+    return _result_caches.get(
+        (max_bytes, ttl_s), lambda: CompressedLRUCache(max_bytes=max_bytes, ttl_s=ttl_s)
+    )
+
+
+def content_key(data: bytes, config: Dict[str, Any], exclude: Iterable[str] = ()) -> str:
+    """Hash audio bytes together with the config fields that affect the transcription output."""
+    digest = hashlib.sha256(data)
+    effective_config = {k: v for k, v in config.items() if k not in set(exclude)}
+    digest.update(json.dumps(effective_config, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
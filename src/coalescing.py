@@ -0,0 +1,84 @@
+"""Merging of runs of same-named span tags, such as a topic label repeated over adjacent fragments."""
+from typing import Dict, List, Sequence, Tuple
+
+from steamship import Tag
+
+# Tag kinds whose spans partition the transcript into fragments or sentences.
+COALESCED_KINDS = ("topic", "sentiment")
+
+
+def _times(tag: Tag) -> Tuple[int, int]:
+    return tag.value["start_time"], tag.value["end_time"]
+
+
+def _runs(tags: Sequence[Tag], kind: str, max_gap_ms: int) -> List[List[Tag]]:
+    """Group the tags of a kind into runs of the same name over consecutive spans.
+
+    Spans are the distinct time ranges of the kind, such as topic fragments or sentences. A name
+    present in two consecutive spans continues its run, unless more than max_gap_ms of audio
+    separates the run from the next span.
+    """
+    kind_tags = sorted(
+        (
+            tag
+            for tag in tags
+            if tag.kind == kind
+            and isinstance(tag.value, dict)
+            and tag.value.get("start_time") is not None
+            and tag.value.get("end_time") is not None
+        ),
+        key=_times,
+    )
+    span_index = {span: ix for ix, span in enumerate(sorted({_times(tag) for tag in kind_tags}))}
+    runs: List[List[Tag]] = []
+    # Name -> (index of the last span of its open run, end time of the run, the run).
+    open_runs: Dict[str, Tuple[int, int, List[Tag]]] = {}
+    for tag in kind_tags:
+        span = span_index[_times(tag)]
+        start_time, end_time = _times(tag)
+        last_span, run_end, run = open_runs.get(tag.name, (-2, 0, []))
+        if span - last_span > 1 or start_time > run_end + max_gap_ms:
+            run = []
+            runs.append(run)
+            run_end = end_time
+        run.append(tag)
+        open_runs[tag.name] = (span, max(run_end, end_time), run)
+    return runs
+
+
+def _merge(run: List[Tag]) -> Tag:
+    confidences = [tag.value.get("confidence") or 0 for tag in run]
+    spans = [tag for tag in run if tag.start_idx is not None and tag.end_idx is not None]
+    return Tag.construct(
+        kind=run[0].kind,
+        name=run[0].name,
+        start_idx=min(tag.start_idx for tag in spans) if spans else None,
+        end_idx=max(tag.end_idx for tag in spans) if spans else None,
+        value={
+            "confidence": max(confidences),
+            "mean_confidence": sum(confidences) / len(confidences),
+            "start_time": min(tag.value["start_time"] for tag in run),
+            "end_time": max(tag.value["end_time"] for tag in run),
+            "count": len(run),
+        },
+    )
+
+
+def coalesce_tags(
+    tags: Sequence[Tag], max_gap_ms: int, kinds: Sequence[str] = COALESCED_KINDS
+) -> Tuple[List[Tag], int]:
+    """Merge runs of same-named tags of the given kinds over adjacent or overlapping spans.
+
+    A merged tag covers the times and characters of its run; its confidence is the highest of the
+    run, with the mean and the number of merged tags alongside. Merged tags take the place of the
+    first tag of their run. Return the tags and the number of tags removed.
+    """
+    merged: Dict[int, Tag] = {}
+    removed = set()
+    for kind in kinds:
+        for run in _runs(tags, kind, max_gap_ms):
+            if len(run) > 1:
+                merged[id(run[0])] = _merge(run)
+                removed.update(id(tag) for tag in run[1:])
+    coalesced = [merged.get(id(tag), tag) for tag in tags if id(tag) not in removed]
+    return coalesced, len(removed)
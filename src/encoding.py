@@ -0,0 +1,40 @@
+"""Compact encoding of integer arrays for tag values."""
+import base64
+from typing import Iterable, List
+
+
+def pack_ints(values: Iterable[int]) -> str:
+    """Pack integers as base64 of zigzag LEB128 varints of their successive differences.
+
+    Sorted or slowly varying sequences, such as word offsets and times, pack to one or two bytes per
+    value.
+    """
+    packed = bytearray()
+    previous = 0
+    for value in values:
+        delta = value - previous
+        previous = value
+        zigzag = (delta << 1) ^ (delta >> 63)
+        while zigzag > 0x7F:
+            packed.append((zigzag & 0x7F) | 0x80)
+            zigzag >>= 7
+        packed.append(zigzag)
+    return base64.b64encode(bytes(packed)).decode("ascii")
+
+
+def unpack_ints(packed: str) -> List[int]:
+    """Invert `pack_ints`."""
+    values = []
+    previous = 0
+    zigzag = 0
+    shift = 0
+    for byte in base64.b64decode(packed):
+        zigzag |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += (zigzag >> 1) ^ -(zigzag & 1)
+        values.append(previous)
+        zigzag = 0
+        shift = 0
+    return values
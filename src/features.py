@@ -0,0 +1,92 @@
+"""Registry of transcript features, tying AssemblyAI request flags to the parsers of their tags."""
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from steamship import SteamshipError
+
+from parsers import (
+    parse_chapters,
+    parse_entities,
+    parse_sentiments,
+    parse_speaker_tags,
+    parse_timestamps,
+    parse_topic_summaries,
+    parse_topics,
+)
+
+
+class Feature(NamedTuple):
+    """A kind of tag, the parser that produces it and the request flag AssemblyAI needs for it.
+
+    Features without a request flag are parsed from data every transcript includes.
+    """
+
+    tag_kind: str
+    request_flag: Optional[str]
+    parser: Callable
+
+
+# In the order in which their tags are emitted.
+FEATURES = (
+    Feature("timestamp", None, parse_timestamps),
+    Feature("speaker", "speaker_labels", parse_speaker_tags),
+    Feature("topic", "iab_categories", parse_topics),
+    Feature("topic_summary", "iab_categories", parse_topic_summaries),
+    Feature("sentiment", "sentiment_analysis", parse_sentiments),
+    Feature("chapter", "auto_chapters", parse_chapters),
+    Feature("entity", "entity_detection", parse_entities),
+)
+FEATURES_BY_KIND = {feature.tag_kind: feature for feature in FEATURES}
+REQUEST_FLAGS = tuple(
+    dict.fromkeys(feature.request_flag for feature in FEATURES if feature.request_flag)
+)
+
+# Names that select several tag kinds at once.
+FEATURE_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "timestamps": ("timestamp",),
+    "speakers": ("speaker",),
+    "topics": ("topic", "topic_summary"),
+    "sentiments": ("sentiment",),
+    "chapters": ("chapter",),
+    "entities": ("entity",),
+    "audio_intelligence": ("topic", "topic_summary", "sentiment", "chapter", "entity"),
+}
+
+
+class FeaturePlan(NamedTuple):
+    """The AssemblyAI request flags and the parsers needed for a set of tag kinds."""
+
+    tag_kinds: Tuple[str, ...]
+    request_flags: Dict[str, bool]
+    parsers: Tuple[Callable, ...]
+
+
+def _expand(name: str) -> Tuple[str, ...]:
+    if name in FEATURE_GROUPS:
+        return FEATURE_GROUPS[name]
+    if name in FEATURES_BY_KIND:
+        return (name,)
+    known = sorted({*FEATURE_GROUPS, *FEATURES_BY_KIND})
+    raise SteamshipError(message=f"Unknown feature {name!r}. Known features: {', '.join(known)}")
+
+
+def plan_features(names: Iterable[str], default: Iterable[str] = ()) -> FeaturePlan:
+    """Plan the request flags and parsers for features named by tag kind or group.
+
+    Names prefixed with ``-`` are excluded. If only exclusions are given, they apply to the default
+    features. Request flags are only set for features whose tags are kept, and every flag is sent
+    explicitly so AssemblyAI does no work that is not parsed.
+    """
+    names = [name.strip() for name in names if name.strip()]
+    included = [name for name in names if not name.startswith("-")]
+    kinds = {kind for name in (included or default) for kind in _expand(name)}
+    for name in names:
+        if name.startswith("-"):
+            kinds -= set(_expand(name[1:]))
+
+    features = [feature for feature in FEATURES if feature.tag_kind in kinds]
+    enabled = {feature.request_flag for feature in features}
+    return FeaturePlan(
+        tag_kinds=tuple(feature.tag_kind for feature in features),
+        request_flags={flag: flag in enabled for flag in REQUEST_FLAGS},
+        parsers=tuple(feature.parser for feature in features),
+    )
@@ -0,0 +1,22 @@
+"""Plugin input that references stored audio by URL instead of carrying its bytes."""
+from typing import Optional
+
+from steamship.base.model import CamelModel
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+
+
+class AudioReferenceInput(RawDataPluginInput):
+    """Raw data input that keeps the ``url`` the engine sends for large files, unfetched.
+
+    `RawDataPluginInput` downloads the URL into ``data`` when it is constructed. This input leaves
+    ``data`` empty instead, so the URL can be handed to AssemblyAI and the audio never passes through
+    the plugin. Inputs carrying their bytes are decoded as usual.
+    """
+
+    url: Optional[str] = None
+
+    def __init__(self, **kwargs):
+        if kwargs.get("url") and kwargs.get("data") is None:
+            CamelModel.__init__(self, **kwargs)
+        else:
+            super().__init__(**kwargs)
@@ -0,0 +1,213 @@
+"""Interval index over the tags of a block, for lookups by playback time or character offset.
+
+The index is a compact tag holding two implicit augmented interval trees, one over tag times and one
+over tag character spans. `IntervalIndex` loads it once and then answers overlap queries in
+logarithmic time plus the number of matches, instead of scanning every tag.
+"""
+import json
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from steamship import Block, Tag
+
+from encoding import pack_ints, unpack_ints
+from parsers import COLUMNAR_TIMESTAMP_KIND, decode_columnar_timestamps
+
+INTERVAL_INDEX_KIND = "interval_index"
+INTERVAL_INDEX_ENCODING = "implicit-interval-tree"
+# Subtrees of at most this many levels are scanned linearly by queries.
+SCAN_LEVELS = 3
+
+
+class IntervalTree:
+    """Implicit augmented interval tree over half-open integer intervals sorted by start.
+
+    The sorted array is itself the tree, in the layout of cgranges: the node at index ``i`` of level
+    ``k`` has its children at ``i -/+ 2**(k-1)``, and each node holds the maximum end of its subtree.
+    """
+
+    def __init__(self, starts: Sequence[int], ends: Sequence[int]):
+        self.starts = starts
+        self.ends = ends
+        self.max_ends = array("q", ends)
+        self.max_level = self._augment()
+
+    def _augment(self) -> int:
+        n = len(self.starts)
+        if not n:
+            return -1
+        max_ends = self.max_ends
+        last_i = n - 1 - (n - 1) % 2
+        last = max_ends[last_i]
+        k = 1
+        while 1 << k <= n:
+            x = 1 << (k - 1)
+            for i in range((x << 1) - 1, n, x << 2):
+                right = max_ends[i + x] if i + x < n else last
+                max_ends[i] = max(max_ends[i], max_ends[i - x], right)
+            # Move last_i to its parent, the rightmost node of level k.
+            last_i = last_i - x if last_i >> k & 1 else last_i + x
+            if last_i < n and max_ends[last_i] > last:
+                last = max_ends[last_i]
+            k += 1
+        return k - 1
+
+    def _scan(self, first: int, k: int, start: int, end: int, found: List[int]) -> None:
+        """Collect the overlapping intervals of the level k subtree starting at first."""
+        for i in range(first, min(first + (1 << (k + 1)) - 1, len(self.starts))):
+            if self.starts[i] >= end:
+                break
+            if start < self.ends[i]:
+                found.append(i)
+
+    def overlapping(self, start: int, end: int) -> List[int]:
+        """Return the positions of the intervals overlapping [start, end), in start order."""
+        n = len(self.starts)
+        found = []
+        if self.max_level < 0:
+            return found
+        stack = [(self.max_level, (1 << self.max_level) - 1, False)]
+        while stack:
+            k, x, left_done = stack.pop()
+            if k <= SCAN_LEVELS:
+                self._scan(x >> k << k, k, start, end, found)
+            elif not left_done:
+                stack.append((k, x, True))
+                left = x - (1 << (k - 1))
+                if left >= n or self.max_ends[left] > start:
+                    stack.append((k - 1, left, False))
+            elif x < n and self.starts[x] < end:
+                if start < self.ends[x]:
+                    found.append(x)
+                stack.append((k - 1, x + (1 << (k - 1)), False))
+        return sorted(found)
+
+
+def _tree_value(intervals: List[Tuple[int, int, int]]) -> Dict[str, str]:
+    intervals.sort()
+    return {
+        "starts": pack_ints(start for start, _, _ in intervals),
+        "lengths": pack_ints(end - start for start, end, _ in intervals),
+        "entries": pack_ints(entry for _, _, entry in intervals),
+    }
+
+
+def _indexed_tags(tags: Sequence[Tag]) -> List[Tag]:
+    """Return the tags an index refers to by position: every tag but the index itself."""
+    return [tag for tag in tags if tag.kind != INTERVAL_INDEX_KIND]
+
+
+def _fingerprint(tags: Sequence[Tag]) -> int:
+    """Checksum the kind, name and span of each tag in order, to detect a stale index."""
+    keys = [(tag.kind, tag.name, tag.start_idx, tag.end_idx) for tag in tags]
+    return zlib.crc32(json.dumps(keys).encode("utf-8"))
+
+
+def _entries(tags: Sequence[Tag]) -> Iterable[Tuple[int, int, Tag]]:
+    """Yield (tag position, word ordinal, tag) for every tag, expanding columnar timestamps."""
+    for position, tag in enumerate(tags):
+        if tag.kind == COLUMNAR_TIMESTAMP_KIND:
+            for word, word_tag in enumerate(decode_columnar_timestamps(tag)):
+                yield position, word, word_tag
+        else:
+            yield position, -1, tag
+
+
+def build_interval_index(tags: Sequence[Tag]) -> Optional[Tag]:
+    """Build the interval index tag of a block's tags, or None if no tag has a time or span.
+
+    Entries refer to tags by position among the block's other tags, and the index records a
+    fingerprint of those tags so that loading it after they are reordered, filtered or edited fails.
+    The words of a columnar timestamp tag are indexed individually. Tag times are inclusive and
+    stored half-open.
+    """
+    tags = _indexed_tags(tags)
+    positions, words = [], []
+    times: List[Tuple[int, int, int]] = []
+    chars: List[Tuple[int, int, int]] = []
+    for position, word, tag in _entries(tags):
+        value = tag.value if isinstance(tag.value, dict) else {}
+        has_time = value.get("start_time") is not None and value.get("end_time") is not None
+        has_span = tag.start_idx is not None and tag.end_idx is not None
+        if not has_time and not has_span:
+            continue
+        entry = len(positions)
+        positions.append(position)
+        words.append(word)
+        if has_time:
+            times.append((value["start_time"], value["end_time"] + 1, entry))
+        if has_span:
+            chars.append((tag.start_idx, max(tag.end_idx, tag.start_idx + 1), entry))
+    if not positions:
+        return None
+    return Tag.construct(
+        kind=INTERVAL_INDEX_KIND,
+        name=INTERVAL_INDEX_ENCODING,
+        start_idx=None,
+        end_idx=None,
+        value={
+            "count": len(positions),
+            "fingerprint": _fingerprint(tags),
+            "positions": pack_ints(positions),
+            "words": pack_ints(words),
+            "time": _tree_value(times),
+            "chars": _tree_value(chars),
+        },
+    )
+
+
+class IntervalIndex:
+    """Query helper over the interval index tag of a block.
+
+    Lookups return the indexed tags, with the words of columnar timestamp tags expanded into
+    per-word timestamp tags named from the block text. Loading fails with a ValueError if the
+    block's tags changed since the index was built.
+    """
+
+    def __init__(self, block: Block):
+        self.block = block
+        index = next((tag for tag in block.tags if tag.kind == INTERVAL_INDEX_KIND), None)
+        if index is None:
+            raise ValueError("The block has no interval index tag.")
+        self.tags = _indexed_tags(block.tags)
+        if _fingerprint(self.tags) != index.value.get("fingerprint"):
+            raise ValueError(
+                "The interval index is stale: the block's tags changed after it was built."
+            )
+        self.positions = unpack_ints(index.value["positions"])
+        self.words = unpack_ints(index.value["words"])
+        self.time_tree, self.time_entries = self._load(index.value["time"])
+        self.char_tree, self.char_entries = self._load(index.value["chars"])
+        self._decoded: Dict[int, List[Tag]] = {}
+
+    @staticmethod
+    def _load(value: Dict[str, str]) -> Tuple[IntervalTree, List[int]]:
+        starts = array("q", unpack_ints(value["starts"]))
+        ends = array(
+            "q", (start + length for start, length in zip(starts, unpack_ints(value["lengths"])))
+        )
+        return IntervalTree(starts, ends), unpack_ints(value["entries"])
+
+    def _tag(self, entry: int) -> Tag:
+        tag = self.tags[self.positions[entry]]
+        word = self.words[entry]
+        if word < 0:
+            return tag
+        if self.positions[entry] not in self._decoded:
+            self._decoded[self.positions[entry]] = decode_columnar_timestamps(tag, self.block.text)
+        return self._decoded[self.positions[entry]][word]
+
+    def at_time(self, time_ms: int) -> List[Tag]:
+        """Return the tags whose time range covers time_ms."""
+        return self.overlapping_time(time_ms, time_ms)
+
+    def overlapping_time(self, start_ms: int, end_ms: int) -> List[Tag]:
+        """Return the tags whose time range overlaps [start_ms, end_ms], by start time."""
+        positions = self.time_tree.overlapping(start_ms, end_ms + 1)
+        return [self._tag(self.time_entries[position]) for position in positions]
+
+    def overlapping_chars(self, start_idx: int, end_idx: int) -> List[Tag]:
+        """Return the tags whose span overlaps characters [start_idx, end_idx), by start offset."""
+        positions = self.char_tree.overlapping(start_idx, max(end_idx, start_idx + 1))
+        return [self._tag(self.char_entries[position]) for position in positions]
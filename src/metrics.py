@@ -0,0 +1,97 @@
+"""Timing spans and counters of the blockify pipeline, reported through a pluggable hook."""
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, Optional
+
+from steamship import Tag
+
+from parsers import COLUMNAR_TIMESTAMP_KIND
+
+# Receives one event per blockifier invocation, see `AssemblyAIBlockifier.metrics_hook`.
+MetricsHook = Callable[[Dict[str, Any]], None]
+
+METRICS_TAG_KIND = "metrics"
+
+
+class Metrics:
+    """Spans and counters of one transcription job.
+
+    Spans accumulate the seconds spent in each phase, and counters accumulate quantities such as
+    bytes or tags. Both carry over between the invocations of a job through `snapshot`. Phases that
+    run on several threads at once, like segment uploads, accumulate the time of every thread.
+    """
+
+    enabled = True
+
+    def __init__(self, snapshot: Optional[Dict[str, Any]] = None):
+        snapshot = snapshot or {}
+        self.spans: Dict[str, float] = dict(snapshot.get("spans") or {})
+        self.counters: Dict[str, int] = dict(snapshot.get("counters") or {})
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.perf_counter() - start)
+
+    def span(self, name: str) -> ContextManager[None]:
+        """Time the enclosed block as part of the named phase."""
+        return self._span(name)
+
+    def add_span(self, name: str, seconds: float) -> None:
+        """Add seconds to the named phase."""
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Add value to the named counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def count_bytes(self, name: str, chunks: Iterable[bytes]) -> Iterable[bytes]:
+        """Pass chunks through, adding their length to the named counter."""
+        for chunk in chunks:
+            self.count(name, len(chunk))
+            yield chunk
+
+    def count_tags(self, tags: Iterable[Tag]) -> None:
+        """Count tags per kind as ``tags.<kind>``, and the words they time as ``words``."""
+        for tag in tags:
+            self.count(f"tags.{tag.kind}")
+            if tag.kind == "timestamp":
+                self.count("words")
+            elif tag.kind == COLUMNAR_TIMESTAMP_KIND:
+                self.count("words", tag.value["count"])
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the spans and counters as a JSON-serializable dict."""
+        with self._lock:
+            return {"spans": dict(self.spans), "counters": dict(self.counters)}
+
+
+class _NullMetrics(Metrics):
+    """Metrics that record nothing, used when no hook or summary tag needs them."""
+
+    enabled = False
+
+    def span(self, name: str) -> ContextManager[None]:
+        return nullcontext()
+
+    def add_span(self, name: str, seconds: float) -> None:
+        pass
+
+    def count(self, name: str, value: int = 1) -> None:
+        pass
+
+    def count_bytes(self, name: str, chunks: Iterable[bytes]) -> Iterable[bytes]:
+        return chunks
+
+    def count_tags(self, tags: Iterable[Tag]) -> None:
+        pass
+
+
+NULL_METRICS = _NullMetrics()
@@ -1,161 +1,303 @@
-"""Parsers to extract tags from transcription responses."""
+"""Parsers to extract tags from transcription responses.
+
+All parsers locate their spans through a single `TranscriptIndex`, built once per response, which maps
+times to character offsets by binary search over the word boundaries.
+"""
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
 from steamship import Tag
 
+from encoding import pack_ints, unpack_ints
+
+COLUMNAR_TIMESTAMP_KIND = "timestamps"
+COLUMNAR_TIMESTAMP_ENCODING = "delta-zigzag-varint-base64"
+
+
+def _tag(**fields) -> Tag:
+    # Fields come straight from the typed transcription response, so pydantic validation is skipped.
+    return Tag.construct(**fields)
+
+
+class TranscriptIndex:
+    """Sorted, array-backed index from word times to character offsets in the transcript text.
+
+    Word ``i`` spans characters ``[char_starts[i], char_ends[i])`` of the words joined by single
+    spaces, and ``[start_times[i], end_times[i]]`` in milliseconds.
+    """
+
+    def __init__(self, words: List[Dict[str, Any]]):
+        self.start_times = array("q")
+        self.end_times = array("q")
+        self.char_starts = array("q")
+        self.char_ends = array("q")
+        for word in words:
+            self.add_word(word)
+
+    def add_word(self, word: Dict[str, Any]) -> None:
+        """Append the next word of the transcript to the index."""
+        char_idx = self.char_ends[-1] + 1 if self.char_ends else 0
+        self.start_times.append(word["start"])
+        self.end_times.append(word["end"])
+        self.char_starts.append(char_idx)
+        self.char_ends.append(char_idx + len(word["text"]))
+
+    def __len__(self) -> int:
+        return len(self.start_times)
+
+    @staticmethod
+    def _nearest(times: array, time_ms: int) -> int:
+        position = bisect_left(times, time_ms)
+        if position == len(times):
+            return position - 1
+        if position > 0 and time_ms - times[position - 1] <= times[position] - time_ms:
+            return position - 1
+        return position
+
+    def start_char(self, time_ms: int) -> int:
+        """Return the start offset of the word whose start time is nearest to time_ms."""
+        if not self.start_times:
+            return 0
+        return self.char_starts[self._nearest(self.start_times, time_ms)]
+
+    def end_char(self, time_ms: int) -> int:
+        """Return the end offset of the word whose end time is nearest to time_ms."""
+        if not self.end_times:
+            return 0
+        return self.char_ends[self._nearest(self.end_times, time_ms)]
+
+    def char_span(self, start_ms: int, end_ms: int) -> Tuple[int, int]:
+        """Return the character span covering the words nearest to the given time boundaries."""
+        start_idx = self.start_char(start_ms)
+        return start_idx, max(start_idx, self.end_char(end_ms))
+
 
-def parse_speaker_tags(transcription_response):
+def parse_speaker_tags(transcription_response, index: TranscriptIndex):
     """Extract speaker tags from transcription response."""
     tags = []
-    if "utterances" in transcription_response:
-        utterance_index = 0
-        for utterance in transcription_response["utterances"] or []:
-            utterance_length = len(utterance["text"])
-            tags.append(
-                Tag(
-                    kind="speaker",
-                    start_idx=utterance_index,
-                    end_idx=utterance_index + utterance_length,
-                    name=utterance["speaker"],
-                    value={"start_time": utterance["start"], "end_time": utterance["end"]},
-                )
+    for utterance in transcription_response.get("utterances") or []:
+        start_idx, end_idx = index.char_span(utterance["start"], utterance["end"])
+        tags.append(
+            _tag(
+                kind="speaker",
+                start_idx=start_idx,
+                end_idx=end_idx,
+                name=utterance["speaker"],
+                value={"start_time": utterance["start"], "end_time": utterance["end"]},
             )
-            utterance_index += utterance_length + 1
+        )
     return tags
 
 
-def parse_timestamps(transcription_response):
+def timestamp_tag(name: Optional[str], start_idx: int, end_idx: int, start: int, end: int) -> Tag:
+    """Build the timestamp tag of a single word."""
+    return _tag(
+        kind="timestamp",
+        start_idx=start_idx,
+        end_idx=end_idx,
+        name=name,
+        value={"start_time": start, "end_time": end},
+    )
+
+
+def parse_timestamps(transcription_response, index: TranscriptIndex):
     """Extract timestamp tags from transcription response."""
-    time_idx_to_char_idx = {}
     tags = []
-    char_idx = 0
-    for word in transcription_response["words"]:
-        word_length = len(word["text"])
+    for ix, word in enumerate(transcription_response["words"]):
         tags.append(
-            Tag(
-                kind="timestamp",
-                start_idx=char_idx,
-                end_idx=char_idx + word_length,
-                name=word["text"],
-                value={"start_time": word["start"], "end_time": word["end"]},
+            timestamp_tag(
+                word["text"], index.char_starts[ix], index.char_ends[ix], word["start"], word["end"]
             )
         )
-        time_idx_to_char_idx[word["start"]] = char_idx
-        time_idx_to_char_idx[word["end"]] = char_idx + word_length
-        char_idx += word_length + 1
-    return tags, time_idx_to_char_idx
+    return tags
+
+
+def parse_columnar_timestamps(transcription_response, index: TranscriptIndex):
+    """Extract all word timings as a single tag holding packed parallel arrays.
+
+    The arrays hold, per word, the start offset and length in characters and the start time and
+    duration in milliseconds. Use `decode_columnar_timestamps` to expand them into per-word tags.
+    """
+    if not len(index):
+        return []
+    return [
+        encode_columnar_timestamps(
+            index.char_starts, index.char_ends, index.start_times, index.end_times
+        )
+    ]
+
+
+def encode_columnar_timestamps(
+    char_starts: Sequence[int],
+    char_ends: Sequence[int],
+    start_times: Sequence[int],
+    end_times: Sequence[int],
+) -> Tag:
+    """Pack the parallel arrays of word spans and times into a columnar timestamp tag."""
+    return _tag(
+        kind=COLUMNAR_TIMESTAMP_KIND,
+        name=COLUMNAR_TIMESTAMP_ENCODING,
+        start_idx=char_starts[0],
+        end_idx=char_ends[-1],
+        value={
+            "count": len(char_starts),
+            "start_time": start_times[0],
+            "end_time": end_times[-1],
+            "char_starts": pack_ints(char_starts),
+            "char_lengths": pack_ints(end - start for start, end in zip(char_starts, char_ends)),
+            "start_times": pack_ints(start_times),
+            "durations": pack_ints(end - start for start, end in zip(start_times, end_times)),
+        },
+    )
+
+
+def decode_columnar_timestamps(tag: Tag, text: Optional[str] = None) -> List[Tag]:
+    """Expand a columnar timestamp tag into the per-word timestamp tags it encodes.
+
+    Word names are sliced from the block text if given, and left empty otherwise.
+    """
+    value = tag.value
+    char_starts = unpack_ints(value["char_starts"])
+    char_lengths = unpack_ints(value["char_lengths"])
+    start_times = unpack_ints(value["start_times"])
+    durations = unpack_ints(value["durations"])
+    tags = []
+    for char_start, char_length, start_time, duration in zip(
+        char_starts, char_lengths, start_times, durations
+    ):
+        end_idx = char_start + char_length
+        name = text[char_start:end_idx] if text is not None else None
+        tags.append(timestamp_tag(name, char_start, end_idx, start_time, start_time + duration))
+    return tags
 
 
-def parse_entities(transcription_response, time_idx_to_char_idx):
+def parse_entities(transcription_response, index: TranscriptIndex):
     """Extract entity tags from transcription response."""
     tags = []
-    if "entities" in transcription_response:
-        for entity in transcription_response["entities"] or []:
-            tags.append(
-                Tag(
-                    kind="entity",
-                    name=entity["text"],
-                    value={
-                        "type": entity["entity_type"],
-                        "start_time": entity["start"],
-                        "end_time": entity["end"],
-                    },
-                    start_idx=time_idx_to_char_idx[entity["start"]],
-                    end_idx=time_idx_to_char_idx[entity["end"]],
-                )
+    for entity in transcription_response.get("entities") or []:
+        start_idx, end_idx = index.char_span(entity["start"], entity["end"])
+        tags.append(
+            _tag(
+                kind="entity",
+                name=entity["text"],
+                value={
+                    "type": entity["entity_type"],
+                    "start_time": entity["start"],
+                    "end_time": entity["end"],
+                },
+                start_idx=start_idx,
+                end_idx=end_idx,
             )
+        )
     return tags
 
 
-def parse_chapters(transcription_response, time_idx_to_char_idx):
+def parse_chapters(transcription_response, index: TranscriptIndex):
     """Extract chapters and corresponding summaries from transcription response."""
     tags = []
-    if "chapters" in transcription_response:
-        for ix, chapter in enumerate(transcription_response["chapters"] or []):
-            tags.append(
-                Tag(
-                    kind="chapter",
-                    name=f"{ix}",
-                    value={
-                        "summary": chapter["summary"],
-                        "headline": chapter["headline"],
-                        "gist": chapter["gist"],
-                        "start_time": chapter["start"],
-                        "end_time": chapter["end"],
-                    },
-                    start_idx=time_idx_to_char_idx[chapter["start"]],
-                    end_idx=time_idx_to_char_idx[chapter["end"]],
-                )
+    for ix, chapter in enumerate(transcription_response.get("chapters") or []):
+        start_idx, end_idx = index.char_span(chapter["start"], chapter["end"])
+        tags.append(
+            _tag(
+                kind="chapter",
+                name=f"{ix}",
+                value={
+                    "summary": chapter["summary"],
+                    "headline": chapter["headline"],
+                    "gist": chapter["gist"],
+                    "start_time": chapter["start"],
+                    "end_time": chapter["end"],
+                },
+                start_idx=start_idx,
+                end_idx=end_idx,
             )
+        )
     return tags
 
 
-def parse_sentiments(transcription_response):
+def parse_sentiments(transcription_response, index: TranscriptIndex):
     """Extract sentiment tags from transcription response."""
     tags = []
-    if "sentiment_analysis_results" in transcription_response:
-        char_idx = 0
-        for sentiment in transcription_response.get("sentiment_analysis_results") or []:
-            span_text = sentiment["text"]
-            tags.append(
-                Tag(
-                    kind="sentiment",
-                    name=sentiment["sentiment"],
-                    value={
-                        "confidence": sentiment["confidence"],
-                        "start_time": sentiment["start"],
-                        "end_time": sentiment["end"],
-                    },
-                    start_idx=char_idx,
-                    end_idx=char_idx + len(span_text),
-                )
+    for sentiment in transcription_response.get("sentiment_analysis_results") or []:
+        start_idx, end_idx = index.char_span(sentiment["start"], sentiment["end"])
+        tags.append(
+            _tag(
+                kind="sentiment",
+                name=sentiment["sentiment"],
+                value={
+                    "confidence": sentiment["confidence"],
+                    "start_time": sentiment["start"],
+                    "end_time": sentiment["end"],
+                },
+                start_idx=start_idx,
+                end_idx=end_idx,
             )
-            char_idx += len(span_text) + 1
+        )
     return tags
 
 
-def parse_topic_summaries(transcription_response):
+def parse_topic_summaries(transcription_response, index: Optional[TranscriptIndex] = None):
     """Extract summary from transcription response."""
     tags = []
-    if "summary" in transcription_response.get("iab_categories_result", {}):
-        summary = transcription_response["iab_categories_result"]["summary"]
-        for topic, relevance in summary.items():
+    summary = (transcription_response.get("iab_categories_result") or {}).get("summary") or {}
+    for topic, relevance in summary.items():
+        tags.append(
+            _tag(
+                kind="topic_summary",
+                name=topic,
+                value={
+                    "confidence": relevance,
+                    "start_time": None,
+                    "end_time": None,
+                },
+                end_idx=None,
+                start_idx=None,
+            )
+        )
+    return tags
+
+
+def parse_topics(transcription_response, index: TranscriptIndex):
+    """Extract topic tags from transcription response."""
+    tags = []
+    results = (transcription_response.get("iab_categories_result") or {}).get("results") or []
+    for topic_fragment in results:
+        start_time = topic_fragment["timestamp"]["start"]
+        end_time = topic_fragment["timestamp"]["end"]
+        start_idx, end_idx = index.char_span(start_time, end_time)
+        for label in topic_fragment["labels"]:
             tags.append(
-                Tag(
-                    kind="topic_summary",
-                    name=topic,
+                _tag(
+                    kind="topic",
+                    name=label["label"],
                     value={
-                        "confidence": relevance,
-                        "start_time": None,
-                        "end_time": None,
+                        "confidence": label["relevance"],
+                        "start_time": start_time,
+                        "end_time": end_time,
                     },
-                    end_idx=None,
-                    start_idx=None,
+                    start_idx=start_idx,
+                    end_idx=end_idx,
                 )
             )
     return tags
 
 
-def parse_topics(transcription_response):
-    """Extract topic tags from transcription response."""
+PARSERS = (
+    parse_timestamps,
+    parse_speaker_tags,
+    parse_topics,
+    parse_topic_summaries,
+    parse_sentiments,
+    parse_chapters,
+    parse_entities,
+)
+
+
+def parse_transcript(transcription_response, parsers=PARSERS) -> List[Tag]:
+    """Build the transcript index once and extract the tags of every parser from it."""
+    index = TranscriptIndex(transcription_response["words"])
     tags = []
-    if "results" in transcription_response.get("iab_categories_result", {}):
-        char_idx = 0
-        for topic_fragment in transcription_response["iab_categories_result"]["results"]:
-            topic_length = len(topic_fragment["text"])
-            start_time = topic_fragment["timestamp"]["start"]
-            end_time = topic_fragment["timestamp"]["end"]
-            for label in topic_fragment["labels"]:
-                tags.append(
-                    Tag(
-                        kind="topic",
-                        name=label["label"],
-                        value={
-                            "confidence": label["relevance"],
-                            "start_time": start_time,
-                            "end_time": end_time,
-                        },
-                        start_idx=char_idx,
-                        end_idx=char_idx + topic_length,
-                    )
-                )
-            char_idx += topic_length + 1
+    for parser in parsers:
+        tags.extend(parser(transcription_response, index))
     return tags
@@ -0,0 +1,39 @@
+"""Adaptive next-poll delays for running transcription jobs."""
+import random
+from typing import Optional
+
+# AssemblyAI typically finishes a job in about this fraction of the audio duration.
+EXPECTED_PROCESSING_RATIO = 0.3
+# Expected time a job spends queued before processing starts.
+EXPECTED_QUEUE_S = 5.0
+# Growth factor of the delay once a job runs past its expected completion.
+BACKOFF_FACTOR = 1.5
+
+
+def suggest_poll_delay(
+    polls: int,
+    queued_s: float,
+    processing_s: float,
+    duration_s: Optional[float],
+    min_delay_s: float,
+    max_delay_s: float,
+    jitter: float,
+    rng: random.Random = random,  # type: ignore[assignment]
+) -> float:
+    """Suggest how many seconds to wait before checking a running job again.
+
+    With a known audio duration, the delay tracks half the expected remaining time, so long files
+    are checked rarely and short ones keep a low latency. Once the job is overdue, or the duration
+    is unknown, the delay backs off exponentially with the number of polls. The result is randomized
+    by +/- jitter and clamped to [min_delay_s, max_delay_s].
+    """
+    delay = None
+    if duration_s:
+        expected_s = EXPECTED_QUEUE_S + EXPECTED_PROCESSING_RATIO * duration_s
+        remaining_s = expected_s - queued_s - processing_s
+        if remaining_s > 0:
+            delay = remaining_s / 2
+    if delay is None:
+        delay = min_delay_s * BACKOFF_FACTOR ** min(polls, 32)
+    delay *= 1 + rng.uniform(-jitter, jitter)
+    return min(max(delay, min_delay_s), max_delay_s)
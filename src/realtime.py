@@ -0,0 +1,259 @@
+"""Synchronous transcription of short PCM audio over the AssemblyAI real-time websocket protocol.
+
+The websocket client is a minimal RFC 6455 implementation over the standard library: text and
+binary messages, fragmentation, ping/pong and the closing handshake, without extensions.
+"""
+import base64
+import hashlib
+import json
+import os
+import socket
+import ssl
+import struct
+import threading
+import time
+from typing import Any, BinaryIO, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+from steamship import SteamshipError
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+# Milliseconds of audio per message; AssemblyAI accepts 100 to 2000.
+REALTIME_CHUNK_MS = 250
+
+
+class WebSocketError(SteamshipError):
+    """The websocket handshake failed or the connection broke mid-session."""
+
+
+def accept_key(key: bytes) -> bytes:
+    """Return the Sec-WebSocket-Accept value answering a Sec-WebSocket-Key."""
+    return base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest())
+
+
+def encode_frame(opcode: int, payload: bytes, mask: bool) -> bytes:
+    """Encode a single final frame; clients must mask their frames, servers must not."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length | (0x80 if mask else 0))
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126 | (0x80 if mask else 0), length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127 | (0x80 if mask else 0), length)
+    if not mask:
+        return header + payload
+    key = os.urandom(4)
+    return header + key + _apply_mask(payload, key)
+
+
+def _apply_mask(payload: bytes, key: bytes) -> bytes:
+    repeated = (key * (len(payload) // 4 + 1))[: len(payload)]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(
+        len(payload), "big"
+    )
+
+
+def _read_exactly(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if data is None or len(data) < size:
+        raise WebSocketError(message="The websocket connection closed unexpectedly.")
+    return data
+
+
+def read_frame(stream: BinaryIO) -> Tuple[bool, int, bytes]:
+    """Read one frame and return whether it is final, its opcode and its unmasked payload."""
+    first, second = _read_exactly(stream, 2)
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", _read_exactly(stream, 2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", _read_exactly(stream, 8))
+    key = _read_exactly(stream, 4) if second & 0x80 else None
+    payload = _read_exactly(stream, length)
+    if key is not None:
+        payload = _apply_mask(payload, key)
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+class WebSocket:
+    """One end of a websocket connection over a blocking stream.
+
+    Messages are sent under a lock, so one thread may send audio while another receives.
+    """
+
+    def __init__(self, reader: BinaryIO, send: Any, client: bool):
+        self._reader = reader
+        self._send = send
+        self._client = client
+        self._lock = threading.Lock()
+        self.close_code: Optional[int] = None
+        self.close_reason = ""
+
+    def _send_frame(self, opcode: int, payload: bytes) -> None:
+        with self._lock:
+            self._send(encode_frame(opcode, payload, mask=self._client))
+
+    def send_text(self, text: str) -> None:
+        """Send a text message."""
+        self._send_frame(OPCODE_TEXT, text.encode("utf-8"))
+
+    def send_json(self, message: Mapping[str, Any]) -> None:
+        """Send a JSON text message."""
+        self.send_text(json.dumps(message))
+
+    def receive(self) -> Optional[str]:
+        """Return the next text message, or None once the peer closed the connection.
+
+        Pings are answered, and a close frame is echoed to complete the closing handshake.
+        """
+        message = b""
+        while True:
+            fin, opcode, payload = read_frame(self._reader)
+            if opcode == OPCODE_PING:
+                self._send_frame(OPCODE_PONG, payload)
+            elif opcode == OPCODE_CLOSE:
+                if len(payload) >= 2:
+                    (self.close_code,) = struct.unpack("!H", payload[:2])
+                    self.close_reason = payload[2:].decode("utf-8", "replace")
+                self._send_frame(OPCODE_CLOSE, payload[:2])
+                return None
+            elif opcode in (OPCODE_TEXT, OPCODE_BINARY, OPCODE_CONTINUATION):
+                message += payload
+                if fin:
+                    return message.decode("utf-8")
+
+    def close(self, code: int = 1000) -> None:
+        """Start the closing handshake."""
+        self._send_frame(OPCODE_CLOSE, struct.pack("!H", code))
+
+
+def connect(
+    url: str, headers: Mapping[str, str], timeout_s: float
+) -> Tuple[WebSocket, socket.socket]:
+    """Open a client websocket to a ws:// or wss:// URL and return it with its socket."""
+    parts = urlsplit(url)
+    secure = parts.scheme in ("wss", "https")
+    port = parts.port or (443 if secure else 80)
+    sock = socket.create_connection((parts.hostname, port), timeout=timeout_s)
+    if secure:
+        sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parts.hostname)
+    key = base64.b64encode(os.urandom(16))
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    lines = [
+        f"GET {path or '/'} HTTP/1.1",
+        f"Host: {parts.netloc}",
+        "Upgrade: websocket",
+        "Connection: Upgrade",
+        f"Sec-WebSocket-Key: {key.decode()}",
+        "Sec-WebSocket-Version: 13",
+        *(f"{name}: {value}" for name, value in headers.items()),
+    ]
+    sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    reader = sock.makefile("rb")
+    status_line = reader.readline().decode("latin-1").strip()
+    response_headers = {}
+    for line in iter(reader.readline, b"\r\n"):
+        if not line:
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        response_headers[name.strip().lower()] = value.strip()
+    if (
+        status_line.split(" ")[1:2] != ["101"]
+        or response_headers.get("sec-websocket-accept") != accept_key(key).decode()
+    ):
+        sock.close()
+        raise WebSocketError(
+            message=f"Websocket handshake with {parts.netloc} failed: {status_line}"
+        )
+    return WebSocket(reader, sock.sendall, client=True), sock
+
+
+def _send_audio(
+    websocket: WebSocket, pcm: memoryview, chunk_size: int, byte_rate: float, speed: float
+):
+    """Send the audio in chunks, no faster than speed times real time if speed is set."""
+    started = time.monotonic()
+    try:
+        for offset in range(0, len(pcm), chunk_size):
+            if speed:
+                ahead_s = offset / byte_rate / speed - (time.monotonic() - started)
+                if ahead_s > 0:
+                    time.sleep(ahead_s)
+            chunk = pcm[offset : offset + chunk_size]
+            websocket.send_json({"audio_data": base64.b64encode(chunk).decode("ascii")})
+        websocket.send_json({"terminate_session": True})
+    except OSError:
+        # The receiving side reports why the connection broke.
+        pass
+
+
+def transcribe_realtime(
+    url: str,
+    token: str,
+    pcm: bytes,
+    sample_rate: int,
+    speed: float,
+    timeout_s: float,
+) -> Dict[str, Any]:
+    """Stream 16-bit mono PCM audio to a real-time session and return the finished transcript.
+
+    The transcript has the shape of an asynchronous transcript with only its text and words, built
+    from the FinalTranscript messages of the session; partial transcripts are ignored.
+    """
+    websocket, sock = connect(
+        f"{url}?sample_rate={sample_rate}", {"Authorization": token}, timeout_s
+    )
+    try:
+        begins = json.loads(websocket.receive() or "{}")
+        if begins.get("message_type") != "SessionBegins":
+            raise WebSocketError(
+                message="Real-time session did not start. "
+                f"Error: {begins.get('error') or websocket.close_reason}"
+            )
+        chunk_size = sample_rate * 2 * REALTIME_CHUNK_MS // 1000
+        sender = threading.Thread(
+            target=_send_audio,
+            args=(websocket, memoryview(pcm), chunk_size, sample_rate * 2, speed),
+            daemon=True,
+        )
+        sender.start()
+        words = _receive_final_words(websocket)
+        sender.join()
+    finally:
+        sock.close()
+    return {
+        "id": begins.get("session_id"),
+        "status": "completed",
+        "text": " ".join(word["text"] for word in words),
+        "words": words,
+        "audio_duration": len(pcm) / (sample_rate * 2),
+    }
+
+
+def _receive_final_words(websocket: WebSocket) -> List[Dict[str, Any]]:
+    words: List[Dict[str, Any]] = []
+    while True:
+        text = websocket.receive()
+        if text is None:
+            raise WebSocketError(
+                message="Real-time session closed before it terminated. "
+                f"Code: {websocket.close_code}. Reason: {websocket.close_reason}"
+            )
+        message = json.loads(text)
+        if message.get("error"):
+            raise WebSocketError(message=f"Real-time session failed. Error: {message['error']}")
+        if message.get("message_type") == "FinalTranscript":
+            words.extend(
+                {key: word.get(key) for key in ("text", "start", "end", "confidence")}
+                for word in message.get("words") or []
+            )
+        elif message.get("message_type") == "SessionTerminated":
+            websocket.close()
+            return words
@@ -0,0 +1,36 @@
+"""Process-wide registries of objects shared by plugin instances."""
+import threading
+from typing import Callable, Dict, Generic, Hashable, List, TypeVar
+
+T = TypeVar("T")
+
+
+class Registry(Generic[T]):
+    """Thread-safe map from settings keys to shared objects, each created on first use.
+
+    Plugin instances are short-lived, so objects that must outlive them, such as sessions,
+    throttles, token pools and caches, are kept in module-level registries.
+    """
+
+    def __init__(self):
+        self._objects: Dict[Hashable, T] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, create: Callable[[], T]) -> T:
+        """Return the object registered under key, creating it with create() on first use."""
+        with self._lock:
+            obj = self._objects.get(key)
+            if obj is None:
+                obj = create()
+                self._objects[key] = obj
+            return obj
+
+    def values(self) -> List[T]:
+        """Return the registered objects."""
+        with self._lock:
+            return list(self._objects.values())
+
+    def clear(self) -> None:
+        """Forget every registered object."""
+        with self._lock:
+            self._objects.clear()
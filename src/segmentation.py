@@ -0,0 +1,125 @@
+"""Segmentation of a transcript and its tags into multiple blocks."""
+from bisect import bisect_right
+from enum import Enum
+from typing import List, Optional, Sequence, Tuple
+
+from steamship import Block, Tag
+
+from parsers import COLUMNAR_TIMESTAMP_KIND, decode_columnar_timestamps, encode_columnar_timestamps
+
+
+class SegmentationMode(str, Enum):
+    """How the transcript is split into blocks."""
+
+    NONE = "none"
+    UTTERANCE = "utterance"
+    CHAPTER = "chapter"
+    DURATION = "duration"
+
+
+def _word_tags(tags: Sequence[Tag]) -> List[Tag]:
+    words = []
+    for tag in tags:
+        if tag.kind == "timestamp":
+            words.append(tag)
+        elif tag.kind == COLUMNAR_TIMESTAMP_KIND:
+            words.extend(decode_columnar_timestamps(tag))
+    return sorted(words, key=lambda tag: tag.start_idx)
+
+
+def segment_starts(
+    mode: SegmentationMode,
+    tags: Sequence[Tag],
+    max_duration_s: Optional[float] = None,
+    max_chars: Optional[int] = None,
+) -> List[int]:
+    """Return the sorted character offsets at which blocks start.
+
+    Utterance and chapter modes start a block at each speaker or chapter tag. Duration mode packs
+    consecutive words into blocks spanning at most max_duration_s of audio and max_chars characters.
+    The first block always starts at offset 0.
+    """
+    starts = {0}
+    if mode in (SegmentationMode.UTTERANCE, SegmentationMode.CHAPTER):
+        kind = "speaker" if mode == SegmentationMode.UTTERANCE else "chapter"
+        starts.update(tag.start_idx for tag in tags if tag.kind == kind)
+    elif mode == SegmentationMode.DURATION:
+        max_duration_ms = max_duration_s * 1000 if max_duration_s else None
+        segment_start = None
+        for word in _word_tags(tags):
+            if segment_start is None:
+                segment_start = word
+                continue
+            too_long = (
+                max_duration_ms is not None
+                and word.value["end_time"] - segment_start.value["start_time"] > max_duration_ms
+            )
+            too_large = max_chars is not None and word.end_idx - segment_start.start_idx > max_chars
+            if too_long or too_large:
+                starts.add(word.start_idx)
+                segment_start = word
+    return sorted(starts)
+
+
+def _rebase(tag: Tag, offset: int, start_idx: int, end_idx: int) -> Tag:
+    return Tag.construct(
+        kind=tag.kind,
+        name=tag.name,
+        value=tag.value,
+        start_idx=start_idx - offset,
+        end_idx=end_idx - offset,
+    )
+
+
+def split_into_blocks(
+    text: str, tags: Sequence[Tag], starts: Sequence[int]
+) -> Tuple[List[Block], List[Tag]]:
+    """Split text into blocks beginning at starts and distribute the tags over them.
+
+    Trailing whitespace is stripped from each block. Tag offsets are rebased onto their block, and a
+    tag crossing block boundaries is split into one clipped tag per block it overlaps. Columnar
+    timestamp tags are re-encoded per block. Tags without a span are returned separately, to be
+    attached to the file.
+    """
+    spans = []
+    for ix, start in enumerate(starts):
+        end = starts[ix + 1] if ix + 1 < len(starts) else len(text)
+        spans.append((start, start + len(text[start:end].rstrip())))
+    block_tags: List[List[Tag]] = [[] for _ in spans]
+    block_words: List[List[Tag]] = [[] for _ in spans]
+    file_tags = []
+
+    for tag in tags:
+        if tag.start_idx is None or tag.end_idx is None:
+            file_tags.append(tag)
+            continue
+        if tag.kind == COLUMNAR_TIMESTAMP_KIND:
+            for word in decode_columnar_timestamps(tag):
+                block_words[max(bisect_right(starts, word.start_idx) - 1, 0)].append(word)
+            continue
+        first = max(bisect_right(starts, tag.start_idx) - 1, 0)
+        last = max(bisect_right(starts, max(tag.end_idx - 1, tag.start_idx)) - 1, first)
+        for ix in range(first, last + 1):
+            block_start, block_end = spans[ix]
+            start_idx = max(tag.start_idx, block_start)
+            end_idx = min(tag.end_idx, block_end)
+            if start_idx < end_idx or tag.start_idx == tag.end_idx:
+                block_tags[ix].append(_rebase(tag, block_start, start_idx, max(start_idx, end_idx)))
+
+    for ix, words in enumerate(block_words):
+        if words:
+            offset = spans[ix][0]
+            block_tags[ix].insert(
+                0,
+                encode_columnar_timestamps(
+                    [word.start_idx - offset for word in words],
+                    [word.end_idx - offset for word in words],
+                    [word.value["start_time"] for word in words],
+                    [word.value["end_time"] for word in words],
+                ),
+            )
+
+    blocks = [
+        Block(text=text[start:end], tags=block_tags[ix]) for ix, (start, end) in enumerate(spans)
+    ]
+    return blocks, file_tags
@@ -0,0 +1,99 @@
+"""Scheduling of transcription jobs over a pool of AssemblyAI API tokens."""
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, Mapping, Optional, Sequence
+
+from steamship import SteamshipError
+
+from registry import Registry
+
+# Each 429 received within the window weighs on a token like this many jobs in flight.
+RATE_LIMIT_PENALTY = 2.0
+RATE_LIMIT_WINDOW_S = 60.0
+# Jobs whose completion was never observed stop counting as in flight after this long.
+JOB_TTL_S = 6 * 3600.0
+
+
+def shard_id(token: str) -> str:
+    """Return the opaque id of a token, safe to store in status inputs."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+class TokenPool:
+    """Tokens of one or more AssemblyAI accounts, with the jobs in flight on each.
+
+    New jobs go to the least-loaded token: the one with the fewest jobs in flight and submissions
+    under way, plus a penalty for each 429 it recently received. Ties go to the earliest token.
+    """
+
+    def __init__(self, tokens: Sequence[str], clock: Callable[[], float] = time.monotonic):
+        self.tokens: Dict[str, str] = {shard_id(token): token for token in tokens}
+        self.default_shard = next(iter(self.tokens))
+        self.clock = clock
+        self._jobs: Dict[str, Dict[str, float]] = {shard: {} for shard in self.tokens}
+        self._submitting: Dict[str, int] = {shard: 0 for shard in self.tokens}
+        self._lock = threading.Lock()
+
+    def shard(self, shard: Optional[str] = None) -> str:
+        """Return the given shard, or the first one if None, raising if it is not in the pool.
+
+        A job can only be fetched with the token it was submitted with, so a job whose token was
+        removed from the pool cannot be checked with any other.
+        """
+        shard = shard or self.default_shard
+        if shard not in self.tokens:
+            raise SteamshipError(
+                message=f"Job was submitted with token shard {shard}, which is not among the "
+                "configured assembly_api_token and assembly_api_tokens."
+            )
+        return shard
+
+    def token(self, shard: Optional[str] = None) -> str:
+        """Return the token of a shard, or the first token if None."""
+        return self.tokens[self.shard(shard)]
+
+    def _in_flight(self, shard: str) -> int:
+        jobs = self._jobs[shard]
+        expired = [job for job, started in jobs.items() if self.clock() - started > JOB_TTL_S]
+        for job in expired:
+            del jobs[job]
+        return len(jobs) + self._submitting[shard]
+
+    def loads(self, rate_limits: Mapping[str, int]) -> Dict[str, float]:
+        """Return the load of every shard, given its recent 429 counts."""
+        with self._lock:
+            return {
+                shard: self._in_flight(shard) + RATE_LIMIT_PENALTY * rate_limits.get(shard, 0)
+                for shard in self.tokens
+            }
+
+    def acquire(self, rate_limits: Mapping[str, int]) -> str:
+        """Pick the least-loaded shard for a new job and count the submission under way on it."""
+        loads = self.loads(rate_limits)
+        shard = min(self.tokens, key=loads.__getitem__)
+        with self._lock:
+            self._submitting[shard] += 1
+        return shard
+
+    def started(self, shard: str, transcription_id: Optional[str]) -> None:
+        """End a submission, counting its job in flight if it started."""
+        with self._lock:
+            self._submitting[shard] -= 1
+            if transcription_id is not None:
+                self._jobs[shard][transcription_id] = self.clock()
+
+    def finished(self, transcription_ids: Sequence[str]) -> None:
+        """Stop counting finished jobs as in flight."""
+        with self._lock:
+            for jobs in self._jobs.values():
+                for transcription_id in transcription_ids:
+                    jobs.pop(transcription_id, None)
+
+
+_pools: Registry[TokenPool] = Registry()
+
+
+def get_token_pool(scope: str, tokens: Sequence[str]) -> TokenPool:
+    """Return the process-wide pool of the given tokens, so job counts are shared by instances."""
+    return _pools.get((scope, *tokens), lambda: TokenPool(tokens))
@@ -0,0 +1,197 @@
+"""Stitching of the transcripts of overlapping audio segments into one transcript.
+
+Each segment transcript is shifted onto the timeline of the whole recording and only keeps the items
+starting within its cut range, so the words of overlapping audio are kept exactly once. Speaker labels,
+which AssemblyAI assigns per job, are mapped onto those of the previous segment by matching the words
+both segments transcribed in their overlap.
+"""
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+# Largest start time difference, in milliseconds, at which two transcriptions of the overlapping
+# audio are taken to be the same word.
+WORD_MATCH_TOLERANCE_MS = 250
+
+# Top-level arrays of timed items, each with "start" and "end" in milliseconds.
+TIMED_SECTIONS = ("sentiment_analysis_results", "entities", "chapters")
+
+
+def _shift(item: Dict[str, Any], offset_ms: int) -> Dict[str, Any]:
+    return {**item, "start": item["start"] + offset_ms, "end": item["end"] + offset_ms}
+
+
+def _within(start_ms: int, segment: Dict[str, Any]) -> bool:
+    return segment["cut_start_ms"] <= start_ms < segment["cut_end_ms"]
+
+
+def _speaker_label(ix: int) -> str:
+    return chr(ord("A") + ix) if ix < 26 else f"S{ix}"
+
+
+def _match_speakers(
+    previous_words: Sequence[Dict[str, Any]],
+    words: Sequence[Dict[str, Any]],
+    used: Sequence[str],
+) -> Dict[str, str]:
+    """Map the speaker labels of words onto those of the previous segment, by majority vote.
+
+    Both word lists are on the global timeline; each word of the new segment is matched to the
+    previous word starting nearest to it. Labels without a match get new labels not in used.
+    """
+    starts = [word["start"] for word in previous_words]
+    votes: Counter = Counter()
+    for word in words:
+        if word.get("speaker") is None or not starts:
+            continue
+        position = bisect_left(starts, word["start"])
+        candidates = [ix for ix in (position - 1, position) if 0 <= ix < len(starts)]
+        nearest = min(candidates, key=lambda ix: abs(starts[ix] - word["start"]))
+        if abs(starts[nearest] - word["start"]) <= WORD_MATCH_TOLERANCE_MS:
+            previous = previous_words[nearest].get("speaker")
+            if previous is not None:
+                votes[(word["speaker"], previous)] += 1
+
+    mapping: Dict[str, str] = {}
+    taken = set()
+    for (local, previous), _ in votes.most_common():
+        if local not in mapping and previous not in taken:
+            mapping[local] = previous
+            taken.add(previous)
+    labels = set(used)
+    for word in words:
+        local = word.get("speaker")
+        if local is not None and local not in mapping:
+            ix = 0
+            while _speaker_label(ix) in labels:
+                ix += 1
+            mapping[local] = _speaker_label(ix)
+            labels.add(mapping[local])
+    return mapping
+
+
+def _stitch_utterance(
+    utterance: Dict[str, Any], segment: Dict[str, Any], speakers: Dict[str, str]
+) -> Optional[Dict[str, Any]]:
+    offset_ms = segment["offset_ms"]
+    utterance = _shift(utterance, offset_ms)
+    if utterance.get("speaker") is not None:
+        utterance["speaker"] = speakers.get(utterance["speaker"], utterance["speaker"])
+    if not utterance.get("words"):
+        return utterance if _within(utterance["start"], segment) else None
+    words = [_shift(word, offset_ms) for word in utterance["words"]]
+    words = [
+        {**word, "speaker": utterance["speaker"]}
+        for word in words
+        if _within(word["start"], segment)
+    ]
+    if not words:
+        return None
+    return {
+        **utterance,
+        "words": words,
+        "start": words[0]["start"],
+        "end": words[-1]["end"],
+        "text": " ".join(word["text"] for word in words),
+    }
+
+
+def _join_utterances(first: Dict[str, Any], second: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        **first,
+        "words": (first.get("words") or []) + (second.get("words") or []),
+        "end": second["end"],
+        "text": f"{first['text']} {second['text']}",
+    }
+
+
+class _Stitcher:
+    """Accumulates the items of consecutive segment transcripts on the global timeline."""
+
+    def __init__(self, transcripts: Sequence[Dict[str, Any]], segments: Sequence[Dict[str, Any]]):
+        self.present = {
+            key for transcript in transcripts for key, value in transcript.items() if value
+        }
+        self.stitched: Dict[str, Any] = {"words": []}
+        for key in ("utterances", *TIMED_SECTIONS):
+            if key in self.present:
+                self.stitched[key] = []
+        self.topics: List[Dict[str, Any]] = []
+        self.summary: Dict[str, float] = {}
+        self.total_ms = (
+            sum(segment["cut_end_ms"] - segment["cut_start_ms"] for segment in segments) or 1
+        )
+        self.previous_words: List[Dict[str, Any]] = []
+
+    def add(self, transcript: Dict[str, Any], segment: Dict[str, Any]) -> None:
+        speakers = self._add_words(transcript, segment)
+        utterances = self.stitched.get("utterances")
+        continued = bool(utterances)
+        for utterance in transcript.get("utterances") or []:
+            utterance = _stitch_utterance(utterance, segment, speakers)
+            if utterance is None:
+                continue
+            if continued and utterances[-1].get("speaker") == utterance.get("speaker"):
+                # The utterance was cut in two by the segment boundary.
+                utterances[-1] = _join_utterances(utterances[-1], utterance)
+            else:
+                utterances.append(utterance)
+            continued = False
+        for key in TIMED_SECTIONS:
+            for item in transcript.get(key) or []:
+                item = _shift(item, segment["offset_ms"])
+                if _within(item["start"], segment):
+                    self.stitched[key].append(item)
+        self._add_topics(transcript.get("iab_categories_result") or {}, segment)
+
+    def _add_words(self, transcript: Dict[str, Any], segment: Dict[str, Any]) -> Dict[str, str]:
+        offset_ms = segment["offset_ms"]
+        words = [_shift(word, offset_ms) for word in transcript.get("words") or []]
+        overlap = [word for word in self.previous_words if word["start"] >= offset_ms]
+        used = {word.get("speaker") for word in self.stitched["words"]} - {None}
+        speakers = _match_speakers(overlap, words, sorted(used))
+        for word in words:
+            if word.get("speaker") is not None:
+                word["speaker"] = speakers[word["speaker"]]
+        self.stitched["words"].extend(word for word in words if _within(word["start"], segment))
+        self.previous_words = words
+        return speakers
+
+    def _add_topics(self, categories: Dict[str, Any], segment: Dict[str, Any]) -> None:
+        for result in categories.get("results") or []:
+            timestamp = _shift(result["timestamp"], segment["offset_ms"])
+            if _within(timestamp["start"], segment):
+                self.topics.append({**result, "timestamp": timestamp})
+        weight = (segment["cut_end_ms"] - segment["cut_start_ms"]) / self.total_ms
+        for topic, relevance in (categories.get("summary") or {}).items():
+            self.summary[topic] = self.summary.get(topic, 0.0) + relevance * weight
+
+    def result(self) -> Dict[str, Any]:
+        stitched = self.stitched
+        if "iab_categories_result" in self.present:
+            stitched["iab_categories_result"] = {
+                "status": "success",
+                "results": self.topics,
+                "summary": self.summary,
+            }
+        stitched["text"] = " ".join(word["text"] for word in stitched["words"])
+        stitched["status"] = "completed"
+        stitched["audio_duration"] = self.total_ms / 1000
+        return stitched
+
+
+def stitch_transcripts(
+    transcripts: Sequence[Dict[str, Any]], segments: Sequence[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Merge the completed transcripts of consecutive overlapping segments into one transcript.
+
+    Each segment has the ``offset_ms`` of its audio within the recording, and the
+    ``[cut_start_ms, cut_end_ms)`` range in which it contributes words. Words, utterances, sentiments,
+    entities, chapters and topics are shifted by the offset and kept if they start within the cut
+    range; utterances are trimmed to their kept words. Topic summary relevances are averaged, weighted
+    by the length of each cut range. The text is rebuilt from the kept words.
+    """
+    stitcher = _Stitcher(transcripts, segments)
+    for transcript, segment in zip(transcripts, segments):
+        stitcher.add(transcript, segment)
+    return stitcher.result()
@@ -0,0 +1,236 @@
+"""Incremental parsing of transcript responses without materializing the full JSON tree."""
+import codecs
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from steamship import Tag
+
+from parsers import (
+    PARSERS,
+    TranscriptIndex,
+    parse_chapters,
+    parse_entities,
+    parse_sentiments,
+    parse_speaker_tags,
+    parse_timestamps,
+    parse_topic_summaries,
+    parse_topics,
+    timestamp_tag,
+)
+
+WHITESPACE = " \t\n\r"
+NUMBER_CHARS = "0123456789.eE+-"
+
+# Top-level arrays whose items are fed one at a time to the parser that consumes them.
+SECTION_PARSERS = {
+    "utterances": parse_speaker_tags,
+    "sentiment_analysis_results": parse_sentiments,
+    "chapters": parse_chapters,
+    "entities": parse_entities,
+}
+# Parsers fed from the stream; any other parser only needs the word index and runs at the end.
+STREAMED_PARSERS = {
+    *SECTION_PARSERS.values(),
+    parse_timestamps,
+    parse_topics,
+    parse_topic_summaries,
+}
+
+
+class JsonStream:
+    """Pull parser over a stream of JSON bytes.
+
+    Containers are walked with `iter_object` and `iter_array`, which yield once per member and leave
+    the caller to consume the member's value with `read_value`, `skip_value` or a nested iteration.
+    Only the value being read is ever held in memory.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            text = self._decoder.decode(b"", final=True)
+        else:
+            text = self._decoder.decode(chunk)
+        self._buffer = self._buffer[self._pos :] + text
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it, or "" at the end."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self._pos} of the JSON stream")
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        """Decode and return the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number cut by the buffer boundary decodes as a shorter number, so the next chunk is
+            # needed unless the value is followed by a character that cannot continue it.
+            cut = end == len(self._buffer) or self._buffer[end] in NUMBER_CHARS
+            if cut and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def skip_value(self) -> None:
+        """Consume the next JSON value, holding at most one leaf value in memory."""
+        char = self.peek()
+        if char == "{":
+            for _ in self.iter_object():
+                self.skip_value()
+        elif char == "[":
+            for _ in self.iter_array():
+                self.skip_value()
+        else:
+            self.read_value()
+
+    def iter_object(self) -> Iterator[str]:
+        """Yield the keys of the next JSON object; the caller consumes each value."""
+        self._expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self._expect(":")
+            yield key
+            if self.peek() == ",":
+                self._pos += 1
+            else:
+                self._expect("}")
+                return
+
+    def iter_array(self) -> Iterator[None]:
+        """Yield once per item of the next JSON array; the caller consumes each item."""
+        self._expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield None
+            if self.peek() == ",":
+                self._pos += 1
+            else:
+                self._expect("]")
+                return
+
+    def iter_items(self) -> Iterator[Any]:
+        """Yield the decoded items of the next JSON array, or nothing if it is null."""
+        if self.peek() == "n":
+            self.read_value()
+            return
+        for _ in self.iter_array():
+            yield self.read_value()
+
+
+class _TranscriptStreamParser:
+    """Consumes a transcript JSON stream, feeding each section to the parsers that read it."""
+
+    def __init__(self, stream: JsonStream, parsers: Tuple[Callable, ...]):
+        self.stream = stream
+        self.parsers = parsers
+        self.index = TranscriptIndex([])
+        self.fields: Dict[str, Any] = {}
+        self.tags_by_parser: Dict[Callable, List[Tag]] = {parser: [] for parser in parsers}
+        # Sections read before the word index is complete, as (parser, wrap, items).
+        self.pending: Optional[List[Tuple[Callable, Callable, List[Any]]]] = []
+
+    def parse(self) -> Tuple[Dict[str, Any], List[Tag]]:
+        for key in self.stream.iter_object():
+            if key == "words":
+                self._read_words()
+            elif key in SECTION_PARSERS and SECTION_PARSERS[key] in self.tags_by_parser:
+                self._run(SECTION_PARSERS[key], lambda items, key=key: {key: items})
+            elif key == "iab_categories_result" and self.stream.peek() == "{":
+                self._read_categories()
+            elif self.stream.peek() in "[{":
+                self.stream.skip_value()
+            else:
+                self.fields[key] = self.stream.read_value()
+
+        self._flush_pending()
+        for parser in self.parsers:
+            if parser not in STREAMED_PARSERS:
+                self.tags_by_parser[parser].extend(parser({}, self.index))
+        return self.fields, [tag for parser in self.parsers for tag in self.tags_by_parser[parser]]
+
+    def _run(self, parser: Callable, wrap: Callable[[Iterable], Dict[str, Any]]) -> None:
+        items = self.stream.iter_items()
+        if self.pending is None:
+            self.tags_by_parser[parser].extend(parser(wrap(items), self.index))
+        else:
+            self.pending.append((parser, wrap, list(items)))
+
+    def _flush_pending(self) -> None:
+        for parser, wrap, items in self.pending or []:
+            self.tags_by_parser[parser].extend(parser(wrap(items), self.index))
+        self.pending = None
+
+    def _read_words(self) -> None:
+        timestamp_tags = self.tags_by_parser.get(parse_timestamps)
+        for word in self.stream.iter_items():
+            start_idx = self.index.char_ends[-1] + 1 if len(self.index) else 0
+            self.index.add_word(word)
+            if timestamp_tags is not None:
+                timestamp_tags.append(
+                    timestamp_tag(
+                        word["text"],
+                        start_idx,
+                        self.index.char_ends[-1],
+                        word["start"],
+                        word["end"],
+                    )
+                )
+        self._flush_pending()
+
+    def _read_categories(self) -> None:
+        for key in self.stream.iter_object():
+            if key == "results" and parse_topics in self.tags_by_parser:
+                self._run(parse_topics, lambda items: {"iab_categories_result": {"results": items}})
+            elif key == "summary" and parse_topic_summaries in self.tags_by_parser:
+                summary = self.stream.read_value()
+                self.tags_by_parser[parse_topic_summaries].extend(
+                    parse_topic_summaries({"iab_categories_result": {"summary": summary}})
+                )
+            else:
+                self.stream.skip_value()
+
+
+def stream_transcript(
+    chunks: Iterable[bytes], parsers: Tuple[Callable, ...] = PARSERS
+) -> Tuple[Dict[str, Any], List[Tag]]:
+    """Parse a transcript response body incrementally into its scalar fields and tags.
+
+    Tags are produced from ``words``, ``utterances``, ``entities`` and the other arrays item by item
+    as they arrive; nested values that no parser consumes are skipped. Sections that arrive before
+    ``words`` are buffered until the word index is complete, or the body ends. Tags are returned in
+    the same order as `parsers.parse_transcript`.
+    """
+    return _TranscriptStreamParser(JsonStream(chunks), parsers).parse()
@@ -0,0 +1,262 @@
+"""Client-side rate limiting, retries and circuit breaking for AssemblyAI API calls."""
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Callable, Deque, Optional
+
+import requests
+from steamship import SteamshipError
+
+from registry import Registry
+from transport import RETRY_STATUS_CODES
+
+
+class TransientAPIError(SteamshipError):
+    """AssemblyAI kept answering a call with a rate-limit or server error status."""
+
+    def __init__(self, message: str, retry_in_s: float = 0.0):
+        super().__init__(message=message)
+        self.retry_in_s = retry_in_s
+
+
+class CircuitOpenError(TransientAPIError):
+    """Calls are failing fast because AssemblyAI looks degraded."""
+
+
+class TokenBucket:
+    """Token bucket allowing rate_per_s calls per second on average, in bursts of up to burst calls.
+
+    A rate of 0 disables the limit.
+    """
+
+    def __init__(
+        self,
+        rate_per_s: float,
+        burst: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate_per_s = rate_per_s
+        self.burst = max(burst, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, possibly ahead of time, and return how long to wait before using it."""
+        with self._lock:
+            now = self.clock()
+            wait_s = max(self._paused_until - now, 0.0)
+            if self.rate_per_s:
+                elapsed = max(now - self._updated_at, 0.0)
+                self._tokens = min(self._tokens + elapsed * self.rate_per_s, self.burst)
+                self._updated_at = now
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait_s = max(wait_s, -self._tokens / self.rate_per_s)
+            return wait_s
+
+    def acquire(self) -> float:
+        """Block until a call may be made, and return the seconds waited."""
+        wait_s = self._reserve()
+        if wait_s > 0:
+            self.sleep(wait_s)
+        return wait_s
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every call for the given seconds, as asked by a Retry-After header."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self.clock() + seconds)
+
+
+class CircuitBreaker:
+    """Fails calls fast after failure_threshold consecutive failures, for reset_timeout_s seconds.
+
+    After the timeout a single trial call is let through: its success closes the circuit again, its
+    failure keeps it open for another timeout. A threshold of 0 disables the breaker.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout_s: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.clock = clock
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are currently failing fast."""
+        return self._opened_at is not None
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError unless a call may be attempted now.
+
+        Return whether the call is the trial of a half-open circuit, which the caller must resolve
+        with record_success, record_failure or release_trial.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            remaining_s = self._opened_at + self.reset_timeout_s - self.clock()
+            if remaining_s <= 0 and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+        raise CircuitOpenError(
+            message="AssemblyAI is failing; calls are suspended for "
+            f"{max(remaining_s, 0):.1f}s after {self.failures} consecutive failures.",
+            retry_in_s=max(remaining_s, 0.0),
+        )
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit once the threshold is reached."""
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or (
+                self.failure_threshold and self.failures >= self.failure_threshold
+            ):
+                self._opened_at = self.clock()
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """End a trial call that neither closed nor reopened the circuit, allowing another one."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+def backoff_delay(
+    attempt: int, backoff_factor: float, max_delay_s: float, rng: random.Random = random
+) -> float:
+    """Return a full-jitter exponential backoff delay for the given retry attempt, from 0."""
+    return rng.uniform(0, min(backoff_factor * 2**attempt, max_delay_s))
+
+
+def retry_after_s(response: requests.Response) -> Optional[float]:
+    """Return the delay asked for by the Retry-After header of a response, if any."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class Throttle:
+    """Rate limits, retries and circuit breaking shared by all calls to one AssemblyAI endpoint.
+
+    Calls are retried on the statuses in RETRY_STATUS_CODES up to max_retries times, waiting for the
+    Retry-After the server asks for or else a jittered exponential backoff. A 429 pauses the whole
+    token bucket. Server errors and connection failures count towards the circuit breaker.
+    """
+
+    def __init__(
+        self,
+        submit_rate_per_s: float,
+        poll_rate_per_s: float,
+        burst: int,
+        max_retries: int,
+        backoff_factor: float,
+        max_backoff_s: float,
+        failure_threshold: int,
+        reset_timeout_s: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: random.Random = random,
+    ):
+        self.submissions = TokenBucket(submit_rate_per_s, burst, clock, sleep)
+        self.polls = TokenBucket(poll_rate_per_s, burst, clock, sleep)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout_s, clock)
+        self.rate_limited_at: Deque[float] = deque(maxlen=1024)
+        self.clock = clock
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff_s = max_backoff_s
+        self.sleep = sleep
+        self.rng = rng
+
+    def send(
+        self, send: Callable[[], requests.Response], bucket: Optional[TokenBucket] = None
+    ) -> requests.Response:
+        """Make a call through the limiter and breaker, retrying it on transient failures.
+
+        Return the last response, which has a retryable status if every attempt failed.
+        """
+        for attempt in range(self.max_retries + 1):
+            trial = self.breaker.before_call()
+            try:
+                response = self._attempt(send, bucket)
+            finally:
+                # A rate-limited or interrupted trial says nothing about the API; let another try.
+                if trial:
+                    self.breaker.release_trial()
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+            delay_s = retry_after_s(response)
+            if response.status_code == 429:
+                self.rate_limited_at.append(self.clock())
+                if bucket is not None and delay_s is not None:
+                    bucket.pause(delay_s)
+            if attempt == self.max_retries:
+                return response
+            response.close()
+            if delay_s is None:
+                delay_s = backoff_delay(attempt, self.backoff_factor, self.max_backoff_s, self.rng)
+            self.sleep(min(delay_s, self.max_backoff_s))
+        return response
+
+    def _attempt(
+        self, send: Callable[[], requests.Response], bucket: Optional[TokenBucket]
+    ) -> requests.Response:
+        """Make one call, recording its outcome with the breaker; 429 responses count as neither."""
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            response = send()
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise
+        if response.status_code not in RETRY_STATUS_CODES:
+            self.breaker.record_success()
+        elif response.status_code != 429:
+            self.breaker.record_failure()
+        return response
+
+    def recent_rate_limits(self, window_s: float) -> int:
+        """Return how many 429 responses were received in the last window_s seconds."""
+        since = self.clock() - window_s
+        return sum(1 for rate_limited_at in self.rate_limited_at if rate_limited_at >= since)
+
+
+_throttles: Registry[Throttle] = Registry()
+
+
+def get_throttle(scope: str, **settings) -> Throttle:
+    """Return the process-wide throttle of an endpoint for the given settings.
+
+    Rate limits and the circuit state must be shared by every call to the endpoint, so throttles are
+    kept at module level like sessions.
+    """
+    return _throttles.get((scope, *sorted(settings.items())), lambda: Throttle(**settings))
@@ -0,0 +1,75 @@
+"""Shared HTTP transport for outbound AssemblyAI and signed-URL calls."""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from registry import Registry
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# POST is left out: a submission whose response was lost may have created a job already.
+RETRY_METHODS = frozenset({"GET", "HEAD", "PUT"})
+
+_sessions: Registry[requests.Session] = Registry()
+
+
+def build_session(
+    pool_size: int, max_retries: int, backoff_factor: float, retry_statuses: bool = True
+) -> requests.Session:
+    """Build a keep-alive session with connection pooling and retry/backoff.
+
+    Connection errors and, if retry_statuses is set, responses with a status in RETRY_STATUS_CODES
+    are retried with exponential backoff, honouring any Retry-After header sent by the server. POST
+    requests are only retried when the connection could not be made, since read timeouts and
+    failed responses would submit a job twice. Sessions without status retries leave them to the
+    caller, see `throttle`.
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES if retry_statuses else None,
+        allowed_methods=RETRY_METHODS,
+        respect_retry_after_header=retry_statuses,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(
+    pool_size: int, max_retries: int, backoff_factor: float, retry_statuses: bool = True
+) -> requests.Session:
+    """Return the process-wide session for the given transport settings, creating it on first use.
+
+    Plugin instances are short-lived, so the session is shared at module level to keep connections
+    alive across requests.
+    """
+    return _sessions.get(
+        (pool_size, max_retries, backoff_factor, retry_statuses),
+        lambda: build_session(pool_size, max_retries, backoff_factor, retry_statuses),
+    )
+
+
+class ChunkedBody:
+    """Re-iterable request body yielding zero-copy chunks of a byte buffer.
+
+    Passing an iterable with a length makes requests stream it chunk by chunk under an explicit
+    Content-Length. Each chunk is a memoryview slice, so no further copy of the buffer is made, and the
+    body can be replayed when a request is retried.
+    """
+
+    def __init__(self, data: bytes, chunk_size: int):
+        self.data = memoryview(data)
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        for offset in range(0, len(self.data), self.chunk_size):
+            yield self.data[offset : offset + self.chunk_size]
+
+    def __len__(self) -> int:
+        return len(self.data)
@@ -0,0 +1,214 @@
+"""Offline benchmarks of the blockifier against synthetic transcripts and the AssemblyAI stand-in.
+
+Reports, for transcripts of each duration:
+
+* ``parse``: parse throughput in words per second, with the JSON tree loaded in full or streamed;
+* ``memory``: peak memory allocated while parsing the response body;
+* ``payload``: size of the serialized plugin output, per timestamp encoding;
+* ``end_to_end``: submit-to-output latency against the stand-in, and the overhead on top of the time
+  the stand-in spends queueing and processing the job.
+
+Run from the repository root, with the plugin sources on the path as under pytest, for instance::
+
+    PYTHONPATH=src python -m test.benchmark --durations 60 3600 36000 --json benchmarks.json
+"""
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+from test.stand_in import StandInServer
+from test.synthetic import synthetic_transcript
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+from uuid import uuid4
+
+from steamship.base import TaskState
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+from steamship.plugin.request import PluginRequest
+
+from api import AssemblyAIBlockifier, TimestampEncoding
+from parsers import parse_transcript
+from streaming import stream_transcript
+
+DURATIONS_S = (60, 600, 3600, 6 * 3600, 10 * 3600)
+CHUNK_SIZE = AssemblyAIBlockifier.STREAM_CHUNK_SIZE
+# Share of the audio duration the stand-in spends processing a job, as observed on AssemblyAI.
+PROCESSING_RATIO = 0.3
+
+
+class Measurement(NamedTuple):
+    """One benchmark result."""
+
+    benchmark: str
+    duration_s: float
+    variant: str
+    value: float
+    unit: str
+
+
+def _chunks(body: bytes) -> Iterator[bytes]:
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield body[start : start + CHUNK_SIZE]
+
+
+def _parse_variants(body: bytes, blockifier: AssemblyAIBlockifier) -> Dict[str, Callable]:
+    parsers = blockifier._parsers()
+    return {
+        "full": lambda: parse_transcript(json.loads(body), parsers),
+        "stream": lambda: stream_transcript(_chunks(body), parsers),
+    }
+
+
+def _blockifier(**config) -> AssemblyAIBlockifier:
+    return AssemblyAIBlockifier(config={"cache_mode": "none", **config})
+
+
+def bench_parse(duration_s: float, body: bytes, words: int, repeat: int) -> List[Measurement]:
+    """Measure the parse throughput and peak memory of each parse path and timestamp encoding."""
+    measurements = []
+    for encoding in TimestampEncoding:
+        blockifier = _blockifier(timestamp_encoding=encoding)
+        for name, parse in _parse_variants(body, blockifier).items():
+            variant = f"{name}/{encoding.value}"
+            best_s = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                parse()
+                best_s = min(best_s, time.perf_counter() - start)
+            measurements.append(
+                Measurement("parse", duration_s, variant, words / best_s, "words/s")
+            )
+
+            tracemalloc.start()
+            parse()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            measurements.append(Measurement("memory", duration_s, variant, peak / 2**20, "MB"))
+    return measurements
+
+
+def bench_payload(duration_s: float, transcript: Dict[str, Any]) -> List[Measurement]:
+    """Measure the size of the serialized plugin output for each timestamp encoding."""
+    measurements = []
+    for encoding in TimestampEncoding:
+        response = _blockifier(timestamp_encoding=encoding)._process_transcription_response(
+            transcript
+        )
+        output = json.dumps(response.data.dict(by_alias=True, exclude_none=True))
+        measurements.append(
+            Measurement("payload", duration_s, encoding.value, len(output) / 2**20, "MB")
+        )
+    return measurements
+
+
+def bench_end_to_end(
+    duration_s: float,
+    transcript: Dict[str, Any],
+    latency_s: float,
+    queue_s: float,
+    time_scale: float,
+) -> List[Measurement]:
+    """Measure the submit-to-output latency of one job against the stand-in.
+
+    The stand-in delays every response by latency_s, keeps the job queued for queue_s, and then
+    processing for PROCESSING_RATIO of the audio duration scaled by time_scale. Status checks are
+    spaced by the delays the blockifier suggests.
+    """
+    processing_s = duration_s * PROCESSING_RATIO * time_scale
+    blockifier = _blockifier(poll_min_delay_s=0.05, poll_max_delay_s=max(queue_s, processing_s, 1))
+    with StandInServer(transcript=transcript) as stand_in:
+        stand_in.latency_s, stand_in.queue_s, stand_in.processing_s = (
+            latency_s,
+            queue_s,
+            processing_s,
+        )
+        blockifier.BASE_URL = stand_in.url
+        start = time.perf_counter()
+        response = blockifier.run(PluginRequest(data=RawDataPluginInput(data=uuid4().bytes)))
+        while response.status is not None and response.status.state == TaskState.running:
+            time.sleep(response.status.remote_status_output["next_poll_delay_s"])
+            response = blockifier.run(PluginRequest(is_status_check=True, status=response.status))
+        latency = time.perf_counter() - start
+        polls = sum(1 for method, *_ in stand_in.requests if method == "GET")
+    return [
+        Measurement("end_to_end", duration_s, "latency", latency, "s"),
+        Measurement("end_to_end", duration_s, "overhead", latency - queue_s - processing_s, "s"),
+        Measurement("end_to_end", duration_s, "polls", polls, "requests"),
+    ]
+
+
+def run_benchmarks(
+    durations_s: Sequence[float] = DURATIONS_S,
+    repeat: int = 3,
+    end_to_end: bool = True,
+    latency_s: float = 0.05,
+    queue_s: float = 2.0,
+    time_scale: float = 0.001,
+) -> List[Measurement]:
+    """Run every benchmark on a synthetic transcript of each duration."""
+    measurements = []
+    for duration_s in durations_s:
+        transcript = synthetic_transcript(duration_s)
+        body = json.dumps(transcript).encode("utf-8")
+        measurements.append(Measurement("response", duration_s, "body", len(body) / 2**20, "MB"))
+        measurements.extend(bench_parse(duration_s, body, len(transcript["words"]), repeat))
+        measurements.extend(bench_payload(duration_s, transcript))
+        if end_to_end:
+            measurements.extend(
+                bench_end_to_end(duration_s, transcript, latency_s, queue_s, time_scale)
+            )
+    return measurements
+
+
+def format_table(measurements: Sequence[Measurement]) -> str:
+    """Render measurements as an aligned text table."""
+    rows = [("benchmark", "duration", "variant", "value", "unit")]
+    for measurement in measurements:
+        rows.append(
+            (
+                measurement.benchmark,
+                f"{measurement.duration_s / 60:g}min",
+                measurement.variant,
+                f"{measurement.value:,.2f}",
+                measurement.unit,
+            )
+        )
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(
+            cell.rjust(width) if column == 3 else cell.ljust(width)
+            for column, (cell, width) in enumerate(zip(row, widths))
+        )
+        for row in rows
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--durations", type=float, nargs="+", default=DURATIONS_S)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-end-to-end", action="store_true")
+    parser.add_argument("--latency-s", type=float, default=0.05)
+    parser.add_argument("--queue-s", type=float, default=2.0)
+    parser.add_argument("--time-scale", type=float, default=0.001)
+    parser.add_argument("--json", help="Also write the measurements to this JSON file.")
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    measurements = run_benchmarks(
+        args.durations,
+        repeat=args.repeat,
+        end_to_end=not args.skip_end_to_end,
+        latency_s=args.latency_s,
+        queue_s=args.queue_s,
+        time_scale=args.time_scale,
+    )
+    print(format_table(measurements))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([measurement._asdict() for measurement in measurements], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,53 @@
 """Set up testing environment."""
+from test.stand_in import StandInServer
+from typing import Callable
+
 import pytest
 from steamship import Steamship
 
+import cache
+import sharding
+import throttle
+import transport
+from api import AssemblyAIBlockifier
+
 
 @pytest.fixture
 def steamship_client() -> Steamship:
     """Init steamship client."""
     return Steamship()
+
+
+@pytest.fixture
+def stand_in() -> StandInServer:
+    """Run a local stand-in for the AssemblyAI API for the duration of a test."""
+    with StandInServer() as server:
+        yield server
+
+
+def _reset_shared_state() -> None:
+    """Drop the process-wide caches, throttles, token pools and sessions of earlier tests."""
+    cache._memory_caches.clear()
+    cache._result_caches.clear()
+    throttle._throttles.clear()
+    sharding._pools.clear()
+    for session in transport._sessions.values():
+        session.close()
+    transport._sessions.clear()
+
+
+@pytest.fixture
+def make_blockifier(stand_in: StandInServer) -> Callable[..., AssemblyAIBlockifier]:
+    """Build blockifiers with the given config that call the stand-in without retry backoff.
+
+    Process-wide state is reset around the test, so no cache entry or throttle outlives it.
+    """
+    _reset_shared_state()
+
+    def build(**config) -> AssemblyAIBlockifier:
+        blockifier = AssemblyAIBlockifier(config={"http_backoff_factor": 0, **config})
+        blockifier.BASE_URL = stand_in.url
+        return blockifier
+
+    yield build
+    _reset_shared_state()
@@ -0,0 +1,303 @@
+"""Local stand-in for the AssemblyAI REST and real-time APIs used by offline tests."""
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+from uuid import uuid4
+
+import requests
+
+from realtime import WebSocket, accept_key
+
+
+def make_transcript(text: str = "hello world this is a test", word_ms: int = 500) -> Dict[str, Any]:
+    """Build a minimal completed transcript response for the given text."""
+    words = []
+    for ix, word in enumerate(text.split(" ")):
+        words.append({"text": word, "start": ix * word_ms, "end": (ix + 1) * word_ms - 10})
+    return {
+        "status": "completed",
+        "text": text,
+        "words": words,
+        "utterances": [
+            {"text": text, "speaker": "A", "start": words[0]["start"], "end": words[-1]["end"]}
+        ],
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StandInServer"
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("content-length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict] = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _handle(self, method: str):
+        body = self._read_body()
+        self.server.requests.append((method, self.path, dict(self.headers), body))
+        if self.server.latency_s:
+            time.sleep(self.server.latency_s)
+        route_failures = self.server.fail_route.get(f"{method} {self.path.split('?')[0]}")
+        if self.server.fail_next or route_failures:
+            status = (route_failures or self.server.fail_next).pop(0)
+            headers = {"retry-after": self.server.retry_after} if self.server.retry_after else {}
+            self._send_json(status, {"error": f"stand-in failure {status}"}, headers)
+            return
+        self.server.route(self, method, body)
+
+    def do_GET(self):  # noqa: N802
+        self._handle("GET")
+
+    def do_POST(self):  # noqa: N802
+        self._handle("POST")
+
+    def do_PUT(self):  # noqa: N802
+        self._handle("PUT")
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Threaded HTTP server that mimics the AssemblyAI transcript and upload endpoints.
+
+    Real-time sessions at ``/realtime/ws`` answer with the words of ``transcript`` heard within the
+    streamed audio, or fail with ``realtime_error`` if set.
+
+    Jobs complete after ``polls_until_complete`` status checks and return ``transcript``, or the
+    result of ``transcribe`` applied to the uploaded audio of the job if set. For benchmarks, every
+    response can be delayed by ``latency_s``, and jobs stay queued for ``queue_s`` and then processing
+    for ``processing_s`` seconds after submission before they can complete.
+
+    Jobs and uploads belong to the token in the authorization header: other tokens cannot fetch the
+    job or submit the upload. A token in ``token_limits`` is answered 429 when submitting more jobs
+    than its limit while that many are still active.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, transcript: Optional[Dict[str, Any]] = None, polls_until_complete: int = 1):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.transcript = transcript or make_transcript()
+        self.transcribe: Optional[Callable[[bytes], Dict[str, Any]]] = None
+        self.polls_until_complete = polls_until_complete
+        self.latency_s = 0.0
+        self.queue_s = 0.0
+        self.processing_s = 0.0
+        self.connections = 0
+        self.requests: List = []
+        self.fail_next: List[int] = []
+        # Retry-After header value sent with failures, if any.
+        self.retry_after: Optional[str] = "0"
+        # Statuses to fail the next requests to a route with, keyed by e.g. "POST /transcript".
+        self.fail_route: Dict[str, List[int]] = {}
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.realtime_sessions: List[Dict[str, Any]] = []
+        self.realtime_error: Optional[str] = None
+        self.uploads: Dict[str, bytes] = {}
+        self.upload_tokens: Dict[str, str] = {}
+        self.active_jobs = 0
+        self.max_active_jobs = 0
+        self.token_limits: Dict[str, int] = {}
+        self.token_jobs: Dict[str, int] = {}
+
+    @property
+    def url(self) -> str:
+        """Base URL of the stand-in, to be used in place of the AssemblyAI base URL."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def route(self, handler: _Handler, method: str, body: bytes):
+        """Dispatch a request to the matching endpoint."""
+        path = handler.path.split("?")[0]
+        token = handler.headers.get("authorization", "")
+        if method == "POST" and path == "/transcript":
+            self._submit(handler, token, json.loads(body or b"{}"))
+        elif method == "GET" and path.startswith("/transcript/"):
+            job = self.jobs.get(path.split("/")[2])
+            if job is None or job["token"] != token:
+                handler._send_json(404, {"error": "transcript not found"})
+                return
+            job["polls"] += 1
+            status = self._job_status(job)
+            if status != "completed":
+                handler._send_json(200, {"id": path.split("/")[2], "status": status})
+            else:
+                with self.lock:
+                    if not job.get("delivered"):
+                        job["delivered"] = True
+                        self.active_jobs -= 1
+                        self.token_jobs[token] -= 1
+                handler._send_json(200, {"id": path.split("/")[2], **self._transcript(job)})
+        elif method == "POST" and path == "/upload":
+            upload_id = str(uuid4())
+            self.uploads[upload_id] = body
+            self.upload_tokens[upload_id] = token
+            handler._send_json(200, {"upload_url": f"{self.url}/files/{upload_id}"})
+        elif method == "GET" and path == "/realtime/ws":
+            self.realtime(handler)
+        elif method == "PUT" and path.startswith("/files/"):
+            self.uploads[path.split("/")[2]] = body
+            handler._send_json(200, {})
+        else:
+            handler._send_json(404, {"error": f"no route for {method} {path}"})
+
+    def _submit(self, handler: _Handler, token: str, request: Dict[str, Any]):
+        upload_id = request.get("audio_url", "").rsplit("/", 1)[-1]
+        if self.upload_tokens.get(upload_id, token) != token:
+            handler._send_json(400, {"error": "the upload belongs to another account"})
+            return
+        job_id = str(uuid4())
+        with self.lock:
+            if self.token_jobs.get(token, 0) >= self.token_limits.get(token, float("inf")):
+                handler._send_json(429, {"error": "too many jobs in progress"})
+                return
+            self.jobs[job_id] = {
+                "request": request,
+                "token": token,
+                "polls": 0,
+                "submitted_at": time.monotonic(),
+            }
+            self.active_jobs += 1
+            self.max_active_jobs = max(self.max_active_jobs, self.active_jobs)
+            self.token_jobs[token] = self.token_jobs.get(token, 0) + 1
+        handler._send_json(200, {"id": job_id, "status": "queued"})
+
+    def realtime(self, handler: _Handler):
+        """Run a real-time session over the websocket the handler's request asks to upgrade to.
+
+        Once the client terminates the session, the heard words are sent back five at a time, each
+        group as a partial and then a final transcript.
+        """
+        handler.send_response(101)
+        handler.send_header("Upgrade", "websocket")
+        handler.send_header("Connection", "Upgrade")
+        accept = accept_key(handler.headers["Sec-WebSocket-Key"].encode()).decode()
+        handler.send_header("Sec-WebSocket-Accept", accept)
+        handler.end_headers()
+        handler.close_connection = True
+        websocket = WebSocket(handler.rfile, handler.wfile.write, client=False)
+        query = parse_qs(urlsplit(handler.path).query)
+        session = {
+            "sample_rate": int(query["sample_rate"][0]),
+            "headers": dict(handler.headers),
+            "audio": b"",
+        }
+        self.realtime_sessions.append(session)
+        if self.realtime_error:
+            websocket.send_json({"error": self.realtime_error})
+            websocket.close(4001)
+            return
+        websocket.send_json({"message_type": "SessionBegins", "session_id": str(uuid4())})
+        for text in iter(websocket.receive, None):
+            message = json.loads(text)
+            if message.get("terminate_session"):
+                break
+            session["audio"] += base64.b64decode(message["audio_data"])
+        heard_ms = len(session["audio"]) * 1000 / (session["sample_rate"] * 2)
+        words = [word for word in self.transcript["words"] if word["start"] < heard_ms]
+        for offset in range(0, len(words), 5):
+            group = words[offset : offset + 5]
+            for message_type in ("PartialTranscript", "FinalTranscript"):
+                websocket.send_json(
+                    {
+                        "message_type": message_type,
+                        "audio_start": group[0]["start"],
+                        "audio_end": group[-1]["end"],
+                        "text": " ".join(word["text"] for word in group),
+                        "words": group,
+                    }
+                )
+        websocket.send_json({"message_type": "SessionTerminated"})
+        websocket.receive()
+
+    def _job_status(self, job: Dict[str, Any]) -> str:
+        if job.get("completed"):
+            return "completed"
+        waited_s = time.monotonic() - job["submitted_at"]
+        if waited_s < self.queue_s:
+            return "queued"
+        if waited_s < self.queue_s + self.processing_s or job["polls"] < self.polls_until_complete:
+            return "processing"
+        return "completed"
+
+    def _transcript(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        if self.transcribe is None:
+            return self.transcript
+        upload_id = job["request"].get("audio_url", "").rsplit("/", 1)[-1]
+        return self.transcribe(self.uploads[upload_id])
+
+    def complete_job(self, job_id: str, status: str = "completed"):
+        """Mark a job as finished and send the webhook notification it registered, if any."""
+        job = self.jobs[job_id]
+        job["completed"] = True
+        webhook_url = job["request"].get("webhook_url")
+        if webhook_url:
+            requests.post(webhook_url, json={"transcript_id": job_id, "status": status})
+
+    def __enter__(self) -> "StandInServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+class _CallbackHandler(BaseHTTPRequestHandler):
+    server: "CallbackServer"
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+    def do_POST(self):  # noqa: N802
+        length = int(self.headers.get("content-length") or 0)
+        self.server.callback(json.loads(self.rfile.read(length)))
+        self.send_response(200)
+        self.send_header("content-length", "0")
+        self.end_headers()
+
+
+class CallbackServer(ThreadingHTTPServer):
+    """HTTP server passing the JSON body of every POST to a callback.
+
+    Stands in for the Steamship endpoint that receives AssemblyAI webhooks.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, callback: Callable[[Dict[str, Any]], None]):
+        super().__init__(("127.0.0.1", 0), _CallbackHandler)
+        self.callback = callback
+
+    @property
+    def url(self) -> str:
+        """URL to register as webhook."""
+        return f"http://127.0.0.1:{self.server_address[1]}/webhook"
+
+    def __enter__(self) -> "CallbackServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,128 @@
+"""Generator of synthetic AssemblyAI transcript responses with all features enabled."""
+import random
+from typing import Any, Dict, List
+
+VOCABULARY = (
+    "the a of to and in is it that for on with as was at by this be from or have an they which "
+    "one you were all we there can more if no when your about out up what so into some time "
+    "podcast episode voice message market weather music science travel london paris monday"
+).split(" ")
+ENTITY_TYPES = ["location", "person_name", "organization", "date", "event"]
+TOPICS = [
+    "Technology&Computing>Consumer Electronics",
+    "Travel>Travel Locations>Europe Travel",
+    "Science>Weather",
+    "Music and Audio>Talk Radio",
+    "Business and Finance>Economy",
+]
+SENTIMENTS = ["POSITIVE", "NEUTRAL", "NEGATIVE"]
+
+WORDS_PER_SECOND = 2.5
+WORDS_PER_UTTERANCE = 40
+WORDS_PER_SENTENCE = 12
+WORDS_PER_TOPIC_FRAGMENT = 60
+WORDS_PER_ENTITY = 25
+SECONDS_PER_CHAPTER = 300
+
+
+def _span(words: List[Dict[str, Any]], start: int, end: int) -> Dict[str, Any]:
+    return {
+        "text": " ".join(word["text"] for word in words[start:end]),
+        "start": words[start]["start"],
+        "end": words[end - 1]["end"],
+    }
+
+
+def synthetic_transcript(duration_s: float, seed: int = 0) -> Dict[str, Any]:
+    """Build a completed transcript response of roughly duration_s seconds of speech.
+
+    Utterances, sentiments, topic fragments and chapters partition the words; entities span one or
+    two words and every other entity is offset by a few milliseconds from the word boundaries.
+    """
+    rng = random.Random(seed)
+    word_ms = int(1000 / WORDS_PER_SECOND)
+    words = []
+    for ix in range(max(int(duration_s * WORDS_PER_SECOND), 1)):
+        start = ix * word_ms
+        words.append(
+            {
+                "text": rng.choice(VOCABULARY),
+                "start": start,
+                "end": start + word_ms - rng.randint(10, 80),
+                "confidence": round(rng.uniform(0.6, 1.0), 3),
+            }
+        )
+
+    utterances = []
+    for ix, start in enumerate(range(0, len(words), WORDS_PER_UTTERANCE)):
+        end = min(start + WORDS_PER_UTTERANCE, len(words))
+        utterances.append({**_span(words, start, end), "speaker": "AB"[ix % 2]})
+
+    sentiments = []
+    for start in range(0, len(words), WORDS_PER_SENTENCE):
+        end = min(start + WORDS_PER_SENTENCE, len(words))
+        sentiments.append(
+            {
+                **_span(words, start, end),
+                "sentiment": rng.choice(SENTIMENTS),
+                "confidence": round(rng.uniform(0.5, 1.0), 3),
+            }
+        )
+
+    topic_results = []
+    for start in range(0, len(words), WORDS_PER_TOPIC_FRAGMENT):
+        span = _span(words, start, min(start + WORDS_PER_TOPIC_FRAGMENT, len(words)))
+        topic_results.append(
+            {
+                "text": span["text"],
+                "timestamp": {"start": span["start"], "end": span["end"]},
+                "labels": [
+                    {"label": label, "relevance": round(rng.random(), 3)}
+                    for label in rng.sample(TOPICS, 3)
+                ],
+            }
+        )
+
+    entities = []
+    for ix, start in enumerate(range(0, len(words) - 1, WORDS_PER_ENTITY)):
+        span = _span(words, start, start + rng.randint(1, 2))
+        jitter = 7 if ix % 2 else 0
+        entities.append(
+            {
+                "text": span["text"],
+                "entity_type": rng.choice(ENTITY_TYPES),
+                "start": span["start"] + jitter,
+                "end": span["end"] - jitter,
+            }
+        )
+
+    chapters = []
+    words_per_chapter = int(SECONDS_PER_CHAPTER * WORDS_PER_SECOND)
+    for start in range(0, len(words), words_per_chapter):
+        span = _span(words, start, min(start + words_per_chapter, len(words)))
+        chapters.append(
+            {
+                "summary": span["text"][:200],
+                "headline": span["text"][:60],
+                "gist": span["text"][:20],
+                "start": span["start"],
+                "end": span["end"],
+            }
+        )
+
+    return {
+        "id": f"synthetic-{duration_s}",
+        "status": "completed",
+        "audio_duration": duration_s,
+        "text": " ".join(word["text"] for word in words),
+        "words": words,
+        "utterances": utterances,
+        "sentiment_analysis_results": sentiments,
+        "iab_categories_result": {
+            "status": "success",
+            "results": topic_results,
+            "summary": {topic: round(rng.random(), 3) for topic in TOPICS},
+        },
+        "entities": entities,
+        "chapters": chapters,
+    }
@@ -0,0 +1,33 @@
+"""Test concurrent batch blockification against the AssemblyAI stand-in."""
+from test.stand_in import StandInServer
+
+
+def test_batch_caps_in_flight_jobs(stand_in: StandInServer, make_blockifier):
+    """All inputs finish while no more than batch_max_in_flight jobs run at once."""
+    stand_in.polls_until_complete = 3
+    blockifier = make_blockifier(
+        batch_max_in_flight=2, poll_min_delay_s=0.01, poll_max_delay_s=0.05
+    )
+    inputs = [(f"file-{ix}", f"audio {ix}".encode()) for ix in range(6)]
+
+    results = list(blockifier.run_batch(inputs))
+
+    assert sorted(result.key for result in results) == [key for key, _ in inputs]
+    assert all(result.error is None for result in results)
+    assert all(result.response.data.file.blocks for result in results)
+    assert len(stand_in.jobs) == 6
+    assert stand_in.max_active_jobs == 2
+    assert sorted(stand_in.uploads.values()) == sorted(data for _, data in inputs)
+
+
+def test_batch_reports_failed_jobs(stand_in: StandInServer, make_blockifier):
+    """A job that fails is yielded with its error and does not stop the batch."""
+    blockifier = make_blockifier(http_max_retries=0, batch_max_in_flight=1)
+    stand_in.fail_route["POST /transcript"] = [400]
+
+    results = {
+        result.key: result for result in blockifier.run_batch([("bad", b"a"), ("good", b"b")])
+    }
+
+    assert results["bad"].error is not None
+    assert results["good"].response.data is not None
@@ -0,0 +1,19 @@
+"""Smoke test of the offline benchmark suite."""
+from test.benchmark import format_table, run_benchmarks
+
+
+def test_benchmarks_report_every_measurement():
+    """A short run reports every benchmark with sensible values."""
+    measurements = run_benchmarks(
+        durations_s=[60], repeat=1, latency_s=0.01, queue_s=0.1, time_scale=0.01
+    )
+    by_name = {(m.benchmark, m.variant): m for m in measurements}
+
+    for variant in ("full/per_word", "stream/per_word", "full/columnar", "stream/columnar"):
+        assert by_name[("parse", variant)].value > 0
+        assert by_name[("memory", variant)].value > 0
+    assert by_name[("payload", "columnar")].value < by_name[("payload", "per_word")].value
+    latency = by_name[("end_to_end", "latency")].value
+    assert 0.28 <= latency < 10
+    assert by_name[("end_to_end", "polls")].value >= 1
+    assert "end_to_end" in format_table(measurements)
@@ -0,0 +1,147 @@
+"""Test the content-addressed transcription cache."""
+import time
+from test.stand_in import StandInServer
+from types import SimpleNamespace
+from uuid import uuid4
+
+from steamship.base import TaskState
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+from steamship.plugin.request import PluginRequest
+
+from api import AssemblyAIBlockifier
+from cache import InMemoryCache, WorkspaceCache
+from transport import get_session
+
+
+def _blockifier(make_blockifier, monkeypatch, **config) -> AssemblyAIBlockifier:
+    blockifier = make_blockifier(**config)
+    uploads = []
+    monkeypatch.setattr(
+        blockifier,
+        "_upload_audio_file",
+        lambda mime_type, data, shard=None: uploads.append(data) or "http://example.com/audio.mp3",
+    )
+    blockifier.uploads = uploads
+    return blockifier
+
+
+def _request(data: bytes) -> PluginRequest:
+    return PluginRequest(data=RawDataPluginInput(data=data))
+
+
+def test_repeat_request_is_served_from_cache(stand_in: StandInServer, monkeypatch, make_blockifier):
+    """A second run on the same bytes and config neither uploads nor submits a job."""
+    audio = uuid4().bytes
+    blockifier = _blockifier(make_blockifier, monkeypatch)
+    first = blockifier.run(_request(audio))
+    second = _blockifier(make_blockifier, monkeypatch).run(_request(audio))
+
+    assert len(stand_in.jobs) == 1
+    assert len(blockifier.uploads) == 1
+    assert second.data.file.blocks[0].text == first.data.file.blocks[0].text
+    assert len(second.data.file.blocks[0].tags) == len(first.data.file.blocks[0].tags)
+
+
+def test_memory_entries_hold_job_ids_only(stand_in: StandInServer, make_blockifier, monkeypatch):
+    """In-memory entries keep no output, which is served from the result cache instead."""
+    audio = uuid4().bytes
+    blockifier = _blockifier(make_blockifier, monkeypatch)
+    first = blockifier.run(_request(audio))
+    (entry,) = blockifier.cache._entries.values()
+    second = _blockifier(make_blockifier, monkeypatch).run(_request(audio))
+
+    assert set(entry[1]) == {"transcription_id", "shard"}
+    assert second.data.dict() == first.data.dict()
+    assert len([path for _, path, *_ in stand_in.requests if path.startswith("/transcript/")]) == 1
+
+
+def test_running_job_is_reused(stand_in: StandInServer, monkeypatch, make_blockifier):
+    """A repeat request for a job still processing polls the existing job."""
+    stand_in.polls_until_complete = 3
+    audio = uuid4().bytes
+    first = _blockifier(make_blockifier, monkeypatch).run(_request(audio))
+    repeat = _blockifier(make_blockifier, monkeypatch)
+    second = repeat.run(_request(audio))
+
+    assert first.status.state == TaskState.running
+    assert second.status.state == TaskState.running
+    assert len(stand_in.jobs) == 1
+    assert repeat.uploads == []
+    assert (
+        second.status.remote_status_input["transcription_id"]
+        == first.status.remote_status_input["transcription_id"]
+    )
+
+
+def test_config_is_part_of_the_key(stand_in: StandInServer, monkeypatch, make_blockifier):
+    """The same bytes transcribed with a different config start a new job."""
+    audio = uuid4().bytes
+    _blockifier(make_blockifier, monkeypatch, speaker_detection=True).run(_request(audio))
+    _blockifier(make_blockifier, monkeypatch, speaker_detection=False).run(_request(audio))
+
+    assert len(stand_in.jobs) == 2
+
+
+def test_in_memory_cache_evicts_and_expires():
+    """The in-memory store evicts least recently used entries and expires old ones."""
+    cache = InMemoryCache(max_entries=2, ttl_s=0.05)
+    cache.put("a", {"transcription_id": "a"})
+    cache.put("b", {"transcription_id": "b"})
+    assert cache.get("a") is not None
+    cache.put("c", {"transcription_id": "c"})
+
+    assert cache.get("b") is None
+    assert len(cache) == 2
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 2
+
+
+def test_accounts_do_not_share_entries(stand_in: StandInServer, monkeypatch, make_blockifier):
+    """The same bytes sent with another token start a job of that account."""
+    audio = uuid4().bytes
+    stand_in.polls_until_complete = 3
+    _blockifier(make_blockifier, monkeypatch, assembly_api_token="tenant-a").run(_request(audio))
+    response = _blockifier(make_blockifier, monkeypatch, assembly_api_token="tenant-b").run(
+        _request(audio)
+    )
+
+    assert response.status.state == TaskState.running
+    assert sorted(job["token"] for job in stand_in.jobs.values()) == ["tenant-a", "tenant-b"]
+
+
+def test_entry_of_an_unknown_job_is_a_miss(stand_in: StandInServer, monkeypatch, make_blockifier):
+    """A cached job AssemblyAI no longer returns is replaced by a new job."""
+    audio = uuid4().bytes
+    stand_in.polls_until_complete = 3
+    blockifier = _blockifier(make_blockifier, monkeypatch)
+    blockifier.run(_request(audio))
+    stand_in.jobs.clear()
+
+    response = _blockifier(make_blockifier, monkeypatch).run(_request(audio))
+
+    assert response.status.state == TaskState.running
+    assert len(stand_in.jobs) == 1
+
+
+class _Workspace:
+    """Workspace whose signed URLs all point at one base URL."""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def create_signed_url(self, request):
+        return SimpleNamespace(signed_url=f"{self.url}/files/{request.filepath}")
+
+
+def test_unavailable_workspace_cache_is_a_miss(stand_in: StandInServer):
+    """Bucket requests that fail or time out count as misses and dropped writes."""
+    stand_in.latency_s = 0.3
+    session = get_session(pool_size=1, max_retries=0, backoff_factor=0)
+    for url in ("http://127.0.0.1:1", stand_in.url):
+        cache = WorkspaceCache(_Workspace(url), session, ttl_s=60, timeout_s=0.1)
+
+        cache.put("key", {"transcription_id": "a"})
+        assert cache.get("key") is None
+        assert cache.stats.misses == 1
@@ -0,0 +1,111 @@
+"""Test merging runs of same-named topic and sentiment tags."""
+from test.stand_in import StandInServer
+from test.synthetic import synthetic_transcript
+
+from steamship import Tag
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+from steamship.plugin.request import PluginRequest
+
+from coalescing import coalesce_tags
+from parsers import parse_transcript
+
+
+def _tag(kind: str, name: str, start: int, end: int, confidence: float) -> Tag:
+    return Tag.construct(
+        kind=kind,
+        name=name,
+        start_idx=start // 100,
+        end_idx=end // 100,
+        value={"confidence": confidence, "start_time": start, "end_time": end},
+    )
+
+
+def test_adjacent_sentences_with_the_same_sentiment_merge():
+    """Consecutive same-named spans merge; another name or a long pause ends the run."""
+    tags = [
+        _tag("sentiment", "POSITIVE", 0, 900, 0.6),
+        _tag("sentiment", "POSITIVE", 1000, 1900, 0.8),
+        _tag("sentiment", "NEGATIVE", 2000, 2300, 0.9),
+        _tag("sentiment", "POSITIVE", 2400, 2900, 0.7),
+        _tag("sentiment", "POSITIVE", 9000, 9900, 0.7),
+    ]
+
+    coalesced, removed = coalesce_tags(tags, max_gap_ms=1000)
+
+    assert removed == 1
+    assert [(tag.name, tag.start_idx, tag.end_idx) for tag in coalesced] == [
+        ("POSITIVE", 0, 19),
+        ("NEGATIVE", 20, 23),
+        ("POSITIVE", 24, 29),
+        ("POSITIVE", 90, 99),
+    ]
+    assert coalesced[0].value == {
+        "confidence": 0.8,
+        "mean_confidence": 0.7,
+        "start_time": 0,
+        "end_time": 1900,
+        "count": 2,
+    }
+
+
+def test_topic_labels_merge_across_fragments():
+    """Each label repeated over consecutive topic fragments becomes one run."""
+    tags = [
+        _tag("topic", "Sports", 0, 900, 0.5),
+        _tag("topic", "News", 0, 900, 0.4),
+        _tag("topic", "Sports", 1000, 1900, 0.9),
+        _tag("topic", "Music", 1000, 1900, 0.3),
+        _tag("topic", "Sports", 2000, 2900, 0.1),
+        _tag("topic", "News", 2000, 2900, 0.2),
+        _tag("speaker", "A", 0, 2900, 1.0),
+    ]
+
+    coalesced, removed = coalesce_tags(tags, max_gap_ms=1000)
+
+    assert removed == 2
+    assert [
+        (tag.kind, tag.name, tag.value["start_time"], tag.value["end_time"]) for tag in coalesced
+    ] == [
+        ("topic", "Sports", 0, 2900),
+        ("topic", "News", 0, 900),
+        ("topic", "Music", 1000, 1900),
+        ("topic", "News", 2000, 2900),
+        ("speaker", "A", 0, 2900),
+    ]
+
+
+def test_coalescing_keeps_coverage_of_a_long_transcript():
+    """Fewer tags cover exactly the times each name covered before."""
+    tags = parse_transcript(synthetic_transcript(1800))
+
+    coalesced, removed = coalesce_tags(tags, max_gap_ms=1000)
+
+    assert len(coalesced) == len(tags) - removed
+    for tag in tags:
+        if tag.kind in ("topic", "sentiment"):
+            assert any(
+                merged.kind == tag.kind
+                and merged.name == tag.name
+                and merged.value["start_time"] <= tag.value["start_time"]
+                and merged.value["end_time"] >= tag.value["end_time"]
+                for merged in coalesced
+            )
+
+
+def test_blockifier_reports_removed_tags(stand_in: StandInServer, make_blockifier):
+    """The number of tags removed is reported as the tags_coalesced counter."""
+    stand_in.transcript = synthetic_transcript(600)
+    events = []
+    blockifier = make_blockifier(coalesce_spans=True)
+    blockifier.metrics_hook = events.append
+
+    response = blockifier.run(PluginRequest(data=RawDataPluginInput(data=b"audio")))
+
+    counters = events[-1]["counters"]
+    uncoalesced = parse_transcript(stand_in.transcript)
+    (block,) = response.data.file.blocks
+    assert counters["tags_coalesced"] > 0
+    assert (
+        len(block.tags) + len(response.data.file.tags)
+        == len(uncoalesced) - counters["tags_coalesced"]
+    )
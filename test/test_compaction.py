@@ -0,0 +1,97 @@
+"""Test downmixing and resampling of uncompressed audio before upload."""
+import io
+import math
+import wave
+from array import array
+from test import TEST_DATA
+from test.stand_in import StandInServer, make_transcript
+
+import pytest
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+from steamship.plugin.request import PluginRequest
+
+from audio import CompactWav, compact_audio, estimate_duration_s, parse_wav_header
+
+
+def _wav(
+    seconds: float, sample_rate: int = 48000, channels: int = 2, sample_width: int = 2
+) -> bytes:
+    """Build a 440 Hz tone, with each sample scaled down to sample_width bytes."""
+    peak = 2 ** (8 * sample_width - 1) - 1
+    frames = bytearray()
+    for ix in range(int(seconds * sample_rate)):
+        sample = round(0.5 * peak * math.sin(2 * math.pi * 440 * ix / sample_rate))
+        if sample_width == 1:
+            sample += 128
+        encoded = sample.to_bytes(sample_width, "little", signed=sample_width > 1)
+        frames += encoded * channels
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(sample_width)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+def _rms(wav: bytes) -> float:
+    samples = array("h", wav[parse_wav_header(wav).data_offset :])
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+@pytest.mark.parametrize(
+    "sample_rate, channels, sample_width",
+    [(48000, 2, 2), (44100, 2, 2), (22050, 1, 3), (32000, 6, 4), (44100, 2, 1)],
+)
+def test_pcm_is_compacted_to_16khz_mono(sample_rate: int, channels: int, sample_width: int):
+    """PCM WAV is converted to 16-bit mono at 16 kHz, keeping its duration and loudness."""
+    audio = _wav(1.5, sample_rate, channels, sample_width)
+
+    compact = compact_audio(audio)
+    data = b"".join(compact)
+
+    assert len(data) == len(compact) < len(audio)
+    wav = parse_wav_header(data)
+    assert (wav.channels, wav.sample_rate, wav.bits_per_sample) == (1, 16000, 16)
+    assert estimate_duration_s(data) == pytest.approx(estimate_duration_s(audio), abs=1 / 16000)
+    assert _rms(data) == pytest.approx(0.5 * 32767 / math.sqrt(2), rel=0.1)
+
+
+def test_compaction_streams_in_chunks():
+    """Converting in small chunks gives the same audio as converting at once."""
+    audio = _wav(1.0, 44100, 2)
+    wav = parse_wav_header(audio)
+
+    chunked = CompactWav(wav, audio, chunk_frames=1000)
+
+    assert max(len(chunk) for chunk in list(chunked)[1:]) < 1000
+    assert b"".join(chunked) == b"".join(CompactWav(wav, audio, chunk_frames=len(audio)))
+
+
+def test_compressed_and_compact_audio_pass_through():
+    """Compressed formats and audio already at 16 kHz mono are not converted."""
+    assert compact_audio((TEST_DATA / "test_conversation.mp3").read_bytes()) is None
+    assert compact_audio(b"OggS" + bytes(100)) is None
+    assert compact_audio(_wav(0.5, 16000, 1)) is None
+    assert compact_audio(_wav(0.5, 8000, 1, 1)) is None
+
+
+def test_compacted_upload_keeps_timestamps(stand_in: StandInServer, make_blockifier):
+    """The smaller upload yields the same output and reports the bytes saved."""
+    stand_in.transcribe = lambda audio: make_transcript(
+        "one two three", word_ms=round(estimate_duration_s(audio) * 1000 / 3)
+    )
+    audio = _wav(3.0)
+    outputs, events = [], []
+    for compact in (False, True):
+        blockifier = make_blockifier(compact_audio=compact)
+        blockifier.metrics_hook = events.append
+        response = blockifier.run(PluginRequest(data=RawDataPluginInput(data=audio)))
+        outputs.append(response.data.dict())
+
+    assert outputs[0] == outputs[1]
+    original, compacted = stand_in.uploads.values()
+    assert original == audio
+    assert parse_wav_header(compacted).sample_rate == 16000
+    assert events[-1]["counters"]["bytes_uploaded"] == len(compacted)
+    assert events[-1]["counters"]["bytes_saved"] == len(audio) - len(compacted)
@@ -0,0 +1,60 @@
+"""Test the feature plan that selects AssemblyAI request flags and parsers."""
+from test.stand_in import StandInServer
+from test.synthetic import synthetic_transcript
+
+import pytest
+from steamship import SteamshipError
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+from steamship.plugin.request import PluginRequest
+
+from features import REQUEST_FLAGS, plan_features
+from parsers import parse_timestamps, parse_topic_summaries
+
+
+def test_plan_for_fine_grained_tag_kinds():
+    """A single tag kind requests only its flag and runs only its parser."""
+    plan = plan_features(["topic_summary"])
+
+    assert plan.tag_kinds == ("topic_summary",)
+    assert plan.parsers == (parse_topic_summaries,)
+    assert plan.request_flags == {flag: flag == "iab_categories" for flag in REQUEST_FLAGS}
+
+
+def test_plan_exclusions_apply_to_defaults():
+    """Exclusions alone remove features from the default selection."""
+    plan = plan_features(["-timestamps", " -topics"], default=["timestamps", "audio_intelligence"])
+
+    assert plan.tag_kinds == ("sentiment", "chapter", "entity")
+    assert parse_timestamps not in plan.parsers
+    assert not plan.request_flags["iab_categories"]
+    assert plan.request_flags["entity_detection"]
+
+
+def test_plan_rejects_unknown_features():
+    """Unknown feature names are reported with the known ones."""
+    with pytest.raises(SteamshipError, match="Known features"):
+        plan_features(["speaker", "highlights"])
+
+
+def test_legacy_flags_select_default_features(make_blockifier):
+    """Without a features list the legacy booleans select the features."""
+    blockifier = make_blockifier(speaker_detection=False, enable_audio_intelligence=False)
+
+    assert blockifier.feature_plan.tag_kinds == ("timestamp",)
+    assert not any(blockifier.feature_plan.request_flags.values())
+
+
+def test_features_drive_request_and_parsers(stand_in: StandInServer, make_blockifier):
+    """Only the selected features are requested from AssemblyAI and parsed into tags."""
+    stand_in.transcript = synthetic_transcript(120)
+    blockifier = make_blockifier(features="speakers,entities")
+
+    response = blockifier.run(PluginRequest(data=RawDataPluginInput(data=b"audio")))
+
+    (job,) = stand_in.jobs.values()
+    assert {flag for flag in REQUEST_FLAGS if job["request"][flag]} == {
+        "speaker_labels",
+        "entity_detection",
+    }
+    (block,) = response.data.file.blocks
+    assert {tag.kind for tag in block.tags} == {"speaker", "entity"}
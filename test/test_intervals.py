@@ -0,0 +1,116 @@
+"""Test the interval index tag and its time and character range lookups."""
+import random
+from test.stand_in import StandInServer
+from test.synthetic import synthetic_transcript
+from typing import List
+
+import pytest
+from steamship import Block, Tag
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+from steamship.plugin.request import PluginRequest
+
+from intervals import INTERVAL_INDEX_KIND, IntervalIndex, IntervalTree, build_interval_index
+from parsers import (
+    PARSERS,
+    decode_columnar_timestamps,
+    parse_columnar_timestamps,
+    parse_timestamps,
+    parse_transcript,
+)
+
+
+def _key(tag: Tag):
+    return tag.kind, tag.name, tag.start_idx, tag.end_idx
+
+
+def _scan_time(tags: List[Tag], start_ms: int, end_ms: int) -> List[Tag]:
+    return [
+        tag
+        for tag in tags
+        if isinstance(tag.value, dict)
+        and tag.value.get("start_time") is not None
+        and tag.value["start_time"] <= end_ms
+        and tag.value["end_time"] >= start_ms
+    ]
+
+
+def _expanded(block: Block) -> List[Tag]:
+    tags = []
+    for tag in block.tags:
+        if tag.kind == "timestamps":
+            tags.extend(decode_columnar_timestamps(tag, block.text))
+        elif tag.kind != INTERVAL_INDEX_KIND:
+            tags.append(tag)
+    return tags
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 7, 16, 100, 1000])
+def test_tree_matches_a_linear_scan(size: int):
+    """Overlap queries return exactly the intervals a linear scan finds."""
+    rng = random.Random(size)
+    intervals = sorted(
+        (start, start + rng.choice([1, 5, 50, 5000]))
+        for start in rng.choices(range(10_000), k=size)
+    )
+    tree = IntervalTree([start for start, _ in intervals], [end for _, end in intervals])
+
+    for _ in range(200):
+        start = rng.randrange(-100, 10_100)
+        end = start + rng.choice([1, 10, 1000])
+        expected = [ix for ix, (s, e) in enumerate(intervals) if s < end and start < e]
+        assert tree.overlapping(start, end) == expected
+
+
+@pytest.mark.parametrize("timestamps", [parse_timestamps, parse_columnar_timestamps])
+def test_index_lookups_match_tag_scans(timestamps):
+    """Time and character lookups return the tags covering the range, words expanded."""
+    transcript = synthetic_transcript(600)
+    parsers = [timestamps if parser is parse_timestamps else parser for parser in PARSERS]
+    tags = parse_transcript(transcript, parsers)
+    block = Block(text=transcript["text"], tags=tags + [build_interval_index(tags)])
+    expanded = _expanded(block)
+    index = IntervalIndex(block)
+
+    for time_ms in (0, 1234, 300_000, 599_000):
+        assert sorted(map(_key, index.at_time(time_ms))) == sorted(
+            map(_key, _scan_time(expanded, time_ms, time_ms))
+        )
+    assert sorted(map(_key, index.overlapping_time(100_000, 160_000))) == sorted(
+        map(_key, _scan_time(expanded, 100_000, 160_000))
+    )
+    in_chars = [
+        tag
+        for tag in expanded
+        if tag.start_idx is not None and tag.start_idx < 2000 and tag.end_idx > 1500
+    ]
+    assert sorted(map(_key, index.overlapping_chars(1500, 2000))) == sorted(map(_key, in_chars))
+    words = [tag for tag in index.at_time(1234) if tag.kind == "timestamp"]
+    assert words and all(tag.name for tag in words)
+
+
+def test_blocks_carry_an_index_when_enabled(stand_in: StandInServer, make_blockifier):
+    """Each output block ends with its interval index tag."""
+    stand_in.transcript = synthetic_transcript(300)
+    blockifier = make_blockifier(interval_index=True, segmentation="utterance")
+
+    response = blockifier.run(PluginRequest(data=RawDataPluginInput(data=b"audio")))
+
+    blocks = response.data.file.blocks
+    assert len(blocks) > 1
+    for block in blocks:
+        assert block.tags[-1].kind == INTERVAL_INDEX_KIND
+        (speaker,) = [tag for tag in block.tags if tag.kind == "speaker"]
+        assert speaker in IntervalIndex(block).at_time(speaker.value["start_time"])
+
+
+def test_stale_index_is_rejected():
+    """An index whose tags were reordered or filtered after it was built refuses to load."""
+    transcript = synthetic_transcript(60)
+    tags = parse_transcript(transcript, PARSERS)
+    index = build_interval_index(tags)
+    text = transcript["text"]
+
+    IntervalIndex(Block(text=text, tags=[index] + tags))
+    for stale in (tags[::-1], tags[1:]):
+        with pytest.raises(ValueError, match="stale"):
+            IntervalIndex(Block(text=text, tags=stale + [index]))
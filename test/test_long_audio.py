@@ -0,0 +1,174 @@
+"""Test split-and-stitch transcription of long audio against the AssemblyAI stand-in."""
+import random
+from array import array
+from test import TEST_DATA
+from test.stand_in import StandInServer
+from typing import Any, Dict, List
+
+import pytest
+from steamship import SteamshipError
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+from steamship.plugin.request import PluginRequest
+
+from audio import WavInfo, estimate_duration_s, parse_wav_header, split_audio, wav_header
+
+SAMPLE_RATE = 16000
+WORD_MS = 500
+SPOKEN_MS = 400
+
+
+def _recording(duration_s: int, seed: int = 0) -> bytes:
+    """16 kHz mono WAV of a word every 500 ms: 400 ms of loud noise, then 100 ms of quiet noise."""
+    rng = random.Random(seed)
+    samples = array("h")
+    for ix in range(duration_s * SAMPLE_RATE):
+        loud = ix * 1000 // SAMPLE_RATE % WORD_MS < SPOKEN_MS
+        samples.append(rng.randint(-8000, 8000) if loud else rng.randint(-3, 3))
+    wav = WavInfo(1, 1, SAMPLE_RATE, 16, 44, len(samples) * 2)
+    return wav_header(wav, wav.data_size) + samples.tobytes()
+
+
+def _words(duration_s: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "text": f"w{ix}",
+            "start": ix * WORD_MS,
+            "end": ix * WORD_MS + SPOKEN_MS,
+            "speaker": "A" if ix // 10 % 2 == 0 else "B",
+        }
+        for ix in range(duration_s * 1000 // WORD_MS)
+    ]
+
+
+def _transcriber(recording: bytes, words: List[Dict[str, Any]]):
+    """Transcribe a segment by locating its samples in the recording.
+
+    Speaker labels are swapped in every segment but the first, as AssemblyAI labels each job afresh.
+    """
+    pcm = recording[44:]
+
+    def transcribe(audio: bytes) -> Dict[str, Any]:
+        wav = parse_wav_header(audio)
+        segment = audio[wav.data_offset :]
+        offset_ms = pcm.find(segment[:3200]) // 2 * 1000 // SAMPLE_RATE
+        end_ms = offset_ms + len(segment) // 2 * 1000 // SAMPLE_RATE
+        swap = {"A": "B", "B": "A"} if offset_ms else {"A": "A", "B": "B"}
+        local = [
+            {
+                **word,
+                "start": word["start"] - offset_ms,
+                "end": word["end"] - offset_ms,
+                "speaker": swap[word["speaker"]],
+            }
+            for word in words
+            if offset_ms <= word["start"] and word["end"] <= end_ms
+        ]
+        utterances = []
+        for word in local:
+            if utterances and utterances[-1]["speaker"] == word["speaker"]:
+                utterances[-1]["words"].append(word)
+                utterances[-1]["end"] = word["end"]
+            else:
+                utterances.append(
+                    {
+                        "speaker": word["speaker"],
+                        "start": word["start"],
+                        "end": word["end"],
+                        "words": [word],
+                    }
+                )
+        for utterance in utterances:
+            utterance["text"] = " ".join(word["text"] for word in utterance["words"])
+        return {
+            "status": "completed",
+            "text": " ".join(word["text"] for word in local),
+            "words": local,
+            "utterances": utterances,
+        }
+
+    return transcribe
+
+
+def test_split_wav_cuts_in_quiet_gaps():
+    """16-bit PCM recordings are cut within the quiet gaps between words."""
+    recording = _recording(30)
+    segments = split_audio(recording, segment_s=10, overlap_s=2)
+
+    assert len(segments) == 3
+    for previous, segment in zip(segments, segments[1:]):
+        assert previous.cut_end_s == segment.cut_start_s
+        assert round(segment.cut_start_s * 1000) % WORD_MS >= SPOKEN_MS
+        assert segment.offset_s == segment.cut_start_s - 2
+    assert segments[-1].cut_end_s == 30
+    for segment in segments:
+        wav = parse_wav_header(segment.data)
+        assert wav.data_size == len(segment.data) - 44
+
+
+def test_long_audio_is_transcribed_in_segments_and_stitched(
+    stand_in: StandInServer, make_blockifier
+):
+    """Segments are transcribed as separate jobs and stitched onto the global timeline."""
+    recording, words = _recording(40), _words(40)
+    stand_in.transcribe = _transcriber(recording, words)
+    blockifier = make_blockifier(
+        enable_audio_intelligence=False,
+        long_audio_min_duration_s=20,
+        long_audio_segment_s=10,
+        long_audio_overlap_s=2,
+    )
+
+    response = blockifier.run(PluginRequest(data=RawDataPluginInput(data=recording)))
+
+    assert len(stand_in.jobs) == 4
+    (block,) = response.data.file.blocks
+    assert block.text == " ".join(word["text"] for word in words)
+    timestamps = [tag for tag in block.tags if tag.kind == "timestamp"]
+    assert [(tag.value["start_time"], tag.value["end_time"]) for tag in timestamps] == [
+        (word["start"], word["end"]) for word in words
+    ]
+    speakers = [tag for tag in block.tags if tag.kind == "speaker"]
+    assert [tag.name for tag in speakers] == ["A", "B"] * 4
+    assert [tag.value["start_time"] for tag in speakers] == [ix * 5000 for ix in range(8)]
+
+
+def test_short_audio_is_transcribed_in_one_job(stand_in: StandInServer, make_blockifier):
+    """Audio below long_audio_min_duration_s is not split."""
+    blockifier = make_blockifier(long_audio_min_duration_s=60, long_audio_segment_s=10)
+
+    blockifier.run(PluginRequest(data=RawDataPluginInput(data=_recording(30))))
+
+    assert len(stand_in.jobs) == 1
+
+
+def test_segment_failure_fails_the_job(stand_in: StandInServer, make_blockifier):
+    """A segment job ending in error fails the whole transcription."""
+    recording = _recording(30)
+    stand_in.transcribe = lambda audio: {"status": "error", "error": "bad audio"}
+    blockifier = make_blockifier(long_audio_min_duration_s=20, long_audio_segment_s=10)
+
+    with pytest.raises(SteamshipError):
+        blockifier.run(PluginRequest(data=RawDataPluginInput(data=recording)))
+
+
+def test_split_mp3_at_frame_boundaries():
+    """MP3 recordings are cut into frame-aligned segments that decode on their own."""
+    recording = (TEST_DATA / "test_conversation.mp3").read_bytes()
+    segments = split_audio(recording, segment_s=60, overlap_s=2)
+
+    assert len(segments) == 3
+    assert segments[0].cut_start_s == 0
+    for segment in segments:
+        duration_s = estimate_duration_s(segment.data)
+        assert segment.offset_s + duration_s >= segment.cut_end_s - 0.1
+        assert segment.offset_s <= segment.cut_start_s
+
+
+def test_other_containers_are_not_split():
+    """Buffers without an MP3 signature are left whole, even if they contain frame syncs."""
+    rng = random.Random(0)
+    m4a = b"\0\0\0\x20ftypM4A " + bytes(rng.getrandbits(8) for _ in range(200_000))
+    recording = (TEST_DATA / "test_conversation.mp3").read_bytes()
+
+    assert split_audio(m4a, segment_s=10, overlap_s=2) is None
+    assert split_audio(b"\0\0" + recording[45:], segment_s=60, overlap_s=2) is None
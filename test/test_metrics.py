@@ -0,0 +1,64 @@
+"""Test per-phase metrics of blockify jobs against the AssemblyAI stand-in."""
+from test.stand_in import StandInServer, make_transcript
+
+from steamship.base import TaskState
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+from steamship.plugin.request import PluginRequest
+
+from api import AssemblyAIBlockifier
+from metrics import METRICS_TAG_KIND, NULL_METRICS
+
+
+def _blockify(blockifier: AssemblyAIBlockifier, audio: bytes = b"audio bytes"):
+    response = blockifier.run(PluginRequest(data=RawDataPluginInput(data=audio)))
+    while response.status is not None and response.status.state == TaskState.running:
+        response = blockifier.run(PluginRequest(is_status_check=True, status=response.status))
+    return response
+
+
+def test_metrics_hook_receives_phase_spans_and_counters(stand_in: StandInServer, make_blockifier):
+    """Every invocation reports its job's spans and counters, accumulated across status checks."""
+    stand_in.polls_until_complete = 2
+    events = []
+    blockifier = make_blockifier()
+    blockifier.metrics_hook = events.append
+
+    response = _blockify(blockifier)
+
+    assert [event["event"] for event in events] == ["running", "completed"]
+    completed = events[-1]
+    assert completed["transcription_ids"] == list(stand_in.jobs)
+    assert {"upload", "submit", "fetch", "download", "parse", "process", "queued"} <= set(
+        completed["spans"]
+    )
+    assert completed["spans"]["processing"] > 0
+    counters = completed["counters"]
+    assert counters["bytes_uploaded"] == len(b"audio bytes")
+    assert counters["polls"] == 2
+    assert counters["response_bytes"] > 0
+    assert counters["words"] == len(make_transcript()["words"])
+    assert counters["tags.timestamp"] == counters["words"]
+    assert counters["tags.speaker"] == 1
+    assert not response.data.file.tags
+
+
+def test_metrics_summary_tag(make_blockifier):
+    """The summary tag attaches the job metrics to the output file."""
+    blockifier = make_blockifier(metrics_summary_tag=True, timestamp_encoding="columnar")
+
+    response = _blockify(blockifier)
+
+    (tag,) = response.data.file.tags
+    assert (tag.kind, tag.name) == (METRICS_TAG_KIND, "summary")
+    assert tag.value["counters"]["words"] == len(make_transcript()["words"])
+    assert tag.value["counters"]["tags.timestamps"] == 1
+
+
+def test_metrics_disabled_by_default(stand_in: StandInServer, make_blockifier):
+    """Without a hook or summary tag nothing is recorded or carried in the status input."""
+    stand_in.polls_until_complete = 2
+    blockifier = make_blockifier()
+
+    assert blockifier._metrics() is NULL_METRICS
+    response = blockifier.run(PluginRequest(data=RawDataPluginInput(data=b"audio")))
+    assert "metrics" not in response.status.remote_status_input
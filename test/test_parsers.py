@@ -0,0 +1,83 @@
+"""Test the index-based transcript parsers."""
+import json
+from test.synthetic import synthetic_transcript
+
+from encoding import pack_ints, unpack_ints
+from parsers import (
+    TranscriptIndex,
+    decode_columnar_timestamps,
+    parse_columnar_timestamps,
+    parse_entities,
+    parse_timestamps,
+    parse_transcript,
+)
+
+
+def test_index_finds_nearest_word_boundary():
+    """Times between word boundaries resolve to the nearest word."""
+    index = TranscriptIndex(
+        [
+            {"text": "hello", "start": 0, "end": 400},
+            {"text": "big", "start": 500, "end": 900},
+            {"text": "world", "start": 1000, "end": 1400},
+        ]
+    )
+
+    assert index.char_span(0, 1400) == (0, 15)
+    assert index.char_span(520, 880) == (6, 9)
+    assert index.char_span(-50, 5000) == (0, 15)
+    assert TranscriptIndex([]).char_span(0, 100) == (0, 0)
+
+
+def test_tag_spans_match_transcript_text():
+    """Every span-level tag covers exactly the text of the span it was parsed from."""
+    response = synthetic_transcript(600)
+    text = response["text"]
+    tags = parse_transcript(response)
+    spans = {
+        "timestamp": response["words"],
+        "speaker": response["utterances"],
+        "sentiment": response["sentiment_analysis_results"],
+    }
+
+    for kind, items in spans.items():
+        kind_tags = [tag for tag in tags if tag.kind == kind]
+        assert [text[tag.start_idx : tag.end_idx] for tag in kind_tags] == [
+            item["text"] for item in items
+        ]
+    topic_texts = {text[tag.start_idx : tag.end_idx] for tag in tags if tag.kind == "topic"}
+    assert topic_texts == {item["text"] for item in response["iab_categories_result"]["results"]}
+    assert len([tag for tag in tags if tag.kind == "topic_summary"]) == 5
+    assert len([tag for tag in tags if tag.kind == "chapter"]) == 2
+
+
+def test_entities_off_word_boundaries_are_tagged():
+    """Entities whose times do not fall exactly on word boundaries snap to the nearest words."""
+    response = synthetic_transcript(120)
+    index = TranscriptIndex(response["words"])
+    tags = parse_entities(response, index)
+
+    assert len(tags) == len(response["entities"])
+    for tag, entity in zip(tags, response["entities"]):
+        assert response["text"][tag.start_idx : tag.end_idx] == entity["text"]
+
+
+def test_columnar_timestamps_round_trip():
+    """The columnar timestamp tag decodes to the per-word tags, in a fraction of the payload."""
+    response = synthetic_transcript(600)
+    index = TranscriptIndex(response["words"])
+    per_word = parse_timestamps(response, index)
+    (columnar,) = parse_columnar_timestamps(response, index)
+    decoded = decode_columnar_timestamps(columnar, response["text"])
+
+    assert [tag.dict() for tag in decoded] == [tag.dict() for tag in per_word]
+    assert columnar.value["count"] == len(per_word)
+    per_word_size = len(json.dumps([tag.dict(exclude_none=True) for tag in per_word]))
+    assert len(json.dumps(columnar.dict(exclude_none=True))) < per_word_size / 5
+
+
+def test_pack_ints_round_trip():
+    """Integer packing round-trips negative, zero and large values."""
+    values = [0, 5, 3, -7, 2**40, 2**40 - 1, 0]
+    assert unpack_ints(pack_ints(values)) == values
+    assert unpack_ints(pack_ints([])) == []
@@ -0,0 +1,63 @@
+"""Test handing stored audio URLs to AssemblyAI without fetching the audio."""
+from test.stand_in import StandInServer
+
+import pytest
+from steamship import SteamshipError
+
+
+def test_audio_url_is_passed_to_assemblyai(stand_in: StandInServer, make_blockifier):
+    """The engine's signed URL goes straight into the job, with no download or upload."""
+    audio_url = f"{stand_in.url}/files/stored-audio?signature=abc"
+    blockifier = make_blockifier(audio_url_pass_through=True)
+
+    response = blockifier.run_endpoint(data={"url": audio_url, "defaultMimeType": "audio/mp3"})
+
+    assert response.data.file.blocks
+    (job,) = stand_in.jobs.values()
+    assert job["request"]["audio_url"] == audio_url
+    paths = [path for _, path, *_ in stand_in.requests]
+    assert not [path for path in paths if path.startswith(("/files", "/upload"))]
+
+
+def test_audio_urls_are_cached_by_location(stand_in: StandInServer, make_blockifier):
+    """Signed URLs of the same stored file share a cache entry whatever their signature."""
+    blockifier = make_blockifier(audio_url_pass_through=True, cache_mode="memory")
+    location = f"{stand_in.url}/files/shared-audio"
+
+    first = blockifier.run_endpoint(data={"url": f"{location}?signature=1"})
+    second = blockifier.run_endpoint(data={"url": f"{location}?signature=2"})
+
+    assert len(stand_in.jobs) == 1
+    assert second.data.dict() == first.data.dict()
+
+
+def test_audio_urls_differing_in_other_parameters_are_not_shared(
+    stand_in: StandInServer, make_blockifier
+):
+    """Only signing parameters are ignored, so files addressed by query get their own entries."""
+    blockifier = make_blockifier(audio_url_pass_through=True, cache_mode="memory")
+    location = f"{stand_in.url}/files/download"
+
+    blockifier.run_endpoint(data={"url": f"{location}?id=1&X-Amz-Signature=a&Expires=1"})
+    blockifier.run_endpoint(data={"url": f"{location}?id=2&X-Amz-Signature=a&Expires=1"})
+    blockifier.run_endpoint(data={"url": f"{location}?id=2&X-Amz-Signature=b&Expires=2"})
+
+    assert len(stand_in.jobs) == 2
+
+
+def test_urls_are_fetched_without_pass_through(stand_in: StandInServer, make_blockifier):
+    """By default the URL is downloaded into the input as before."""
+    blockifier = make_blockifier(audio_url_pass_through=False)
+
+    with pytest.raises(SteamshipError, match="signed url"):
+        blockifier.run_endpoint(data={"url": f"{stand_in.url}/files/missing"})
+    assert not stand_in.jobs
+
+
+def test_byte_inputs_still_upload(stand_in: StandInServer, make_blockifier):
+    """Inputs carrying their bytes are uploaded as usual in pass-through mode."""
+    blockifier = make_blockifier(audio_url_pass_through=True)
+
+    blockifier.run_endpoint(data={"data": "YXVkaW8="})
+
+    assert list(stand_in.uploads.values()) == [b"audio"]
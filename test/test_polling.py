@@ -0,0 +1,68 @@
+"""Test duration estimates and adaptive polling hints."""
+import io
+import random
+import wave
+from test import TEST_DATA
+from test.stand_in import StandInServer
+
+import pytest
+
+from audio import estimate_duration_s
+from polling import suggest_poll_delay
+
+
+def _wav(seconds: float, sample_rate: int = 16000, channels: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"\0" * int(seconds * sample_rate) * 2 * channels)
+    return buffer.getvalue()
+
+
+def test_estimate_duration():
+    """Durations are read from WAV and MP3 headers; unknown formats yield None."""
+    assert estimate_duration_s(_wav(3.0, 44100, 2)) == pytest.approx(3.0)
+    mp3 = (TEST_DATA / "test_conversation.mp3").read_bytes()
+    assert 60 < estimate_duration_s(mp3) < 300
+    assert estimate_duration_s(b"not audio") is None
+    rng = random.Random(0)
+    m4a = b"\0\0\0\x20ftypM4A " + bytes(rng.getrandbits(8) for _ in range(100_000))
+    assert estimate_duration_s(m4a) is None
+
+
+def test_long_files_are_polled_less_often():
+    """A two-hour file gets a longer delay than a short voice note."""
+    kwargs = dict(polls=1, queued_s=0, processing_s=2, min_delay_s=1, max_delay_s=60, jitter=0)
+    assert suggest_poll_delay(duration_s=7200, **kwargs) == 60
+    assert suggest_poll_delay(duration_s=10, **kwargs) < 5
+
+
+def test_overdue_jobs_back_off_with_jitter():
+    """Overdue jobs back off exponentially, randomized within the jitter bounds."""
+    rng = random.Random(0)
+    kwargs = dict(queued_s=0, processing_s=100, duration_s=10, min_delay_s=1, max_delay_s=60)
+    delays = [suggest_poll_delay(polls=polls, jitter=0, **kwargs) for polls in range(1, 6)]
+    assert delays == sorted(delays)
+    jittered = suggest_poll_delay(polls=4, jitter=0.2, rng=rng, **kwargs)
+    assert delays[3] * 0.8 <= jittered <= delays[3] * 1.2
+
+
+def test_running_task_carries_hint_and_timings(stand_in: StandInServer, make_blockifier):
+    """Running status checks report a next-poll delay and accumulate job timings."""
+    stand_in.polls_until_complete = 3
+    blockifier = make_blockifier()
+    transcription_id = blockifier._start_transcription(file_uri="http://example.com/a.mp3")
+    response = blockifier._check_transcription_status(
+        transcription_id, status_input={"submitted_at": 0, "audio_duration_s": 10}
+    )
+    response = blockifier._check_transcription_status(
+        transcription_id, status_input=response.status.remote_status_input
+    )
+
+    status_input = response.status.remote_status_input
+    assert status_input["polls"] == 2
+    assert status_input["processing_s"] > 0
+    assert response.status.remote_status_output["job_status"] == "processing"
+    assert 1 <= response.status.remote_status_output["next_poll_delay_s"] <= 60
@@ -0,0 +1,108 @@
+"""Test synchronous real-time transcription of short inputs against the local stand-in."""
+import io
+import time
+import wave
+from test.stand_in import StandInServer
+
+import pytest
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+from steamship.plugin.request import PluginRequest
+
+from api import AssemblyAIBlockifier
+from realtime import OPCODE_BINARY, encode_frame, read_frame
+
+
+def _wav(seconds: float, sample_rate: int = 16000, channels: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(range(256)) * (int(seconds * sample_rate) * 2 * channels // 256))
+    return buffer.getvalue()
+
+
+def _blockifier(make_blockifier, **config) -> AssemblyAIBlockifier:
+    return make_blockifier(
+        **{
+            "assembly_api_token": "token",
+            "features": "timestamps",
+            "realtime_max_duration_s": 30,
+            "realtime_speed": 0,
+            **config,
+        }
+    )
+
+
+def _run(blockifier: AssemblyAIBlockifier, data: bytes):
+    return blockifier.run(PluginRequest(data=RawDataPluginInput(data=data)))
+
+
+@pytest.mark.parametrize("size", [10, 300, 70_000])
+@pytest.mark.parametrize("mask", [False, True])
+def test_frames_round_trip(size: int, mask: bool):
+    """Frames of every length encoding decode to their payload, masked or not."""
+    payload = bytes(range(256)) * (size // 256) + bytes(size % 256)
+
+    fin, opcode, decoded = read_frame(io.BytesIO(encode_frame(OPCODE_BINARY, payload, mask)))
+
+    assert (fin, opcode, decoded) == (True, OPCODE_BINARY, payload)
+
+
+def test_short_wav_is_transcribed_in_one_call(stand_in: StandInServer, make_blockifier):
+    """Short PCM audio is streamed to a real-time session and returned with word timestamps."""
+    audio = _wav(2.6)
+
+    response = _run(_blockifier(make_blockifier), audio)
+
+    assert not stand_in.jobs
+    (session,) = stand_in.realtime_sessions
+    assert session["sample_rate"] == 16000
+    assert session["headers"]["Authorization"] == "token"
+    assert session["audio"] == audio[44:]
+    (block,) = response.data.file.blocks
+    assert block.text == "hello world this is a test"
+    assert [(tag.kind, tag.name) for tag in block.tags] == [
+        ("timestamp", word) for word in block.text.split(" ")
+    ]
+
+
+def test_audio_is_paced_by_realtime_speed(make_blockifier):
+    """Audio is sent no faster than realtime_speed times real time."""
+    started = time.monotonic()
+
+    _run(_blockifier(make_blockifier, realtime_speed=5), _wav(2.0))
+
+    assert time.monotonic() - started >= 1.75 / 5
+
+
+@pytest.mark.parametrize(
+    "config, audio",
+    [
+        ({}, _wav(40)),
+        ({}, _wav(2, channels=2)),
+        ({"features": "timestamps,speakers"}, _wav(2)),
+        ({"realtime_max_duration_s": 0}, _wav(2)),
+    ],
+    ids=["long", "stereo", "speakers", "disabled"],
+)
+def test_other_inputs_use_transcription_jobs(
+    stand_in: StandInServer, config, audio: bytes, make_blockifier
+):
+    """Long, non-mono or feature-rich inputs, or a disabled threshold, go through a job."""
+    response = _run(_blockifier(make_blockifier, **config), audio)
+
+    assert response.data.file.blocks
+    assert len(stand_in.jobs) == 1
+    assert not stand_in.realtime_sessions
+
+
+def test_failed_sessions_fall_back_to_a_job(stand_in: StandInServer, make_blockifier):
+    """A session AssemblyAI refuses is retried as a transcription job."""
+    stand_in.realtime_error = "Not authorized"
+
+    response = _run(_blockifier(make_blockifier), _wav(2))
+
+    assert len(stand_in.realtime_sessions) == 1
+    assert len(stand_in.jobs) == 1
+    assert response.data.file.blocks
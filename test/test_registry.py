@@ -0,0 +1,23 @@
+"""Test the process-wide registries of shared objects."""
+from concurrent.futures import ThreadPoolExecutor
+
+from registry import Registry
+
+
+def test_each_key_is_created_once():
+    """Concurrent lookups of a key share one object, and each key gets its own."""
+    registry: Registry[object] = Registry()
+    created = []
+
+    def create() -> object:
+        created.append(object())
+        return created[-1]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        shared = set(map(id, executor.map(lambda _: registry.get(("a", 1), create), range(100))))
+
+    assert shared == {id(created[0])}
+    assert registry.get(("b", 1), create) is created[1]
+    assert registry.values() == created
+    registry.clear()
+    assert registry.get(("a", 1), create) is created[2]
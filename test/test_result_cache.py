@@ -0,0 +1,88 @@
+"""Test the cache of finished job results that makes status checks idempotent."""
+import time
+from test.stand_in import StandInServer
+
+import pytest
+from steamship import SteamshipError
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+from steamship.plugin.request import PluginRequest
+
+from cache import CompressedLRUCache
+
+
+def _running_job(stand_in: StandInServer, make_blockifier, **config):
+    stand_in.polls_until_complete = 2
+    blockifier = make_blockifier(**config)
+    response = blockifier.run(PluginRequest(data=RawDataPluginInput(data=b"audio")))
+    return blockifier, PluginRequest(is_status_check=True, status=response.status)
+
+
+def _transcript_requests(stand_in: StandInServer) -> int:
+    return sum(1 for method, path, *_ in stand_in.requests if path.startswith("/transcript/"))
+
+
+def test_repeated_status_checks_of_a_completed_job_are_served_from_cache(
+    stand_in: StandInServer, make_blockifier
+):
+    """Checking a completed job again returns the same output without fetching it."""
+    blockifier, status_check = _running_job(stand_in, make_blockifier)
+    first = blockifier.run(status_check)
+    requests_made = _transcript_requests(stand_in)
+
+    second = blockifier.run(status_check)
+
+    assert _transcript_requests(stand_in) == requests_made
+    assert second.data.dict() == first.data.dict()
+
+
+def test_failed_jobs_are_cached(stand_in: StandInServer, make_blockifier):
+    """A failed job is not fetched again by later status checks."""
+    stand_in.transcript = {"status": "error", "error": "bad audio"}
+    blockifier, status_check = _running_job(stand_in, make_blockifier)
+    with pytest.raises(SteamshipError):
+        blockifier.run(status_check)
+    requests_made = _transcript_requests(stand_in)
+
+    with pytest.raises(SteamshipError):
+        blockifier.run(status_check)
+    assert _transcript_requests(stand_in) == requests_made
+
+
+def test_result_cache_can_be_disabled(stand_in: StandInServer, make_blockifier):
+    """With a zero size the result cache is off and completed jobs are fetched again."""
+    blockifier, status_check = _running_job(stand_in, make_blockifier, result_cache_max_bytes=0)
+    blockifier.run(status_check)
+    requests_made = _transcript_requests(stand_in)
+
+    blockifier.run(status_check)
+
+    assert blockifier.results is None
+    assert _transcript_requests(stand_in) == requests_made + 1
+
+
+def test_compressed_cache_evicts_by_size():
+    """Least recently used entries are evicted once the compressed entries exceed max_bytes."""
+    probe = CompressedLRUCache(max_bytes=10_000, ttl_s=60)
+    probe.put("a", {"output": "a" * 1000})
+    cache = CompressedLRUCache(max_bytes=3 * probe.size, ttl_s=60)
+    for key in "abc":
+        cache.put(key, {"output": key * 1000})
+    cache.get("a")
+    cache.put("d", {"output": "d" * 1000})
+
+    assert cache.size <= 3 * probe.size
+    assert cache.get("a") == {"output": "a" * 1000}
+    assert cache.get("b") is None
+    cache.put("big", {"output": bytes(range(256)).hex() * 10})
+    assert cache.get("big") is None
+
+
+def test_compressed_cache_entries_expire(monkeypatch):
+    """Entries older than ttl_s are misses."""
+    cache = CompressedLRUCache(max_bytes=10_000, ttl_s=10)
+    cache.put("a", {"error": "failed"})
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0 and cache.size == 0
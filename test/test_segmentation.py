@@ -0,0 +1,80 @@
+"""Test segmentation of transcripts into multiple blocks."""
+from test.synthetic import synthetic_transcript
+
+import pytest
+from steamship import Tag
+
+from parsers import COLUMNAR_TIMESTAMP_KIND, PARSERS, decode_columnar_timestamps, parse_transcript
+from segmentation import SegmentationMode, segment_starts, split_into_blocks
+
+
+@pytest.mark.parametrize("mode", ("utterance", "chapter", "duration"))
+def test_blocks_cover_transcript_with_rebased_tags(mode: str, make_blockifier):
+    """Blocks partition the transcript words and tags point at the same text as before."""
+    response = synthetic_transcript(900)
+    file = (
+        make_blockifier(segmentation=mode, segment_max_duration_s=60)
+        ._process_transcription_response(response)
+        .data.file
+    )
+
+    assert len(file.blocks) > 1
+    assert " ".join(block.text for block in file.blocks) == response["text"]
+    assert {tag.kind for tag in file.tags} == {"topic_summary"}
+    words = [tag for block in file.blocks for tag in block.tags if tag.kind == "timestamp"]
+    assert [tag.name for tag in words] == [word["text"] for word in response["words"]]
+    for block in file.blocks:
+        for tag in block.tags:
+            if tag.kind in ("timestamp", "entity"):
+                assert block.text[tag.start_idx : tag.end_idx] == tag.name
+
+
+def test_utterance_blocks_hold_one_speaker_each(make_blockifier):
+    """In utterance mode each block carries exactly one whole speaker tag."""
+    response = synthetic_transcript(300)
+    file = (
+        make_blockifier(segmentation="utterance")
+        ._process_transcription_response(response)
+        .data.file
+    )
+
+    assert len(file.blocks) == len(response["utterances"])
+    for block, utterance in zip(file.blocks, response["utterances"]):
+        (speaker,) = [tag for tag in block.tags if tag.kind == "speaker"]
+        assert (speaker.start_idx, speaker.end_idx) == (0, len(block.text))
+        assert block.text == utterance["text"]
+
+
+def test_tags_crossing_boundaries_are_split():
+    """A tag spanning two blocks is clipped into one part per block."""
+    text = "one two three four"
+    tags = [Tag(kind="topic", name="t", start_idx=4, end_idx=13, value={"start_time": 1})]
+    blocks, _ = split_into_blocks(text, tags, [0, 8])
+
+    assert [block.text for block in blocks] == ["one two", "three four"]
+    assert [(tag.start_idx, tag.end_idx) for tag in blocks[0].tags] == [(4, 7)]
+    assert [(tag.start_idx, tag.end_idx) for tag in blocks[1].tags] == [(0, 5)]
+    assert blocks[1].tags[0].value == {"start_time": 1}
+
+
+def test_duration_mode_respects_char_budget():
+    """Duration mode starts a new block before exceeding the character budget."""
+    response = synthetic_transcript(300)
+    tags = parse_transcript(response, PARSERS)
+    starts = segment_starts(SegmentationMode.DURATION, tags, max_chars=200)
+    blocks, _ = split_into_blocks(response["text"], tags, starts)
+
+    assert all(len(block.text) <= 200 for block in blocks)
+
+
+def test_columnar_timestamps_are_reencoded_per_block(make_blockifier):
+    """Columnar timestamp tags are split into one tag per block with rebased offsets."""
+    response = synthetic_transcript(300)
+    blockifier = make_blockifier(segmentation="utterance", timestamp_encoding="columnar")
+    file = blockifier._process_transcription_response(response).data.file
+
+    words = []
+    for block in file.blocks:
+        (columnar,) = [tag for tag in block.tags if tag.kind == COLUMNAR_TIMESTAMP_KIND]
+        words.extend(tag.name for tag in decode_columnar_timestamps(columnar, block.text))
+    assert words == [word["text"] for word in response["words"]]
@@ -0,0 +1,104 @@
+"""Test scheduling transcription jobs over several AssemblyAI tokens."""
+from test.stand_in import StandInServer
+from uuid import uuid4
+
+import pytest
+from steamship import SteamshipError
+from steamship.base import TaskState
+from steamship.invocable import InvocableResponse
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+from steamship.plugin.request import PluginRequest
+
+from api import AssemblyAIBlockifier
+from sharding import RATE_LIMIT_PENALTY, TokenPool, shard_id
+
+
+def _blockifier(make_blockifier, tokens, **config) -> AssemblyAIBlockifier:
+    return make_blockifier(
+        assembly_api_token=tokens[0], assembly_api_tokens=",".join(tokens[1:]), **config
+    )
+
+
+def _complete(blockifier: AssemblyAIBlockifier, response: InvocableResponse) -> InvocableResponse:
+    while response.status.state == TaskState.running:
+        response = blockifier.run(PluginRequest(is_status_check=True, status=response.status))
+    return response
+
+
+def test_pool_picks_the_least_loaded_token():
+    """Jobs spread over tokens by jobs in flight, and recent 429s count against a token."""
+    pool = TokenPool(["first", "second"])
+    first, second = pool.tokens
+
+    assert pool.acquire({}) == first
+    assert pool.acquire({}) == second
+    pool.started(first, "a")
+    pool.started(second, "b")
+    pool.finished(["a"])
+    assert pool.acquire({}) == first
+    pool.started(first, "c")
+    assert pool.loads({second: 1}) == {first: 1, second: 1 + RATE_LIMIT_PENALTY}
+    assert pool.acquire({second: 1}) == first
+
+
+def test_shard_ids_do_not_reveal_tokens():
+    """Status inputs carry an opaque shard id, which maps back to the token in the pool."""
+    pool = TokenPool(["secret-token"])
+    (shard,) = pool.tokens
+
+    assert shard == shard_id("secret-token")
+    assert "secret" not in shard
+    assert pool.token(shard) == "secret-token"
+    assert pool.token() == "secret-token"
+    with pytest.raises(SteamshipError, match="unknown"):
+        pool.token("unknown")
+
+
+def test_concurrent_jobs_are_spread_over_tokens(stand_in: StandInServer, make_blockifier):
+    """With one active job allowed per token, two jobs run at once on different tokens."""
+    tokens = [str(uuid4()), str(uuid4())]
+    stand_in.token_limits = {token: 1 for token in tokens}
+    stand_in.polls_until_complete = 2
+    blockifier = _blockifier(make_blockifier, tokens)
+
+    running = [
+        blockifier.run(PluginRequest(data=RawDataPluginInput(data=audio)))
+        for audio in (b"first", b"second")
+    ]
+
+    shards = [response.status.remote_status_input["shard"] for response in running]
+    assert sorted(shards) == sorted(shard_id(token) for token in tokens)
+    assert sorted(job["token"] for job in stand_in.jobs.values()) == sorted(tokens)
+    for response in running:
+        assert _complete(blockifier, response).data.file.blocks
+    assert blockifier.token_pool.loads({}) == {shard: 0 for shard in shards}
+
+
+def test_rate_limited_token_is_avoided(stand_in: StandInServer, make_blockifier):
+    """After a token is answered 429, the next job goes to another token."""
+    tokens = [str(uuid4()), str(uuid4())]
+    stand_in.token_limits = {tokens[0]: 0}
+    blockifier = _blockifier(make_blockifier, tokens, http_max_retries=0)
+
+    with pytest.raises(SteamshipError):
+        blockifier.run(PluginRequest(data=RawDataPluginInput(data=b"audio")))
+    response = blockifier.run(PluginRequest(data=RawDataPluginInput(data=b"audio")))
+
+    assert response.data.file.blocks
+    assert [job["token"] for job in stand_in.jobs.values()] == [tokens[1]]
+
+
+def test_jobs_of_removed_tokens_fail_clearly(stand_in: StandInServer, make_blockifier):
+    """A job whose token left the pool fails naming its shard, without a request to AssemblyAI."""
+    stand_in.polls_until_complete = 2
+    running = _blockifier(make_blockifier, ["old", "new"]).run(
+        PluginRequest(data=RawDataPluginInput(data=b"audio"))
+    )
+    assert running.status.remote_status_input["shard"] == shard_id("old")
+    requests_made = len(stand_in.requests)
+
+    with pytest.raises(SteamshipError, match=shard_id("old")):
+        _blockifier(make_blockifier, ["new"]).run(
+            PluginRequest(is_status_check=True, status=running.status)
+        )
+    assert len(stand_in.requests) == requests_made
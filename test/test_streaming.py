@@ -0,0 +1,82 @@
+"""Test incremental parsing of transcript responses."""
+import json
+import tracemalloc
+from test.stand_in import StandInServer
+from test.synthetic import synthetic_transcript
+
+import pytest
+
+from parsers import PARSERS, parse_columnar_timestamps, parse_timestamps, parse_transcript
+from streaming import JsonStream, stream_transcript
+
+COLUMNAR_PARSERS = tuple(
+    parse_columnar_timestamps if parser is parse_timestamps else parser for parser in PARSERS
+)
+
+
+def _chunks(body: bytes, size: int):
+    for offset in range(0, len(body), size):
+        yield body[offset : offset + size]
+
+
+def _key(tag):
+    return tag.kind, tag.name, tag.start_idx, tag.end_idx, tag.value
+
+
+@pytest.mark.parametrize("chunk_size", (1, 7, 4096))
+def test_json_stream_reads_values_across_chunk_boundaries(chunk_size: int):
+    """Values split at any byte, including multi-byte characters and numbers, decode intact."""
+    document = {"a": [1, 23456, -7.5e3, "café ☃", None, True], "b": {"c": {"d": []}}, "e": 9}
+    stream = JsonStream(_chunks(json.dumps(document).encode("utf-8"), chunk_size))
+    decoded = {}
+    for key in stream.iter_object():
+        if key == "a":
+            decoded[key] = list(stream.iter_items())
+        elif key == "b":
+            stream.skip_value()
+        else:
+            decoded[key] = stream.read_value()
+
+    assert decoded == {"a": document["a"], "e": 9}
+
+
+@pytest.mark.parametrize("parsers", (PARSERS, COLUMNAR_PARSERS))
+def test_stream_matches_full_parse(parsers):
+    """Streaming yields the same tags, in the same order, as parsing the decoded response."""
+    response = synthetic_transcript(900)
+    # Move words to the end so that earlier sections have to wait for the index.
+    response["words"] = response.pop("words")
+    fields, tags = stream_transcript(_chunks(json.dumps(response).encode(), 1000), parsers)
+
+    assert fields["status"] == "completed"
+    assert fields["text"] == response["text"]
+    assert "words" not in fields and "iab_categories_result" not in fields
+    assert list(map(_key, tags)) == list(map(_key, parse_transcript(response, parsers)))
+
+
+def test_stream_peak_memory_is_lower():
+    """The streaming path holds less memory at peak than decoding the whole response."""
+    body = json.dumps(synthetic_transcript(3600)).encode()
+
+    tracemalloc.start()
+    parse_transcript(json.loads(body), COLUMNAR_PARSERS)
+    full_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    stream_transcript(_chunks(body, 64 * 1024), COLUMNAR_PARSERS)
+    stream_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert stream_peak < full_peak * 0.75
+
+
+def test_blockifier_streams_large_responses(stand_in: StandInServer, make_blockifier):
+    """Status checks above the size threshold produce the same output through the stream."""
+    stand_in.transcript = synthetic_transcript(60)
+    outputs = []
+    for threshold in (0, 10**9):
+        blockifier = make_blockifier(stream_parse_min_bytes=threshold)
+        transcription_id = blockifier._start_transcription(file_uri="http://example.com/a.mp3")
+        outputs.append(blockifier._check_transcription_status(transcription_id).data)
+
+    assert outputs[0].file.blocks[0].text == stand_in.transcript["text"]
+    assert outputs[0].dict() == outputs[1].dict()
@@ -0,0 +1,185 @@
+"""Test rate limiting, retries and circuit breaking of AssemblyAI API calls."""
+import io
+import random
+import time
+from contextlib import nullcontext
+from test.stand_in import StandInServer
+from typing import List
+
+import pytest
+import requests
+from steamship import SteamshipError
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+from steamship.plugin.request import PluginRequest
+
+from throttle import CircuitBreaker, CircuitOpenError, Throttle, TokenBucket
+
+
+class FakeClock:
+    """Clock whose sleeps advance time instantly."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps: List[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _response(status: int, retry_after: str = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.raw = io.BytesIO(b"")
+    if retry_after is not None:
+        response.headers["retry-after"] = retry_after
+    return response
+
+
+def test_token_bucket_spaces_calls_after_a_burst():
+    """Calls beyond the burst wait for tokens to refill at the configured rate."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_s=4, burst=2, clock=clock, sleep=clock.sleep)
+
+    for _ in range(4):
+        bucket.acquire()
+    bucket.pause(3)
+    bucket.acquire()
+
+    assert clock.sleeps == pytest.approx([0.25, 0.25, 3])
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """The circuit opens after consecutive failures and a successful trial call closes it."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout_s=10, clock=clock)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_in_s == 10
+    clock.now = 10
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert not breaker.is_open
+
+
+def test_retries_wait_for_retry_after_or_jittered_backoff():
+    """Retry-After is honoured when sent, otherwise the backoff is jittered and capped."""
+    clock = FakeClock()
+    throttle = Throttle(
+        submit_rate_per_s=0,
+        poll_rate_per_s=0,
+        burst=1,
+        max_retries=3,
+        backoff_factor=1,
+        max_backoff_s=3,
+        failure_threshold=0,
+        reset_timeout_s=0,
+        clock=clock,
+        sleep=clock.sleep,
+        rng=random.Random(0),
+    )
+    responses = iter([_response(429, "2"), _response(503), _response(503), _response(200)])
+
+    response = throttle.send(lambda: next(responses))
+
+    assert response.status_code == 200
+    assert clock.sleeps[0] == 2
+    assert 0 <= clock.sleeps[1] <= 2 and 0 <= clock.sleeps[2] <= 3
+    assert len(set(clock.sleeps[1:])) == 2
+
+
+@pytest.mark.parametrize(
+    "outcome",
+    [_response(429, "0"), requests.exceptions.ChunkedEncodingError("truncated")],
+    ids=["rate-limited", "interrupted"],
+)
+def test_half_open_circuit_recovers_after_an_inconclusive_trial(outcome):
+    """A trial call answered 429 or cut short does not leave the circuit stuck open."""
+    clock = FakeClock()
+    throttle = Throttle(
+        submit_rate_per_s=0,
+        poll_rate_per_s=0,
+        burst=1,
+        max_retries=0,
+        backoff_factor=0,
+        max_backoff_s=0,
+        failure_threshold=1,
+        reset_timeout_s=10,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+
+    def trial() -> requests.Response:
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    throttle.send(lambda: _response(503))
+    clock.now = 10
+    with pytest.raises(Exception) if isinstance(outcome, Exception) else nullcontext():
+        throttle.send(trial)
+    clock.now = 30
+
+    assert throttle.send(lambda: _response(200)).status_code == 200
+    assert not throttle.breaker.is_open
+
+
+def test_rejected_submission_raises(stand_in: StandInServer, make_blockifier):
+    """A submission AssemblyAI rejects raises instead of returning a missing job id."""
+    stand_in.fail_route["POST /transcript"] = [400]
+    blockifier = make_blockifier()
+
+    with pytest.raises(SteamshipError, match="Status code: 400"):
+        blockifier._start_transcription(file_uri="http://example.com/audio.mp3")
+
+
+def test_transient_poll_errors_keep_the_job_running(stand_in: StandInServer, make_blockifier):
+    """A status check failing with 5xx reports the job as running until after Retry-After."""
+    blockifier = make_blockifier(http_max_retries=0, circuit_failure_threshold=0)
+    stand_in.polls_until_complete = 2
+    running = blockifier.run(PluginRequest(data=RawDataPluginInput(data=b"audio")))
+    (job_id,) = stand_in.jobs
+    stand_in.fail_route[f"GET /transcript/{job_id}"] = [503]
+    stand_in.retry_after = "4"
+    status_check = PluginRequest(is_status_check=True, status=running.status)
+
+    still_running = blockifier.run(status_check)
+    completed = blockifier.run(status_check)
+
+    assert still_running.status.state == "running"
+    assert still_running.status.remote_status_output["next_poll_delay_s"] >= 4
+    assert completed.data.file.blocks
+
+
+def test_circuit_fails_fast_while_assemblyai_is_degraded(stand_in: StandInServer, make_blockifier):
+    """Once the failure threshold is reached, calls fail without reaching AssemblyAI."""
+    stand_in.fail_next = [503, 503]
+    blockifier = make_blockifier(http_max_retries=1, circuit_failure_threshold=2)
+
+    with pytest.raises(SteamshipError, match="Status code: 503"):
+        blockifier._start_transcription(file_uri="http://example.com/audio.mp3")
+    with pytest.raises(CircuitOpenError):
+        blockifier._start_transcription(file_uri="http://example.com/audio.mp3")
+    assert len(stand_in.requests) == 2
+
+
+def test_status_polls_are_rate_limited(stand_in: StandInServer, make_blockifier):
+    """Status polls beyond the burst are spaced by the poll rate limit."""
+    stand_in.polls_until_complete = 5
+    blockifier = make_blockifier(poll_rate_limit_per_s=20, rate_limit_burst=1)
+    transcription_id = blockifier._start_transcription(file_uri="http://example.com/audio.mp3")
+
+    started = time.monotonic()
+    for _ in range(4):
+        blockifier._check_transcription_status(transcription_id)
+
+    assert time.monotonic() - started >= 0.14
@@ -0,0 +1,42 @@
+"""Test the pooled HTTP transport against a local AssemblyAI stand-in."""
+import time
+from test.stand_in import StandInServer
+
+import pytest
+import requests
+
+
+def test_calls_reuse_one_connection(stand_in: StandInServer, make_blockifier):
+    """Submission and status polls share a single keep-alive connection."""
+    stand_in.polls_until_complete = 3
+    blockifier = make_blockifier()
+    transcription_id = blockifier._start_transcription(file_uri="http://example.com/audio.mp3")
+    for _ in range(3):
+        response = blockifier._check_transcription_status(transcription_id)
+
+    assert response.data is not None
+    assert len(stand_in.requests) == 4
+    assert stand_in.connections == 1
+
+
+def test_retries_on_rate_limit_and_server_errors(stand_in: StandInServer, make_blockifier):
+    """Submissions rejected with 429/5xx are retried with backoff."""
+    stand_in.fail_next = [429, 503]
+    blockifier = make_blockifier()
+    transcription_id = blockifier._start_transcription(file_uri="http://example.com/audio.mp3")
+
+    assert transcription_id in stand_in.jobs
+    assert len(stand_in.requests) == 3
+
+
+def test_submission_is_not_resent_after_a_read_timeout(stand_in: StandInServer, make_blockifier):
+    """A submission whose response times out fails instead of creating a second job."""
+    stand_in.latency_s = 0.3
+    blockifier = make_blockifier(http_timeout_s=0.1)
+
+    with pytest.raises(requests.Timeout):
+        blockifier._start_transcription(file_uri="http://example.com/audio.mp3")
+    time.sleep(0.4)
+
+    assert len(stand_in.requests) == 1
+    assert len(stand_in.jobs) == 1
@@ -1,5 +1,5 @@
 """Test assemblyai-s2t-blockifier via unit tests."""
-from time import perf_counter
+from time import perf_counter, sleep
 
 import requests
 
@@ -40,6 +40,7 @@ def test_blockifier(speaker_detection: bool):
     assert response.status.remote_status_input.get("transcription_id") is not None
 
     while response.status.state == TaskState.running:
+        sleep(response.status.remote_status_output["next_poll_delay_s"])
         request = PluginRequest(
             is_status_check=True,
             status=response.status,
@@ -69,6 +70,7 @@ def test_blockifier_new(speaker_detection: bool):
     assert response.status.remote_status_input.get("transcription_id") is not None
 
     while response.status.state == TaskState.running:
+        sleep(response.status.remote_status_output["next_poll_delay_s"])
         request = PluginRequest(
             is_status_check=True,
             status=response.status,
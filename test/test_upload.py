@@ -0,0 +1,39 @@
+"""Test direct streaming uploads to the AssemblyAI stand-in."""
+from test.stand_in import StandInServer
+
+
+def test_direct_upload_streams_chunks(stand_in: StandInServer, make_blockifier):
+    """Audio is streamed to the upload endpoint and the returned URL is used for the job."""
+    audio = bytes(range(256)) * 100
+    blockifier = make_blockifier(upload_chunk_size=1000)
+    upload_url = blockifier._upload_audio_file("audio/mp3", audio)
+
+    assert upload_url.startswith(f"{stand_in.url}/files/")
+    assert list(stand_in.uploads.values()) == [audio]
+    method, path, headers, _ = stand_in.requests[0]
+    assert (method, path) == ("POST", "/upload")
+    assert headers["content-type"] == "application/octet-stream"
+
+
+def test_direct_upload_falls_back_to_signed_url(
+    stand_in: StandInServer, monkeypatch, make_blockifier
+):
+    """A rejected direct upload falls back to the workspace signed-URL path."""
+    stand_in.fail_next = [400]
+    blockifier = make_blockifier()
+    monkeypatch.setattr(
+        blockifier, "_upload_to_workspace", lambda mime_type, data: "http://example.com/signed"
+    )
+
+    assert blockifier._upload_audio_file("audio/mp3", b"audio") == "http://example.com/signed"
+
+
+def test_signed_url_mode_skips_direct_upload(stand_in: StandInServer, monkeypatch, make_blockifier):
+    """The signed-URL mode never calls the AssemblyAI upload endpoint."""
+    blockifier = make_blockifier(upload_mode="signed_url")
+    monkeypatch.setattr(
+        blockifier, "_upload_to_workspace", lambda mime_type, data: "http://example.com/signed"
+    )
+
+    assert blockifier._upload_audio_file("audio/mp3", b"audio") == "http://example.com/signed"
+    assert stand_in.requests == []
@@ -0,0 +1,78 @@
+"""Test webhook-driven job completion against the AssemblyAI stand-in."""
+import time
+from test.stand_in import CallbackServer, StandInServer
+from uuid import uuid4
+
+import pytest
+from steamship import SteamshipError
+from steamship.base import TaskState
+from steamship.plugin.inputs.raw_data_plugin_input import RawDataPluginInput
+from steamship.plugin.request import PluginRequest
+
+from api import AssemblyAIBlockifier
+
+
+def _status_check(blockifier: AssemblyAIBlockifier, response):
+    return blockifier.run(PluginRequest(is_status_check=True, status=response.status))
+
+
+def _gets(stand_in: StandInServer):
+    return [path for method, path, _, _ in stand_in.requests if method == "GET"]
+
+
+def test_completion_is_fetched_once_after_webhook(
+    stand_in: StandInServer, monkeypatch, make_blockifier
+):
+    """Status checks are answered locally until the webhook arrives, then fetched exactly once."""
+    stand_in.polls_until_complete = 100
+    received = []
+
+    def receive(payload):
+        received.append(payload["transcript_id"])
+        blockifier.webhook(**payload)
+
+    with CallbackServer(receive) as receiver:
+        blockifier = make_blockifier(webhook_url=receiver.url)
+        monkeypatch.setattr(
+            blockifier,
+            "_upload_audio_file",
+            lambda mime_type, data, shard=None: "http://example.com/a.mp3",
+        )
+
+        response = blockifier.run(PluginRequest(data=RawDataPluginInput(data=uuid4().bytes)))
+        for _ in range(3):
+            response = _status_check(blockifier, response)
+            assert response.status.state == TaskState.running
+        assert _gets(stand_in) == []
+
+        transcription_id = response.status.remote_status_input["transcription_id"]
+        stand_in.complete_job(transcription_id)
+        response = _status_check(blockifier, response)
+
+    assert received == [transcription_id]
+    assert response.data.file.blocks[0].text == stand_in.transcript["text"]
+    assert len(_gets(stand_in)) == 1
+
+
+def test_polls_when_webhook_is_overdue(stand_in: StandInServer, make_blockifier):
+    """Jobs without a notification past the fallback delay are polled from AssemblyAI."""
+    blockifier = make_blockifier(
+        webhook_url="http://127.0.0.1:1/webhook", webhook_fallback_poll_s=60
+    )
+    transcription_id = blockifier._start_transcription(file_uri="http://example.com/a.mp3")
+
+    response = blockifier._resume_job(
+        {"transcription_id": transcription_id, "submitted_at": time.time() - 120}
+    )
+
+    assert response.data is not None
+    assert len(_gets(stand_in)) == 1
+
+
+@pytest.mark.parametrize("transcript_id", ["", "../cache/entry", "a" * 65])
+def test_webhook_rejects_invalid_transcript_ids(transcript_id: str, make_blockifier):
+    """Notifications are only recorded for ids shaped like AssemblyAI transcript ids."""
+    blockifier = make_blockifier(webhook_url="http://127.0.0.1:1/webhook")
+
+    with pytest.raises(SteamshipError):
+        blockifier.webhook(transcript_id=transcript_id, status="completed")